@@ -0,0 +1,622 @@
+"""
+Benchmarks of the hot paths of urWIDgets.
+
+Everything is rendered headless (no terminal or screen is required) and the
+benchmarks cover the working tree (i.e ``src/``), not any installed version.
+
+Each benchmark is run over a sweep of one parameter at a time, around a default
+case. For every case, the best time per operation (over a number of repeats) and
+the number of shards (and canvas views) of the resulting canvas, if any, are
+reported.
+
+Run ``python benchmarks/bench.py --help`` for usage.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import re
+import sys
+import time
+from os.path import abspath, dirname, join
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), "src"))
+
+import urwid  # noqa: E402
+
+import urwidgets  # noqa: E402
+from urwidgets import (  # noqa: E402
+    CompiledMarkup,
+    DocumentWalker,
+    Hyperlink,
+    LiveValue,
+    ParseCache,
+    TextEmbed,
+    UpdateBatcher,
+    parse_text,
+)
+
+# Parameters of the default case
+DEFAULTS = {
+    "lines": 100,
+    "widgets": 2,  # per line
+    "width": 8,  # of each embedded widget
+    "wrap": "space",
+    "align": "left",
+    "wide": 0,  # whether the text contains wide characters
+    "patterns": 4,
+}
+
+# Values of each parameter swept, with every other parameter at its default
+SWEEPS = {
+    "lines": (10, 100, 1000),
+    "widgets": (0, 1, 2, 8),
+    "width": (1, 8, 32),
+    "wrap": ("space", "any", "clip"),
+    "align": ("left", "center", "right"),
+    "wide": (0, 1),
+    "patterns": (1, 4, 16, 24),
+}
+
+# The parameters each benchmark depends on
+BENCHMARKS: Dict[str, Tuple[Callable[..., Callable[[], Any]], Tuple[str, ...]]] = {}
+
+MAXCOL = 80
+
+
+def benchmark(name: str, *params: str):
+    """Registers a benchmark.
+
+    The decorated function is called with the parameters of a case and should
+    return a function that performs a single operation.
+    """
+
+    def register(setup: Callable[..., Callable[[], Any]]):
+        BENCHMARKS[name] = (setup, params)
+        return setup
+
+    return register
+
+
+def make_markup(lines: int, widgets: int, width: int, wide: int) -> list:
+    words = ("漢字", "文字列", "wide") if wide else ("lorem", "ipsum", "dolor")
+    rng = random.Random(0)
+    markup = []
+    for line in range(lines):
+        markup.append(f"line {line} ")
+        for widget in range(widgets):
+            markup.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 6))))
+            markup.append(" ")
+            if widget % 2:
+                text = Hyperlink(f"https://example.com/{line}/{widget}", text="l")
+            else:
+                text = urwid.Text(str(widget))
+            markup.append((width, urwid.Filler(text)))
+            markup.append(" ")
+        markup.append(" ".join(rng.choice(words) for _ in range(8)))
+        markup.append("\n")
+    markup.append("end")
+
+    return markup
+
+
+@benchmark("text_embed.set_text", "lines", "widgets", "width", "wrap", "align", "wide")
+def text_embed_set_text(lines, widgets, width, wrap, align, wide):
+    """Widget substitution and setting of the text markup."""
+    markup = make_markup(lines, widgets, width, wide)
+    text_embed = TextEmbed("", align, wrap)
+
+    return lambda: text_embed.set_text(markup)
+
+
+@benchmark(
+    "text_embed.set_text.compiled", "lines", "widgets", "width", "wrap", "align", "wide"
+)
+def text_embed_set_text_compiled(lines, widgets, width, wrap, align, wide):
+    """Setting of a compiled markup, compiled beforehand."""
+    markup = CompiledMarkup(make_markup(lines, widgets, width, wide))
+    text_embed = TextEmbed("", align, wrap)
+
+    return lambda: text_embed.set_text(markup)
+
+
+@benchmark(
+    "text_embed.render.cold", "lines", "widgets", "width", "wrap", "align", "wide"
+)
+def text_embed_render_cold(lines, widgets, width, wrap, align, wide):
+    """Render right after the text is set i.e including layout."""
+    markup = make_markup(lines, widgets, width, wide)
+    text_embed = TextEmbed("", align, wrap)
+
+    def run():
+        TextEmbed.layout_cache_clear()  # Otherwise, short texts are not laid out
+        text_embed.set_text(markup)
+        return text_embed.render((MAXCOL,))
+
+    return run
+
+
+@benchmark("text_embed.rows.cold", "lines", "widgets", "width")
+def text_embed_rows_cold(lines, widgets, width):
+    """Render of identical rows (one widget per line) right after their text is set."""
+    row = ["[ok]"]
+    for _ in range(widgets):
+        row += [" [", (width, None), "]"]
+    compiled = CompiledMarkup(row + [" status: idle"])
+    bound = [
+        compiled.bind([urwid.SolidFill(str(index % 10)) for index in range(widgets)])
+        for _ in range(lines)
+    ]
+    rows = [TextEmbed("") for _ in range(lines)]
+
+    def run():
+        for text_embed, markup in zip(rows, bound):
+            text_embed.set_text(markup)
+            text_embed.render((MAXCOL,))
+
+    return run
+
+
+@benchmark("text_embed.render", "lines", "widgets", "width", "wrap", "align", "wide")
+def text_embed_render(lines, widgets, width, wrap, align, wide):
+    """Uncached render with no change to the content or embedded widgets."""
+    text_embed = TextEmbed(make_markup(lines, widgets, width, wide), align, wrap)
+
+    def run():
+        text_embed._invalidate()
+        return text_embed.render((MAXCOL,))
+
+    return run
+
+
+@benchmark(
+    "text_embed.render.dirty", "lines", "widgets", "width", "wrap", "align", "wide"
+)
+def text_embed_render_dirty(lines, widgets, width, wrap, align, wide):
+    """Uncached render with every embedded widget changed.
+
+    Every line containing an embedded widget is composed again.
+    """
+    text_embed = TextEmbed(make_markup(lines, widgets, width, wide), align, wrap)
+    embedded = [widget for widget, _ in text_embed.embedded]
+
+    def run():
+        for widget in embedded:
+            widget._invalidate()
+        text_embed._invalidate()
+        return text_embed.render((MAXCOL,))
+
+    return run
+
+
+@benchmark("text_embed.content", "lines", "widgets", "width", "wrap", "align", "wide")
+def text_embed_content(lines, widgets, width, wrap, align, wide):
+    """Iteration over the content of a rendered canvas, as when drawn."""
+    canv = TextEmbed(make_markup(lines, widgets, width, wide), align, wrap).render(
+        (MAXCOL,)
+    )
+
+    def run():
+        for _ in canv.content():
+            pass
+        return canv
+
+    return run
+
+
+@benchmark("text_embed.render.tick", "lines", "widgets", "wrap", "align")
+def text_embed_render_tick(lines, widgets, wrap, align):
+    """Render after a single embedded widget is updated, without invalidating the
+    text widget.
+    """
+    clock = urwid.Text("00:00:00")
+    markup = make_markup(lines, widgets, 8, 0)
+    markup[-1:-1] = [(8, urwid.Filler(clock)), " "]
+    text_embed = TextEmbed(markup, align, wrap)
+    text_embed.render((MAXCOL,))
+    ticks = iter(range(sys.maxsize))
+
+    def run():
+        clock.set_text(f"{next(ticks) % 86400:08}")
+        return text_embed.render((MAXCOL,))
+
+    return run
+
+
+@benchmark("text_embed.append", "lines", "widgets")
+def text_embed_append(lines, widgets):
+    """Append of a line followed by a render, as when streaming into a log tail of
+    *lines* lines (see ``TextEmbed.max_lines``) filled by appending line by line.
+    """
+    # Twice as many lines as are kept, such that each line's widgets have been
+    # removed from the log tail by the time the line is appended again
+    chunks = [[]]
+    for element in make_markup(lines * 2, widgets, 8, 0)[:-1]:
+        chunks[-1].append(element)
+        if element == "\n":
+            chunks.append([])
+    chunks = itertools.cycle(chunks[:-1])
+    text_embed = TextEmbed("")
+    text_embed.max_lines = lines
+    for _ in range(lines):
+        text_embed.append(next(chunks))
+        text_embed.render((MAXCOL,))
+
+    def run():
+        text_embed.append(next(chunks))
+        return text_embed.render((MAXCOL,))
+
+    return run
+
+
+@benchmark("text_embed.viewport", "lines", "widgets", "wrap", "align")
+def text_embed_viewport(lines, widgets, wrap, align):
+    """Draw of a 20-row viewport of a list box, with deferred rendering."""
+    text_embed = TextEmbed(make_markup(lines, widgets, 8, 0), align, wrap)
+    text_embed.deferred_render = True
+    list_box = urwid.ListBox(urwid.SimpleFocusListWalker([text_embed]))
+    embedded = [widget for widget, _ in text_embed.embedded]
+
+    def run():
+        for widget in embedded:
+            widget._invalidate()
+        text_embed._invalidate()
+        canv = list_box.render((MAXCOL, 20))
+        for _ in canv.content():
+            pass
+        return canv
+
+    return run
+
+
+@benchmark("document_walker.startup", "lines", "widgets")
+def document_walker_startup(lines, widgets):
+    """Creation and first draw of a 20-row list box over a document of 100 times
+    *lines* lines.
+    """
+    text = "\n".join(
+        f"line {line} "
+        + " ".join(f"https://example.com/{index}" for index in range(widgets))
+        for line in range(lines * 100)
+    )
+    url_re = re.compile(r"https://\S+")
+
+    def parse(text):
+        return parse_text(
+            text,
+            [url_re],
+            lambda pattern, groups, span: (
+                len(groups[0]),
+                urwid.Filler(Hyperlink(groups[0])),
+            ),
+        )
+
+    def run():
+        TextEmbed.layout_cache_clear()  # Otherwise, the first chunk is not laid out
+        list_box = urwid.ListBox(DocumentWalker(text, parse))
+        canv = list_box.render((MAXCOL, 20))
+        for _ in canv.content():
+            pass
+        return canv
+
+    return run
+
+
+@benchmark("update_batcher.frame", "lines", "widgets")
+def update_batcher_frame(lines, widgets):
+    """A frame of 100 updates to each of 10 embedded live values: submission,
+    flush and render.
+    """
+    batcher = UpdateBatcher(0)
+    values = [LiveValue(0, batcher) for _ in range(10)]
+    markup = make_markup(lines, widgets, 8, 0)
+    for value in values:
+        markup[-1:-1] = [(8, urwid.Filler(value)), " "]
+    text_embed = TextEmbed(markup)
+    text_embed.render((MAXCOL,))
+    loop = asyncio.new_event_loop()
+
+    async def frame():
+        for tick in range(100):
+            for value in values:
+                value.update(tick)
+        batcher.flush()
+        return text_embed.render((MAXCOL,))
+
+    return lambda: loop.run_until_complete(frame())
+
+
+@benchmark("hyperlink.render", "width")
+def hyperlink_render(width):
+    """Uncached render of a hyperlink."""
+    hyperlink = Hyperlink("https://example.com/path/to/page", text="x" * width)
+
+    def run():
+        hyperlink._invalidate()
+        return hyperlink.render((width,))
+
+    return run
+
+
+@benchmark("parse_text", "lines", "patterns", "wide")
+def parse_text_trivial(lines, patterns, wide):
+    """Parsing of text, with trivial replacements."""
+    compiled = [re.compile(rf"tok{index}_\w+") for index in range(patterns)]
+    word = "漢字" if wide else "word"
+    text = "\n".join(
+        " ".join(f"tok{(line + index) % patterns}_{index} {word}" for index in range(6))
+        for line in range(lines)
+    )
+
+    return lambda: parse_text(text, compiled, lambda pattern, groups, span: groups[0])
+
+
+def make_markup_text(lines: int, patterns: int) -> Tuple[List[re.Pattern], str]:
+    """Returns up to 24 markup-like patterns and text containing matches of them."""
+    templates = (
+        r"\*\*(\w+)\*\*",
+        r"__(\w+)__",
+        r"~~(\w+)~~",
+        r"`(\w+)`",
+        r"\[(\w+)\]\((\S+?)\)",
+        r"https?://(\w+)\.(\w+)/(\S*)",
+        r"@(\w+)",
+        r"#(\d+)",
+    )
+    compiled = [
+        re.compile(template.replace("\\w", f"(?:{index}|\\w)", 1))
+        for index, template in zip(range(patterns), templates * 3)
+    ]
+    samples = (
+        "**bold**",
+        "__under__",
+        "~~strike~~",
+        "`code`",
+        "[link](https://x.y)",
+        "https://urwid.org/docs",
+        "@user",
+        "#123",
+    )
+    text = "\n".join(
+        " ".join(
+            ("plain words here", samples[(line + index) % len(samples)])[index % 2]
+            for index in range(8)
+        )
+        for line in range(lines)
+    )
+
+    return compiled, text
+
+
+@benchmark("parse_text.markup", "lines", "patterns")
+def parse_text_markup(lines, patterns):
+    """Parsing of text with up to 24 markup-like patterns, with groups."""
+    compiled, text = make_markup_text(lines, patterns)
+
+    return lambda: parse_text(text, compiled, lambda pattern, groups, span: groups[0])
+
+
+@benchmark("parse_cache.messages", "lines", "patterns")
+def parse_cache_messages(lines, patterns):
+    """Re-parsing of single-line messages via a warm cache of matches."""
+    compiled, text = make_markup_text(lines, patterns)
+    messages = text.split("\n")
+    cache = ParseCache(
+        compiled, lambda pattern, groups, span: groups[0], share_markup=False
+    )
+
+    def op():
+        for message in messages:
+            cache.parse(message)
+
+    op()
+
+    return op
+
+
+def iter_cases(names: List[str], quick: bool) -> Iterator[Tuple[str, dict]]:
+    for name in names:
+        _, params = BENCHMARKS[name]
+        default = {param: DEFAULTS[param] for param in params}
+        yield name, default
+        for param in params:
+            for value in SWEEPS[param][: 2 if quick else None]:
+                if value != DEFAULTS[param]:
+                    yield name, {**default, param: value}
+
+
+def case_id(name: str, params: dict) -> str:
+    return f"{name}[{','.join(f'{key}={value}' for key, value in params.items())}]"
+
+
+def count_shards(canv: Any) -> Tuple[Optional[int], Optional[int]]:
+    """Returns the number of shards and canvas views of a canvas, if any."""
+    if isinstance(canv, urwid.CompositeCanvas):
+        return len(canv.shards), sum(len(cviews) for _, cviews in canv.shards)
+    if isinstance(canv, urwid.Canvas):
+        return 1, 1
+    return None, None
+
+
+def measure(op: Callable[[], Any], repeat: int, min_time: float) -> float:
+    """Returns the best time per operation, in seconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        best = min(best, time.perf_counter() - start)
+
+    return best / number
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def run(args: argparse.Namespace) -> Dict[str, dict]:
+    results = {}
+    for name, params in iter_cases(args.benchmarks, args.quick):
+        setup, _ = BENCHMARKS[name]
+        op = setup(**params)
+        shards, cviews = count_shards(op())
+        seconds = measure(op, args.repeat, args.min_time)
+        result_id = case_id(name, params)
+        results[result_id] = {"time": seconds, "shards": shards, "cviews": cviews}
+        print(
+            f"{result_id:<84} {format_time(seconds):>10}"
+            + (f"  shards={shards} cviews={cviews}" if shards is not None else "")
+        )
+
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float):
+    """Prints a comparison of results against a baseline.
+
+    Returns:
+        The number of regressions i.e cases slower than the baseline by more than
+        *threshold* percent.
+    """
+    print(f"\nComparison with baseline (threshold: {threshold}%):")
+    regressions = 0
+    for result_id, result in results.items():
+        base = baseline.get(result_id)
+        if not base:
+            print(f"{result_id:<84} {'(new)':>10}")
+            continue
+        change = (result["time"] / base["time"] - 1) * 100
+        status = ""
+        if change > threshold:
+            status = "  SLOWER"
+            regressions += 1
+        elif change < -threshold:
+            status = "  faster"
+        if result["shards"] != base["shards"]:
+            status += f"  shards: {base['shards']} -> {result['shards']}"
+        print(f"{result_id:<84} {change:>+9.1f}%{status}")
+    print(f"\n{regressions} regression(s)")
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of the hot paths of urWIDgets.",
+        epilog="Sweeps: "
+        + "; ".join(
+            f"{key}={','.join(map(str, values))}" for key, values in SWEEPS.items()
+        ),
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="BENCHMARK",
+        help="Benchmarks to run (default: all). See '--list'.",
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List the benchmarks and exit"
+    )
+    parser.add_argument(
+        "-q",
+        "--quick",
+        action="store_true",
+        help="Sweep only the first two values of each parameter",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of timed repeats of each case; the best is reported "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "-t",
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="Minimum duration (in seconds) of each timed repeat "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "-s", "--save", metavar="FILE", help="Save the results to a JSON file"
+    )
+    parser.add_argument(
+        "-c",
+        "--compare",
+        metavar="FILE",
+        help="Compare the results with a baseline saved with '--save'; the exit "
+        "status is non-zero if any case is slower beyond the threshold",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Percentage slowdown considered a regression (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (setup, params) in BENCHMARKS.items():
+            print(f"{name:<28} {setup.__doc__.splitlines()[0]}")
+            print(f"{'':<28} params: {', '.join(params)}")
+        return 0
+
+    unknown = set(args.benchmarks).difference(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+    args.benchmarks = args.benchmarks or list(BENCHMARKS)
+    if args.repeat < 1:
+        parser.error("'--repeat' must be positive")
+
+    print(
+        f"urwidgets {urwidgets.__version__}, urwid {urwid.__version__}, "
+        f"{platform.python_implementation()} {platform.python_version()}\n"
+    )
+    results = run(args)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(
+                {
+                    "meta": {
+                        "urwidgets": urwidgets.__version__,
+                        "urwid": urwid.__version__,
+                        "python": platform.python_version(),
+                    },
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        if compare(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Memory benchmarks of urWIDgets.
+
+Everything is rendered headless (no terminal or screen is required) and the
+benchmarks cover the working tree (i.e ``src/``), not any installed version.
+
+For every benchmark, the memory allocated (as traced by :py:mod:`tracemalloc`) by
+creating many items and kept alive along with them is reported per item. Inputs
+(e.g URIs and pre-built widgets) are created before tracing starts.
+
+``benchmarks/memory-baseline.json`` holds the results from before the memory layout
+of hyperlinks and embedded widget tables was compacted; compare against it with
+``python benchmarks/memory.py -c benchmarks/memory-baseline.json``. The figures
+depend on the versions of Python and urwid (recorded in the file).
+
+Run ``python benchmarks/memory.py --help`` for usage.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from os.path import abspath, dirname, join
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), "src"))
+
+import urwid  # noqa: E402
+
+import urwidgets  # noqa: E402
+from urwidgets import Hyperlink, TextEmbed  # noqa: E402
+
+# The benchmarks; {name: (setup, description)}
+BENCHMARKS: Dict[str, Tuple[Callable[[int], Callable[[], Any]], str]] = {}
+
+WIDTH = 26  # of each embedded widget, the length of the URIs
+
+
+def benchmark(name: str):
+    """Registers a benchmark.
+
+    The decorated function is called with the number of items and should return a
+    function that creates them and returns anything that keeps them alive.
+    """
+
+    def register(setup: Callable[[int], Callable[[], Any]]):
+        BENCHMARKS[name] = (setup, setup.__doc__.splitlines()[0])
+        return setup
+
+    return register
+
+
+def make_uris(n: int) -> List[str]:
+    return [f"https://example.com/{index:06}" for index in range(n)]
+
+
+@benchmark("hyperlink")
+def hyperlink(n):
+    """Hyperlinks, created but not rendered."""
+    uris = make_uris(n)
+
+    return lambda: [Hyperlink(uri) for uri in uris]
+
+
+@benchmark("hyperlink.rendered")
+def hyperlink_rendered(n):
+    """Hyperlinks along with their (cached) canvases."""
+    uris = make_uris(n)
+
+    def create():
+        links = [Hyperlink(uri) for uri in uris]
+        return links, [link.render((WIDTH,)) for link in links]
+
+    return create
+
+
+@benchmark("text_embed.embedded")
+def text_embed_embedded(n):
+    """Embedded widgets of a widget, excluding the widgets themselves."""
+    markup = []
+    for uri in make_uris(n):
+        markup += [(WIDTH, urwid.Filler(Hyperlink(uri))), " \n"]
+
+    return lambda: TextEmbed(markup)
+
+
+@benchmark("text_embed.links")
+def text_embed_links(n):
+    """Hyperlinks embedded in a rendered widget, including everything."""
+    uris = make_uris(n)
+
+    def create():
+        markup = []
+        for uri in uris:
+            markup += [(WIDTH, urwid.Filler(Hyperlink(uri))), " \n"]
+        widget = TextEmbed(markup)
+        return widget, widget.render((80,))
+
+    return create
+
+
+def measure(setup: Callable[[int], Callable[[], Any]], n: int) -> float:
+    """Returns the memory (in bytes) allocated and kept alive per item."""
+    create = setup(n)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        items = create()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del items
+
+    return size / n
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float]) -> None:
+    """Prints a comparison of results against a baseline."""
+    print("\nComparison with baseline:")
+    for name, size in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<28} {'(new)':>10}")
+            continue
+        print(f"{name:<28} {base:>8.0f} B -> {size:>6.0f} B {(size / base - 1):>+7.1%}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Memory benchmarks of urWIDgets.")
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="BENCHMARK",
+        help="Benchmarks to run (default: all). See '--list'.",
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List the benchmarks and exit"
+    )
+    parser.add_argument(
+        "-n",
+        "--items",
+        type=int,
+        default=20_000,
+        help="Number of items created per benchmark (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-s", "--save", metavar="FILE", help="Save the results to a JSON file"
+    )
+    parser.add_argument(
+        "-c",
+        "--compare",
+        metavar="FILE",
+        help="Compare the results with a baseline saved with '--save'",
+    )
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, description) in BENCHMARKS.items():
+            print(f"{name:<28} {description}")
+        return 0
+
+    unknown = set(args.benchmarks).difference(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+    if args.items < 1:
+        parser.error("'--items' must be positive")
+
+    print(
+        f"urwidgets {urwidgets.__version__}, urwid {urwid.__version__}, "
+        f"{platform.python_implementation()} {platform.python_version()}\n"
+    )
+    results = {}
+    for name in args.benchmarks or BENCHMARKS:
+        results[name] = size = measure(BENCHMARKS[name][0], args.items)
+        print(f"{name:<28} {size:>8.0f} B/item")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(
+                {
+                    "meta": {
+                        "urwidgets": urwidgets.__version__,
+                        "urwid": urwid.__version__,
+                        "python": platform.python_version(),
+                        "items": args.items,
+                    },
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)["results"])
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,9 +5,20 @@ A collection of widgets for urwid (https://urwid.org)
 """
 
 __all__ = (
+    "iter_parse_text",
     "parse_text",
+    "CompiledMarkup",
+    "DocumentWalker",
+    "ParseCache",
+    "PatternSet",
     "Hyperlink",
+    "HyperlinkCanvas",
+    "HyperlinkFactory",
+    "HyperlinkIDAllocator",
+    "LiveValue",
     "TextEmbed",
+    "TextParser",
+    "UpdateBatcher",
     # Type Aliases
     "Markup",
     "StringMarkup",
@@ -20,17 +31,29 @@ __all__ = (
 )
 __author__ = "Toluwaleke Ogundipe"
 
-from .hyperlink import Hyperlink
+from .document import DocumentWalker
+from .hyperlink import (
+    Hyperlink,
+    HyperlinkCanvas,
+    HyperlinkFactory,
+    HyperlinkIDAllocator,
+)
+from .live import LiveValue, UpdateBatcher
 from .text_embed import (
+    CompiledMarkup,
     DisplayAttribute,
     ListMarkup,
     Markup,
     NormalTupleMarkup,
+    ParseCache,
+    PatternSet,
     StringMarkup,
     TextEmbed,
+    TextParser,
     TupleMarkup,
     WidgetListMarkup,
     WidgetTupleMarkup,
+    iter_parse_text,
     parse_text,
 )
 
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+__all__ = ("DocumentWalker",)
+
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional, Tuple, Type, Union
+
+import urwid
+
+from .text_embed import ListMarkup, Markup, TextEmbed
+
+# NOTE: Any new "private" attribute of any subclass of an urwid class should be
+# prepended with "_uw" to avoid clashes with names used by urwid itself.
+
+
+class DocumentWalker(urwid.ListWalker):
+    r"""A list walker that displays a long document in chunks of lines.
+
+    Args:
+        content: The document, as either of:
+
+          - a string, which may be parsed into text/widget markup by *parser*.
+          - a text/widget markup list, in which case line breaks within nested lists
+            do not end chunks.
+
+        parser: A callable that converts the text of a chunk into a text/widget
+          markup, if *content* is a string, e.g
+          ``lambda text: parse_text(text, patterns, repl)``. If ``None``, the text is
+          used as-is.
+        chunk_lines: The number of lines per chunk (except the last). Line breaks
+          separating chunks are not part of any chunk.
+        max_chunks: The maximum number of chunk widgets kept at a time. The least
+          recently used are discarded first and created again when needed.
+        max_chars: The maximum total number of characters of the texts (see
+          :py:attr:`urwid.Text.text`) of the chunk widgets kept at a time. If
+          ``None``, only *max_chunks* applies.
+        text_embed_cls: The class of the chunk widgets.
+        align: The text alignment of the chunk widgets.
+        wrap: The wrap mode of the chunk widgets.
+
+    Raises:
+        TypeError: An argument is of an unexpected type.
+        ValueError: *chunk_lines*, *max_chunks* or *max_chars* is not positive.
+
+    Every chunk is displayed by a :py:class:`TextEmbed` widget and the positions are
+    the indexes of the chunks. The document is split into chunks, and chunks are
+    parsed, laid out and rendered, only as they're needed (e.g as they scroll into
+    view within a :py:class:`urwid.ListBox`). Hence, the time taken to display the
+    start of a document and the memory in use are mostly independent of the length
+    of the document.
+
+    *max_chunks* bounds the number of chunk widgets, not the memory they use, which
+    depends on the lengths of their lines and their embedded widgets. *max_chars*
+    bounds the memory more closely, by the total length of the texts; chunks are
+    discarded until both limits are met, except the most recently used chunk.
+
+    NOTE:
+        - Every chunk is parsed independently. Hence, matches of patterns spanning
+          the boundaries of chunks are not found.
+        - When a discarded chunk widget is created again, the embedded widgets of
+          markup list content are reused but string content is parsed again (by
+          *parser*), which may create new widgets. Either way, any state of the
+          discarded widget (e.g of its embedded widgets, for string content) is lost.
+
+    .. collapse:: Example:
+
+        >>> import re
+        >>> from urwid import Filler, ListBox
+        >>> from urwidgets import DocumentWalker, Hyperlink, parse_text
+        >>>
+        >>> URL_RE = re.compile(r"https?://\S+")
+        >>>
+        >>> def link(pattern, groups, span):
+        ...     return len(groups[0]), Filler(Hyperlink(groups[0]))
+        ...
+        >>> with open("long_document.txt") as file:
+        ...     walker = DocumentWalker(
+        ...         file.read(), lambda text: parse_text(text, [URL_RE], link)
+        ...     )
+        ...
+        >>> list_box = ListBox(walker)
+    """
+
+    def __init__(
+        self,
+        content: Union[str, ListMarkup],
+        parser: Optional[Callable[[str], Markup]] = None,
+        *,
+        chunk_lines: int = 50,
+        max_chunks: int = 32,
+        max_chars: Optional[int] = None,
+        text_embed_cls: Type[TextEmbed] = TextEmbed,
+        align: str = "left",
+        wrap: str = "space",
+    ) -> None:
+        if not isinstance(content, (str, list)):
+            raise TypeError(
+                f"Invalid type for 'content' (got: {type(content).__name__!r})"
+            )
+        if parser is not None and not isinstance(content, str):
+            raise TypeError("'parser' is only supported with string content")
+        for name, value in (
+            ("chunk_lines", chunk_lines),
+            ("max_chunks", max_chunks),
+            ("max_chars", max_chars),
+        ):
+            if value is None and name == "max_chars":
+                continue
+            if not isinstance(value, int):
+                raise TypeError(
+                    f"Invalid type for {name!r} (got: {type(value).__name__!r})"
+                )
+            if value <= 0:
+                raise ValueError(f"Invalid value for {name!r} (got: {value})")
+
+        self._uw_content = content
+        self._uw_parser = parser
+        self._uw_chunk_lines = chunk_lines
+        self._uw_max_chunks = max_chunks
+        self._uw_max_chars = max_chars
+        self._uw_text_embed_cls = text_embed_cls
+        self._uw_align = align
+        self._uw_wrap = wrap
+        # The start of every chunk found so far, as an offset into the text or an
+        # `(element_index, offset)` tuple into the markup list, followed by the end of
+        # the content once the last chunk is found
+        self._uw_bounds = [0 if isinstance(content, str) else (0, 0)]
+        self._uw_complete = False
+        # LRU; {position: (widget, length of its text when created)}
+        self._uw_widgets = OrderedDict()
+        self._uw_n_chars = 0  # The sum of the text lengths in `_uw_widgets`
+        self.focus = 0
+
+    def __getitem__(self, position: int) -> TextEmbed:
+        if not isinstance(position, int) or position < 0:
+            raise IndexError(position)
+        entry = self._uw_widgets.get(position)
+        if entry is None:
+            widget = self._uw_text_embed_cls(
+                self._uw_get_chunk(position), self._uw_align, self._uw_wrap
+            )
+            self._uw_widgets[position] = (widget, len(widget.text))
+            self._uw_n_chars += len(widget.text)
+            self._uw_discard_widgets()
+        else:
+            self._uw_widgets.move_to_end(position)
+            widget = entry[0]
+
+        return widget
+
+    def next_position(self, position: int) -> int:
+        if not self._uw_find_chunk(position + 1):
+            raise IndexError(position + 1)
+        return position + 1
+
+    def prev_position(self, position: int) -> int:
+        if position <= 0:
+            raise IndexError(position - 1)
+        return position - 1
+
+    def positions(self, reverse: bool = False) -> Iterator[int]:
+        if reverse:
+            while not self._uw_complete:
+                self._uw_find_chunk(len(self._uw_bounds))
+            return iter(range(self._uw_n_chunks() - 1, -1, -1))
+
+        def forward() -> Iterator[int]:
+            position = 0
+            while self._uw_find_chunk(position):
+                yield position
+                position += 1
+
+        return forward()
+
+    def set_focus(self, position: int) -> None:
+        if not isinstance(position, int) or not self._uw_find_chunk(position):
+            raise IndexError(position)
+        self.focus = position
+        self._modified()
+
+    def _uw_discard_widgets(self) -> None:
+        """Discards the least recently used chunk widgets in excess of the limits,
+        except the most recently used.
+        """
+        widgets = self._uw_widgets
+        max_chars = self._uw_max_chars
+        while len(widgets) > 1 and (
+            len(widgets) > self._uw_max_chunks
+            or (max_chars is not None and self._uw_n_chars > max_chars)
+        ):
+            self._uw_n_chars -= widgets.popitem(last=False)[1][1]
+
+    def _uw_find_chunk(self, position: int) -> bool:
+        """Splits the content up to a given chunk.
+
+        Args:
+            position: The index of the chunk.
+
+        Returns:
+            ``True`` if the chunk exists. Otherwise, ``False``.
+        """
+        if position < 0:
+            return False
+        bounds = self._uw_bounds
+        while len(bounds) <= position + 1 and not self._uw_complete:
+            if isinstance(self._uw_content, str):
+                end = self._uw_find_text_chunk_end(bounds[-1])
+            else:
+                end = self._uw_find_markup_chunk_end(bounds[-1])
+            if end is None:
+                self._uw_complete = True
+                if isinstance(self._uw_content, str):
+                    # As if the content ended with a line break
+                    bounds.append(len(self._uw_content) + 1)
+                else:
+                    bounds.append((len(self._uw_content), 0))
+            else:
+                bounds.append(end)
+
+        return position < self._uw_n_chunks()
+
+    def _uw_find_markup_chunk_end(
+        self, start: Tuple[int, int]
+    ) -> Optional[Tuple[int, int]]:
+        """Returns the start of the chunk after the one starting at *start* in the
+        markup list or ``None`` if it's the last chunk.
+        """
+        content = self._uw_content
+        index, offset = start
+        n_lines = self._uw_chunk_lines
+        while index < len(content):
+            text = get_splittable_text(content[index])
+            if text is not None:
+                line_break = "\n" if isinstance(text, str) else b"\n"
+                while True:
+                    offset = text.find(line_break, offset)
+                    if offset == -1:
+                        break
+                    offset += 1
+                    n_lines -= 1
+                    if not n_lines:
+                        return index, offset
+            index += 1
+            offset = 0
+
+        return None
+
+    def _uw_find_text_chunk_end(self, start: int) -> Optional[int]:
+        """Returns the start of the chunk after the one starting at *start* in the
+        text or ``None`` if it's the last chunk.
+        """
+        text = self._uw_content
+        for _ in range(self._uw_chunk_lines):
+            start = text.find("\n", start)
+            if start == -1:
+                return None
+            start += 1
+
+        return start
+
+    def _uw_get_chunk(self, position: int) -> Markup:
+        """Returns the markup of a chunk.
+
+        Args:
+            position: The index of the chunk.
+
+        Raises:
+            IndexError: The chunk doesn't exist.
+        """
+        if not self._uw_find_chunk(position):
+            raise IndexError(position)
+        start, end = self._uw_bounds[position : position + 2]
+        content = self._uw_content
+
+        if isinstance(content, str):
+            text = content[start : end - 1]  # Excluding the separating line break
+            return text if self._uw_parser is None else self._uw_parser(text)
+
+        start_index, start_offset = start
+        end_index, end_offset = end
+        markup = []
+        for index in range(start_index, min(end_index + 1, len(content))):
+            element = content[index]
+            # Excluding the separating line break
+            stop = end_offset - 1 if index == end_index else None
+            offset = start_offset if index == start_index else 0
+            if offset or stop is not None:
+                if isinstance(element, tuple):
+                    element = (element[0], element[1][offset:stop])
+                else:
+                    element = element[offset:stop]
+            markup.append(element)
+
+        return markup
+
+    def _uw_n_chunks(self) -> int:
+        """Returns the number of chunks found so far."""
+        return len(self._uw_bounds) - self._uw_complete
+
+
+# Private
+
+
+def get_splittable_text(element: Markup) -> Union[None, str, bytes]:
+    """Returns the text of a markup element that may be split at line breaks, if
+    any.
+    """
+    if isinstance(element, (str, bytes)):
+        return element
+    if (
+        isinstance(element, tuple)
+        and len(element) == 2
+        and not isinstance(element[0], int)
+        and isinstance(element[1], (str, bytes))
+    ):
+        return element[1]
+    return None
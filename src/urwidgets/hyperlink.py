@@ -1,11 +1,30 @@
 from __future__ import annotations
 
-__all__ = ("Hyperlink",)
-
-from typing import Generator, List, Optional, Tuple
+__all__ = ("Hyperlink", "HyperlinkCanvas", "HyperlinkFactory", "HyperlinkIDAllocator")
+
+from collections import deque
+from functools import lru_cache
+from threading import Lock
+from time import perf_counter
+from typing import (
+    ClassVar,
+    Deque,
+    Dict,
+    FrozenSet,
+    Generator,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+)
+from weakref import WeakValueDictionary
 
 import urwid
+from urwid.util import trim_text_attr_cs
 
+from . import instrumentation
 from .text_embed import DisplayAttribute
 
 # NOTE: Any new "private" attribute of any subclass of an urwid class should be
@@ -21,6 +40,174 @@ END = f"{OSC}8;;{ST}".encode()
 valid_byte_range = range(32, 127)
 
 
+class HyperlinkIDAllocator:
+    """An allocator of ``OSC 8`` hyperlink IDs.
+
+    Args:
+        max_ids: The maximum number of distinct IDs allocated at a time. If ``None``,
+          the number is unlimited.
+        per_uri: If ``True``, all hyperlinks with the same URI share the same ID, for
+          as long as any of them holds it. Otherwise, every hyperlink gets a
+          distinct ID, as long as *max_ids* is not exceeded.
+
+    Raises:
+        TypeError: An argument is of an unexpected type.
+        ValueError: *max_ids* is not positive.
+
+    IDs are integers from zero up to (but excluding) *max_ids* and released IDs are
+    reused before new ones are allocated. If *max_ids* IDs are already allocated
+    when an ID is requested, an allocated ID is shared (in a round-robin manner),
+    which should only make hyperlinks with the same URI and ID be treated as one
+    by terminal emulators.
+
+    Allocation and release are thread-safe and take constant time.
+
+    The ID of a hyperlink canvas is released when the canvas is garbage-collected,
+    via :py:meth:`release_later` (hence, applied by the next allocation) or
+    immediately, via :py:meth:`HyperlinkCanvas.release_id`.
+
+    The allocator is pluggable i.e :py:meth:`acquire` and :py:meth:`release` may be
+    overriden on a subclass. See :py:attr:`Hyperlink.ID_ALLOCATOR`. An override of
+    :py:meth:`acquire` should call :py:meth:`release_pending` first.
+    """
+
+    def __init__(self, max_ids: Optional[int] = None, per_uri: bool = False) -> None:
+        if max_ids is not None:
+            if not isinstance(max_ids, int):
+                raise TypeError(
+                    f"Invalid type for 'max_ids' (got: {type(max_ids).__name__!r})"
+                )
+            if max_ids <= 0:
+                raise ValueError(f"Invalid maximum number of IDs (got: {max_ids})")
+
+        self._max_ids = max_ids
+        self._per_uri = bool(per_uri)
+        self._lock = Lock()
+        self._next_id = 0
+        self._free_ids = []  # Released IDs, reused in LIFO order
+        self._id_refs: Dict[int, int] = {}  # {id: number of holders, ...}
+        self._uri_ids: Dict[str, List[int]] = {}  # {uri: [id, number of holders]}
+        self._next_shared_id = 0
+        self._high_water = 0
+        self._n_acquired = 0
+        self._n_reused = 0
+        # `(id, uri)` of IDs to be released, see `release_later()`
+        self._pending_releases: Deque[Tuple[int, str]] = deque()
+
+    def acquire(self, uri: str) -> int:
+        """Allocates an ID for a hyperlink.
+
+        Args:
+            uri: The target of the hyperlink.
+
+        Returns:
+            The allocated ID.
+
+        Pending releases (see :py:meth:`release_later`) are applied first.
+        """
+        self.release_pending()
+        with self._lock:
+            self._n_acquired += 1
+            if self._per_uri:
+                uri_id = self._uri_ids.get(uri)
+                if uri_id:
+                    uri_id[1] += 1
+                    self._n_reused += 1
+                    return uri_id[0]
+
+            id_refs = self._id_refs
+            if self._free_ids:
+                id = self._free_ids.pop()
+                self._n_reused += 1
+                id_refs[id] = 1
+            elif self._max_ids is None or self._next_id < self._max_ids:
+                id = self._next_id
+                self._next_id += 1
+                id_refs[id] = 1
+            else:
+                id = self._next_shared_id
+                self._next_shared_id = (id + 1) % self._max_ids
+                self._n_reused += 1
+                id_refs[id] += 1
+            self._high_water = max(self._high_water, len(id_refs))
+            if self._per_uri:
+                self._uri_ids[uri] = [id, 1]
+
+            return id
+
+    def release(self, id: int, uri: str) -> None:
+        """Releases an ID allocated for a hyperlink.
+
+        Args:
+            id: The ID, as returned by :py:meth:`acquire`.
+            uri: The target of the hyperlink, as given to :py:meth:`acquire`.
+        """
+        with self._lock:
+            if self._per_uri:
+                uri_id = self._uri_ids[uri]
+                uri_id[1] -= 1
+                if uri_id[1]:
+                    return
+                del self._uri_ids[uri]
+
+            id_refs = self._id_refs
+            id_refs[id] -= 1
+            if not id_refs[id]:
+                del id_refs[id]
+                self._free_ids.append(id)
+
+    def release_later(self, id: int, uri: str) -> None:
+        """Schedules the release of an ID allocated for a hyperlink.
+
+        Args:
+            id: The ID, as returned by :py:meth:`acquire`.
+            uri: The target of the hyperlink, as given to :py:meth:`acquire`.
+
+        The release is applied by the next call to :py:meth:`acquire` or
+        :py:meth:`release_pending` (or access to :py:attr:`stats`), in any thread.
+
+        Unlike :py:meth:`release`, this doesn't acquire any lock; hence, it's safe to
+        call from finalizers (e.g ``__del__()``), which may run in the middle of an
+        allocation or release in the same thread.
+        """
+        self._pending_releases.append((id, uri))
+
+    def release_pending(self) -> None:
+        """Applies all pending releases (see :py:meth:`release_later`)."""
+        pending = self._pending_releases
+        while pending:
+            try:
+                id, uri = pending.popleft()
+            except IndexError:  # Popped by another thread
+                break
+            self.release(id, uri)
+
+    def _get_stats(self) -> _IDStats:
+        self.release_pending()
+        with self._lock:
+            return _IDStats(
+                len(self._id_refs), self._high_water, self._n_acquired, self._n_reused
+            )
+
+    stats = property(
+        _get_stats,
+        doc="""Usage statistics of the allocator.
+
+        :type: Tuple[int, int, int, int]
+
+        A named tuple with the fields:
+
+        - ``live``: the number of distinct IDs currently allocated
+        - ``high_water``: the maximum number of distinct IDs ever allocated at a time
+        - ``acquired``: the number of allocations
+        - ``reused``: the number of allocations that reused an ID that was either
+          released or is shared
+
+        and the property ``reuse_rate``, the ratio of ``reused`` to ``acquired``.
+        """,
+    )
+
+
 class Hyperlink(urwid.WidgetWrap):
     """A widget containing hyperlinked text.
 
@@ -100,7 +287,22 @@ class Hyperlink(urwid.WidgetWrap):
           A widget that enables the use of hyperlinks amidst normal text.
     """
 
-    no_cache = ["render"]
+    ID_ALLOCATOR: ClassVar[HyperlinkIDAllocator] = HyperlinkIDAllocator()
+    """The allocator of ``OSC 8`` hyperlink IDs for the canvases of hyperlinks.
+
+    May be replaced with an instance of :py:class:`HyperlinkIDAllocator` (or a
+    subclass of it), either on this class or on a subclass, as in::
+
+       Hyperlink.ID_ALLOCATOR = HyperlinkIDAllocator(max_ids=1024)
+
+    The replacement only applies to canvases rendered afterwards. IDs allocated by
+    the previous allocator are released to it.
+
+    NOTE:
+        The canvases of hyperlinks rendered at the same time should get their IDs
+        from the same allocator, so that IDs are not shared between distinct
+        hyperlinks (with the same URI).
+    """
 
     def __init__(
         self,
@@ -108,37 +310,107 @@ class Hyperlink(urwid.WidgetWrap):
         attr: DisplayAttribute = None,
         text: Optional[str] = None,
     ) -> None:
-        self._uw_set_uri(uri)
-        super().__init__(urwid.Text((_Attr(attr), ""), "left", "ellipsis"))
-        self._uw_set_text(uri if text is None else text)
+        check_uri(uri)
+        if text is None:
+            text = uri
+        else:
+            check_text(text)
+        self._uw_uri = uri
+        self._uw_attr = attr
+        self._uw_text = get_ascii_bytes(text) or text
+        # The wrapped text widget is only used to lay out the text when it's not
+        # printable ASCII or doesn't fit the render width, hence it's created only
+        # when first required (see `_wrapped_widget`)
+        self._uw_wrapped = None
+        # Bypasses `urwid.WidgetWrap.__init__()` which requires the wrapped widget
+        super(urwid.WidgetWrap, self).__init__()
+
+    def _uw_get_wrapped_widget(self) -> urwid.Text:
+        wrapped = self._uw_wrapped
+        if wrapped is None:
+            wrapped = self._uw_wrapped = urwid.Text(
+                (_Attr(self._uw_attr), self.text), "left", "ellipsis"
+            )
+        return wrapped
 
-    def render(self, size: Tuple[int,], focus: bool = False) -> urwid.HyperlinkCanvas:
-        return HyperlinkCanvas(self._uw_uri, self._w.render(size, focus))
+    _wrapped_widget = property(
+        _uw_get_wrapped_widget,
+        lambda self, widget: setattr(self, "_uw_wrapped", widget),
+    )
+
+    def pack(
+        self, size: Optional[Tuple[int,]] = None, focus: bool = False
+    ) -> Tuple[int, int]:
+        text = self._uw_text
+        if isinstance(text, bytes) and (not size or len(text) <= size[0]):
+            return len(text), 1
+        return self._w.pack(size, focus)
+
+    def render(self, size: Tuple[int,], focus: bool = False) -> HyperlinkCanvas:
+        if instrumentation.enabled:
+            start_time = perf_counter()
+            canv = self._uw_render(size, focus)
+            instrumentation.emit("hyperlink.render", self, perf_counter() - start_time)
+            return canv
+
+        return self._uw_render(size, focus)
+
+    def rows(self, size: Tuple[int,], focus: bool = False) -> int:
+        return 1
+
+    def selectable(self) -> bool:
+        return False
+
+    def sizing(self) -> FrozenSet[urwid.widget.Sizing]:
+        return urwid.Text._sizing
+
+    def _uw_render(self, size: Tuple[int,], focus: bool) -> HyperlinkCanvas:
+        text = self._uw_text
+        if isinstance(text, bytes) and (not size or len(text) <= size[0]):
+            # The text is not wrapped and every byte is a column; hence, the layout
+            # is trivial
+            maxcol = size[0] if size else len(text)
+            link_cols = len(text)
+        else:
+            text_canv = self._w.render(size, focus)
+            maxcol = text_canv.cols()
+            text = b""
+            link_cols = 0
+            # Whitespace or zero-width text renders to no column when packed, and to
+            # only padding otherwise
+            if maxcol:
+                (attr, _, link_text), *padding = next(text_canv.content())
+                if isinstance(attr, _Attr):
+                    text = link_text
+                    link_cols = maxcol - sum(
+                        len(pad_text) for _, _, pad_text in padding
+                    )
+
+        return HyperlinkCanvas(
+            self._uw_uri, text, link_cols, maxcol, self._uw_attr, self.ID_ALLOCATOR
+        )
 
     def _uw_set_text(self, text: str):
-        if not isinstance(text, str):
-            raise TypeError(f"Invalid type for 'text' (got: {type(text).__name__!r})")
-        if not text:
-            raise ValueError("Hyperlink text is empty")
-        if "\n" in text:  # Other multi-line whitespace characters are escaped by urwid
-            raise ValueError(f"Multi-line text (got: {text!r})")
-        self._w.set_text((self._w.attrib[0][0], text))
+        check_text(text)
+        self._uw_text = get_ascii_bytes(text) or text
+        if self._uw_wrapped is not None:
+            self._uw_wrapped.set_text((_Attr(self._uw_attr), text))
+        self._invalidate()
 
     def _uw_set_uri(self, uri: str):
-        if not isinstance(uri, str):
-            raise TypeError(f"Invalid type for 'uri' (got: {type(uri).__name__!r})")
-        if not uri:
-            raise ValueError("URI is empty")
-        invalid_bytes = frozenset(uri.encode()).difference(valid_byte_range)
-        if invalid_bytes:
-            raise ValueError(
-                f"Invalid byte '\\x{tuple(invalid_bytes)[0]:02x}' found in URI: {uri!r}"
-            )
+        check_uri(uri)
         self._uw_uri = uri
+        self._invalidate()
+
+    def _uw_set_attrib(self, attrib: DisplayAttribute):
+        self._uw_attr = attrib
+        if self._uw_wrapped is not None:
+            self._uw_wrapped.set_text((_Attr(attrib), self.text))
+        self._invalidate()
 
     attrib = property(
-        lambda self: self._w.attrib[0][0].attr,
-        lambda self, attrib: self._w.set_text((_Attr(attrib), self._w.text)),
+        lambda self: self._uw_attr,
+        _uw_set_attrib,
         doc="""The display attirbute of the hyperlink.
 
         :type: DisplayAttribute
@@ -152,7 +424,11 @@ class Hyperlink(urwid.WidgetWrap):
     )
 
     text = property(
-        lambda self: self._w.text,
+        lambda self: (
+            self._uw_text.decode()
+            if isinstance(self._uw_text, bytes)
+            else self._uw_text
+        ),
         _uw_set_text,
         doc="""The alternate text of the hyperlink.
 
@@ -182,23 +458,144 @@ class Hyperlink(urwid.WidgetWrap):
     )
 
 
+class HyperlinkFactory:
+    """A factory of :py:class:`Hyperlink` widgets, for link-heavy content.
+
+    Args:
+        intern: If ``True``, hyperlinks with the same URI, display attribute and
+          text are the same widget, for as long as any of them is referenced.
+        hyperlink_cls: The class of the hyperlinks created, :py:class:`Hyperlink` or
+          a subclass of it.
+
+    Raises:
+        TypeError: *hyperlink_cls* is not :py:class:`Hyperlink` or a subclass of it.
+
+    Every URI is validated only once (across all factories and hyperlinks), for as
+    long as it's frequently used.
+
+    With interning, a hyperlink (including its canvases) is shared wherever it's
+    used. Hence, such hyperlinks should not be modified and are treated as one
+    by terminal emulators i.e highlighted together on mouse hover. Interning is
+    skipped for hyperlinks with an unhashable display attribute.
+
+    .. collapse:: Example:
+
+        >>> from urwidgets import HyperlinkFactory
+        >>>
+        >>> factory = HyperlinkFactory(intern=True)
+        >>> links = factory.build(
+        ...     [("https://urwid.org",), ("https://urwid.org", "bold", "urwid")]
+        ... )
+        >>> links[0] is factory("https://urwid.org")
+        True
+    """
+
+    def __init__(
+        self, intern: bool = False, hyperlink_cls: Type[Hyperlink] = None
+    ) -> None:
+        if hyperlink_cls is None:
+            hyperlink_cls = Hyperlink
+        elif not (
+            isinstance(hyperlink_cls, type) and issubclass(hyperlink_cls, Hyperlink)
+        ):
+            raise TypeError(f"Invalid hyperlink class (got: {hyperlink_cls!r})")
+
+        self._hyperlink_cls = hyperlink_cls
+        self._interned = WeakValueDictionary() if intern else None
+
+    def __call__(
+        self, uri: str, attr: DisplayAttribute = None, text: Optional[str] = None
+    ) -> Hyperlink:
+        """Creates a hyperlink or returns an interned one.
+
+        Args:
+            uri: See :py:class:`Hyperlink`.
+            attr: See :py:class:`Hyperlink`.
+            text: See :py:class:`Hyperlink`.
+
+        Returns:
+            A hyperlink.
+
+        Raises:
+            TypeError: An argument is of an unexpected type.
+            ValueError: An argument is of an expected type but of an unexpected value
+        """
+        interned = self._interned
+        if interned is None:
+            return self._hyperlink_cls(uri, attr, text)
+
+        key = (uri, attr, uri if text is None else text)
+        try:
+            hyperlink = interned.get(key)
+        except TypeError:  # Unhashable display attribute
+            return self._hyperlink_cls(uri, attr, text)
+        if hyperlink is None:
+            hyperlink = interned[key] = self._hyperlink_cls(uri, attr, text)
+
+        return hyperlink
+
+    def build(
+        self,
+        records: Iterable[tuple],
+    ) -> List[Hyperlink]:
+        """Creates multiple hyperlinks.
+
+        Args:
+            records: An iterable of tuples, each containing the arguments for a
+              hyperlink i.e ``(uri[, attr[, text]])``.
+
+        Returns:
+            A list of hyperlinks, one for each record, in the same order.
+
+        Raises:
+            TypeError: An argument is of an unexpected type.
+            ValueError: An argument is of an expected type but of an unexpected value
+        """
+        return [self(*record) for record in records]
+
+    def clear(self) -> None:
+        """Forgets all interned hyperlinks."""
+        if self._interned is not None:
+            self._interned.clear()
+
+
 class HyperlinkCanvas(urwid.Canvas):
-    cacheable = False
+    """The canvas of a :py:class:`Hyperlink` widget.
 
-    _uw_next_id = 0
-    _uw_free_ids = set()
+    Instances are created by :py:meth:`Hyperlink.render`, with a hyperlink ID
+    allocated by :py:attr:`Hyperlink.ID_ALLOCATOR`, which is held until either the
+    canvas is garbage-collected or :py:meth:`release_id` is called.
+    """
 
-    def __init__(self, uri: str, text_canv: urwid.TextCanvas) -> None:
+    def __init__(
+        self,
+        uri: str,
+        text: bytes,
+        link_cols: int,
+        cols: int,
+        attr: DisplayAttribute,
+        id_allocator: HyperlinkIDAllocator,
+    ) -> None:
         super().__init__()
-        self._uw_text_canv = text_canv
-        self._uw_uri = uri.encode()
-        self._uw_id = self._uw_get_id()
+        self._uw_text = text  # Excluding padding
+        self._uw_link_cols = link_cols
+        self._uw_cols = cols
+        self._uw_attr = attr
+        self._uw_uri = uri
+        self._uw_id_allocator = id_allocator  # `None` once the ID is released
+        # The ID is reserved for as long as the canvas exists, hence the canvas may be
+        # cached (by `urwid.CanvasCache`) and reused across renders
+        self._uw_id = id_allocator.acquire(uri)
+        self._uw_start = START % (self._uw_id, uri.encode())
 
     def __del__(self):
-        __class__._uw_free_ids.add(self._uw_id)
+        # `release()` can't be called here since it acquires a lock that may be held
+        # by the same thread, if the canvas is collected during an allocation
+        if self._uw_id_allocator is not None:
+            self._uw_id_allocator.release_later(self._uw_id, self._uw_uri)
 
     def cols(self):
-        return self._uw_text_canv.cols()
+        return self._uw_cols
 
     def content(
         self,
@@ -210,35 +607,92 @@ class HyperlinkCanvas(urwid.Canvas):
     ) -> Generator[List[Tuple[DisplayAttribute, Optional[str], bytes]], None, None]:
         # There can only be one line since wrap="ellipsis" and the text was checked
         # to not contain "\n".
-        content_line = next(
-            self._uw_text_canv.content(trim_left, trim_top, cols, rows, attr)
-        )
-
-        if isinstance(content_line[0][0], _Attr):
-            hyperlink_text, *padding = content_line
-            link_attr = hyperlink_text[0].attr
-            yield [
-                (None, "U", START % (self._uw_id, self._uw_uri)),
-                (
-                    attr.get(link_attr, link_attr) if attr else link_attr,
-                    *hyperlink_text[1:],
-                ),
+        link_cols = self._uw_link_cols
+        end = trim_left + cols if cols else self._uw_cols
+        link_end = min(link_cols, end)
+        line = []
+        if trim_left < link_end:
+            text = self._uw_text
+            if trim_left or link_end < link_cols:
+                if len(text) == link_cols:  # Every byte is a column
+                    text = text[trim_left:link_end]
+                else:
+                    text = trim_text_attr_cs(
+                        text, [], [], trim_left, link_end  # No attribute runs
+                    )[0]
+            link_attr = self._uw_attr
+            if attr:
+                link_attr = attr.get(link_attr, link_attr)
+            line += [
+                (None, "U", self._uw_start),
+                (link_attr, None, text),
                 (None, "U", END),
-                *padding,  # if any
             ]
-        else:  # A trim containing padding only
-            yield content_line
+        padding_start = max(trim_left, link_cols)
+        if end > padding_start:  # A trim containing padding
+            line.append(
+                (attr.get(None) if attr else None, None, b" " * (end - padding_start))
+            )
+
+        yield line
+
+    def release_id(self) -> None:
+        """Releases the hyperlink ID of the canvas immediately.
+
+        Otherwise, it's released only after the canvas is garbage-collected.
+
+        Afterwards, the ID may be allocated to other hyperlinks; hence, this should
+        only be called when the canvas will no longer be drawn. Subsequent calls have
+        no effect.
+        """
+        id_allocator = self._uw_id_allocator
+        if id_allocator is not None:
+            self._uw_id_allocator = None
+            id_allocator.release(self._uw_id, self._uw_uri)
 
     def rows(self):
-        return self._uw_text_canv.rows()
+        return 1
+
 
-    @staticmethod
-    def _uw_get_id():
-        if __class__._uw_free_ids:
-            return __class__._uw_free_ids.pop()
-        __class__._uw_next_id += 1
+@lru_cache(maxsize=1024)
+def check_uri_bytes(uri: str) -> None:
+    """Checks if all bytes of a URI, after being encoded, are valid.
+
+    Raises:
+        ValueError: An invalid byte is found.
+
+    Memoized since it's the most costly part of validating a URI and URIs tend to be
+    repeated.
+    """
+    invalid_bytes = frozenset(uri.encode()).difference(valid_byte_range)
+    if invalid_bytes:
+        raise ValueError(
+            f"Invalid byte '\\x{tuple(invalid_bytes)[0]:02x}' found in URI: {uri!r}"
+        )
 
-        return __class__._uw_next_id - 1
+
+def check_text(text: str) -> None:
+    """Validates a hyperlink text."""
+    if not isinstance(text, str):
+        raise TypeError(f"Invalid type for 'text' (got: {type(text).__name__!r})")
+    if not text:
+        raise ValueError("Hyperlink text is empty")
+    if "\n" in text:  # Other multi-line whitespace characters are escaped by urwid
+        raise ValueError(f"Multi-line text (got: {text!r})")
+
+
+def get_ascii_bytes(text: str) -> Optional[bytes]:
+    """Returns the encoded text if it's printable ASCII. Otherwise, ``None``."""
+    return text.encode() if text.isascii() and text.isprintable() else None
+
+
+def check_uri(uri: str) -> None:
+    """Validates a hyperlink URI."""
+    if not isinstance(uri, str):
+        raise TypeError(f"Invalid type for 'uri' (got: {type(uri).__name__!r})")
+    if not uri:
+        raise ValueError("URI is empty")
+    check_uri_bytes(uri)
 
 
 class _Attr:
@@ -246,5 +700,18 @@ class _Attr:
     neighbouring text runs.
     """
 
+    __slots__ = ("attr",)
+
     def __init__(self, attr: DisplayAttribute):
         self.attr = attr
+
+
+class _IDStats(NamedTuple):
+    live: int
+    high_water: int
+    acquired: int
+    reused: int
+
+    @property
+    def reuse_rate(self) -> float:
+        return self.reused / self.acquired if self.acquired else 0.0
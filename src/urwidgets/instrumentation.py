@@ -0,0 +1,193 @@
+"""
+Opt-in instrumentation of the widgets and functions of this package.
+
+While any callback is registered (see :py:func:`add_callback` and
+:py:class:`Collector`), the following events are reported to every registered
+callback, as ``callback(event, source, value)``:
+
+.. list-table::
+   :header-rows: 1
+
+   * - Event
+     - Source
+     - Value
+   * - ``"text_embed.render"``
+     - the :py:class:`~urwidgets.TextEmbed` widget
+     - the duration (in seconds) of an uncached render of the widget or of rows
+       of it (see :py:meth:`~urwidgets.TextEmbed.render_rows` and
+       :py:attr:`~urwidgets.TextEmbed.deferred_render`)
+   * - ``"text_embed.widget_renders"``
+     - the :py:class:`~urwidgets.TextEmbed` widget
+     - the number of embedded widgets rendered during the render
+   * - ``"text_embed.placeholder_lines"``
+     - the :py:class:`~urwidgets.TextEmbed` widget
+     - the number of lines containing embedded widgets that were composed during
+       the render
+   * - ``"text_embed.tail_continuations"``
+     - the :py:class:`~urwidgets.TextEmbed` widget
+     - the number of those lines that start with the continuation (tail) of a
+       wrapped embedded widget
+   * - ``"text_embed.composite_canvases"``
+     - the :py:class:`~urwidgets.TextEmbed` widget
+     - the number of :py:class:`urwid.CompositeCanvas` objects (including the
+       canvases of blocks of lines with embedded widgets drawn inline) created
+       during the render
+   * - ``"hyperlink.render"``
+     - the :py:class:`~urwidgets.Hyperlink` widget
+     - the duration (in seconds) of an uncached render of the widget
+   * - ``"update_batcher.flush"``
+     - the :py:class:`~urwidgets.UpdateBatcher` instance
+     - the number of updates applied by a flush
+   * - ``"parse_text"``
+     - ``None``
+     - the duration (in seconds) of a call to :py:func:`~urwidgets.parse_text`
+   * - ``"text_parser.parse"``
+     - the :py:class:`~urwidgets.TextParser` instance
+     - the duration (in seconds) of a call to :py:meth:`TextParser.parse()
+       <urwidgets.TextParser.parse>`
+   * - ``"repl_calls"``
+     - the :py:class:`~urwidgets.TextParser` instance or ``None``
+     - the number of calls to *repl* during a parse (for
+       :py:func:`~urwidgets.iter_parse_text`, reported when the iterator is
+       exhausted or closed)
+
+Durations are reported as :py:class:`float` and counts as :py:class:`int`.
+
+Renders cached by urwid are not reported, since the render methods are not called.
+
+When no callback is registered, the cost of the instrumentation is a single check of
+a flag per render or parse.
+"""
+
+from __future__ import annotations
+
+__all__ = ("Collector", "add_callback", "remove_callback")
+
+from collections import Counter, defaultdict
+from threading import Lock
+from typing import Any, Callable, DefaultDict, Dict, Optional, Tuple, Union
+
+Callback = Callable[[str, Any, Union[int, float]], None]
+
+# Checked by instrumented code before doing any extra work
+enabled = False
+
+_callbacks: Tuple[Callback, ...] = ()
+_callbacks_lock = Lock()
+
+
+def add_callback(callback: Callback) -> None:
+    """Registers a callback for instrumentation events.
+
+    Args:
+        callback: A callable that accepts three positional arguments, the event name,
+          source and value (see the module description).
+
+    A callback may be registered multiple times, in which case it's called as many
+    times per event.
+    """
+    global _callbacks, enabled
+
+    with _callbacks_lock:
+        _callbacks += (callback,)
+        enabled = True
+
+
+def remove_callback(callback: Callback) -> None:
+    """Unregisters a callback for instrumentation events.
+
+    Args:
+        callback: A registered callback.
+
+    Raises:
+        ValueError: *callback* is not registered.
+    """
+    global _callbacks, enabled
+
+    with _callbacks_lock:
+        callbacks = list(_callbacks)
+        callbacks.remove(callback)
+        _callbacks = tuple(callbacks)
+        enabled = bool(_callbacks)
+
+
+def emit(event: str, source: Any, value: Union[int, float]) -> None:
+    """Reports an event to all registered callbacks."""
+    for callback in _callbacks:
+        callback(event, source, value)
+
+
+class Collector:
+    """A callback that aggregates instrumentation events.
+
+    Args:
+        per_source: If ``True``, events are also aggregated separately for every
+          source (e.g widget), in :py:attr:`sources`.
+
+    The collector is registered upon entering a ``with`` statement context and
+    unregistered upon exit. It may also be registered explicitly, via
+    :py:func:`add_callback`.
+
+    .. collapse:: Example:
+
+        >>> from urwidgets.instrumentation import Collector
+        >>>
+        >>> with Collector(per_source=True) as collector:
+        ...     loop.draw_screen()  # `loop` being an `urwid.MainLoop`
+        ...
+        >>> collector.times["text_embed.render"]  # Total time spent
+        >>> collector.counts["text_embed.render"]  # Number of renders
+        >>> # The widget that took the most time to render
+        >>> max(
+        ...     collector.sources,
+        ...     key=lambda source: collector.sources[source]["text_embed.render"],
+        ... )
+    """
+
+    def __init__(self, per_source: bool = False) -> None:
+        self.counts: Counter[str] = Counter()
+        """The number of occurences of every event reporting a duration, and the
+        totals of events reporting counts.
+        """
+
+        self.times: DefaultDict[str, float] = defaultdict(float)
+        """The total duration (in seconds) reported by every event reporting a
+        duration.
+        """
+
+        self.sources: Optional[Dict[Any, DefaultDict[str, Union[int, float]]]] = (
+            {} if per_source else None
+        )
+        """The totals of values reported by every event, for every source, if
+        *per_source* is ``True``. Otherwise, ``None``.
+        """
+
+        self._lock = Lock()
+
+    def __call__(self, event: str, source: Any, value: Union[int, float]) -> None:
+        with self._lock:
+            if isinstance(value, float):
+                self.counts[event] += 1
+                self.times[event] += value
+            else:
+                self.counts[event] += value
+            if self.sources is not None:
+                source_totals = self.sources.get(source)
+                if source_totals is None:
+                    source_totals = self.sources[source] = defaultdict(int)
+                source_totals[event] += value
+
+    def __enter__(self) -> Collector:
+        add_callback(self)
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        remove_callback(self)
+
+    def reset(self) -> None:
+        """Discards all aggregated events."""
+        with self._lock:
+            self.counts.clear()
+            self.times.clear()
+            if self.sources is not None:
+                self.sources.clear()
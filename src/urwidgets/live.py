@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+__all__ = ("LiveValue", "UpdateBatcher")
+
+import asyncio
+from time import monotonic
+from typing import Any, AsyncIterable, Callable, Dict, Hashable, Optional, Tuple
+
+import urwid
+
+from . import instrumentation
+from .text_embed import DisplayAttribute
+
+# NOTE: Any new "private" attribute of any subclass of an urwid class should be
+# prepended with "_uw" to avoid clashes with names used by urwid itself.
+
+
+class UpdateBatcher:
+    """Coalesces updates and applies them at most once per frame interval.
+
+    Args:
+        interval: The minimum time (in seconds) between the starts of consecutive
+          flushes of pending updates.
+        main_loop: The main loop via which flushes are scheduled. If ``None``, they're
+          scheduled on the running :py:mod:`asyncio` event loop.
+        on_flush: A callable called without arguments after every flush that applied
+          any update, e.g to redraw the screen.
+
+    Raises:
+        TypeError: An argument is of an unexpected type.
+        ValueError: *interval* is negative.
+
+    Every update is submitted along with a key, and only the last update submitted
+    with a key before a flush is applied. Hence, any number of updates (e.g to the
+    widgets embedded in :py:class:`~urwidgets.TextEmbed` widgets, from any number of
+    coroutines) between consecutive flushes cost a single update per key and a single
+    re-render of only the affected lines of the affected widgets.
+
+    A flush is scheduled upon submission of an update, if none is already pending, to
+    occur as soon as the interval since the start of the previous flush has elapsed.
+
+    If *main_loop* is given, the screen is redrawn after every flush, as with any
+    alarm callback. Otherwise, there's no way for urwid to know that it should redraw
+    the screen; hence, *on_flush* should be given, if required.
+
+    NOTE:
+        Updates must be submitted and flushed in the thread running the event loop.
+
+    .. collapse:: Example:
+
+        >>> import asyncio
+        >>> from urwid import AsyncioEventLoop, Filler, MainLoop
+        >>> from urwidgets import LiveValue, TextEmbed, UpdateBatcher
+        >>>
+        >>> batcher = UpdateBatcher(1 / 30)
+        >>> btc, eth = LiveValue(0.0, batcher), LiveValue(0.0, batcher)
+        >>> text = TextEmbed(
+        ...     ["BTC: ", (10, Filler(btc)), "\\nETH: ", (10, Filler(eth))]
+        ... )
+        >>> loop = MainLoop(Filler(text), event_loop=AsyncioEventLoop())
+        >>> batcher.main_loop = loop
+        >>>
+        >>> # `price_feed()` being any asynchronous iterable of prices
+        >>> asyncio.ensure_future(btc.follow(price_feed("BTC")))
+        >>> asyncio.ensure_future(eth.follow(price_feed("ETH")))
+        >>> loop.run()
+    """
+
+    def __init__(
+        self,
+        interval: float = 1 / 30,
+        main_loop: Optional[urwid.MainLoop] = None,
+        on_flush: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self._pending: Dict[Hashable, Callable[[], Any]] = {}
+        self._handle = None  # of the scheduled flush
+        self._handle_loop = None  # on which the flush is scheduled
+        self._last_flush = float("-inf")
+        self.interval = interval
+        self.main_loop = main_loop
+        self.on_flush = on_flush
+
+    def _set_interval(self, interval: float) -> None:
+        if not isinstance(interval, (int, float)):
+            raise TypeError(
+                f"Invalid type for 'interval' (got: {type(interval).__name__!r})"
+            )
+        if interval < 0:
+            raise ValueError(f"Invalid value for 'interval' (got: {interval})")
+        self._interval = interval
+
+    interval = property(
+        lambda self: self._interval,
+        _set_interval,
+        doc="""The minimum time (in seconds) between the starts of consecutive
+        flushes.
+
+        :type: float
+
+        GET:
+            Returns the frame interval.
+
+        SET:
+            Sets the frame interval. A flush already scheduled is unaffected.
+
+        Raises:
+            TypeError: The value is not a number.
+            ValueError: The value is negative.
+        """,
+    )
+
+    main_loop = property(
+        lambda self: self._main_loop,
+        lambda self, main_loop: setattr(self, "_main_loop", main_loop),
+        doc="""The main loop via which flushes are scheduled.
+
+        :type: Optional[urwid.MainLoop]
+
+        GET:
+            Returns the main loop or ``None``, if flushes are scheduled on the running
+            :py:mod:`asyncio` event loop.
+
+        SET:
+            Sets the main loop. A flush already scheduled is unaffected.
+        """,
+    )
+
+    pending = property(
+        lambda self: len(self._pending),
+        doc="""The number of pending updates.
+
+        :type: int
+
+        GET:
+            Returns the number of keys with an update pending.
+        """,
+    )
+
+    def cancel(self) -> None:
+        """Discards all pending updates and the scheduled flush, if any."""
+        self._pending.clear()
+        self._cancel_flush()
+
+    def flush(self) -> None:
+        """Applies all pending updates immediately.
+
+        Updates are applied in the order in which their keys were first submitted
+        since the previous flush. The scheduled flush, if any, is cancelled.
+
+        An update submitted while updates are being applied is pending until the next
+        flush.
+        """
+        self._cancel_flush()
+        pending, self._pending = self._pending, {}
+        self._last_flush = monotonic()
+        for update in pending.values():
+            update()
+        if instrumentation.enabled:
+            instrumentation.emit("update_batcher.flush", self, len(pending))
+        if pending and self.on_flush:
+            self.on_flush()
+
+    def submit(self, key: Hashable, update: Callable[[], Any]) -> None:
+        """Submits an update.
+
+        Args:
+            key: The key of the update. Any pending update with the same key is
+              discarded.
+            update: A callable called without arguments to apply the update.
+
+        Raises:
+            RuntimeError: :py:attr:`main_loop` is ``None`` and there is no running
+              :py:mod:`asyncio` event loop.
+        """
+        if self._handle is None:
+            self._schedule_flush()
+        self._pending[key] = update
+
+    def _cancel_flush(self) -> None:
+        """Cancels the scheduled flush, if any."""
+        if self._handle is not None:
+            if isinstance(self._handle_loop, urwid.MainLoop):
+                self._handle_loop.remove_alarm(self._handle)
+            else:
+                self._handle.cancel()
+            self._handle = self._handle_loop = None
+
+    def _run_flush(self, *_: Any) -> None:
+        """Runs a scheduled flush."""
+        self._handle = self._handle_loop = None
+        self.flush()
+
+    def _schedule_flush(self) -> None:
+        """Schedules a flush after the frame interval since the previous flush."""
+        delay = max(0.0, self._last_flush + self._interval - monotonic())
+        if self._main_loop is None:
+            loop = asyncio.get_running_loop()
+            self._handle = loop.call_later(delay, self._run_flush)
+        else:
+            loop = self._main_loop
+            self._handle = loop.set_alarm_in(delay, self._run_flush)
+        self._handle_loop = loop
+
+
+class LiveValue(urwid.WidgetWrap):
+    """A widget displaying a value that may be updated frequently.
+
+    Args:
+        value: The initial value.
+        batcher: The batcher via which updates are applied. If ``None``, updates are
+          applied immediately.
+        attr: Display attribute of the text.
+        formatter: A callable that converts a value into a single-line string.
+        align: The text alignment.
+
+    The value is displayed on a **single line**, with the *ellipsis* wrap mode of
+    :py:class:`urwid.Text`.
+
+    This widget is intended to be embedded in a :py:class:`~urwidgets.TextEmbed` widget
+    (in a :py:class:`urwid.Filler`) and updated from :py:mod:`asyncio` coroutines.
+    Updates are applied via *batcher*, so that only the last value given before a
+    flush is formatted and displayed.
+
+    .. collapse:: Example:
+
+        >>> from urwid import Filler
+        >>> from urwidgets import LiveValue, TextEmbed, UpdateBatcher
+        >>>
+        >>> batcher = UpdateBatcher(1 / 30)
+        >>> progress = LiveValue(0, batcher, formatter="{:>3}%".format)
+        >>> text = TextEmbed(["Progress: ", (4, Filler(progress))])
+        >>>
+        >>> async def download():
+        ...     for percent in range(101):
+        ...         progress.update(percent)
+        ...         await asyncio.sleep(0.001)
+        ...
+
+    .. seealso::
+
+        :py:class:`~urwidgets.UpdateBatcher`
+    """
+
+    def __init__(
+        self,
+        value: Any = "",
+        batcher: Optional[UpdateBatcher] = None,
+        attr: DisplayAttribute = None,
+        formatter: Callable[[Any], str] = str,
+        align: str = "left",
+    ) -> None:
+        self._uw_batcher = batcher
+        self._uw_attr = attr
+        self._uw_formatter = formatter
+        self._uw_value = value
+        super().__init__(urwid.Text(self._uw_get_markup(value), align, "ellipsis"))
+
+    batcher = property(
+        lambda self: self._uw_batcher,
+        lambda self, batcher: setattr(self, "_uw_batcher", batcher),
+        doc="""The batcher via which updates are applied.
+
+        :type: Optional[UpdateBatcher]
+
+        GET:
+            Returns the batcher or ``None``, if updates are applied immediately.
+
+        SET:
+            Sets the batcher. Any update already submitted is unaffected.
+        """,
+    )
+
+    value = property(
+        lambda self: self._uw_value,
+        doc="""The displayed value.
+
+        :type: Any
+
+        GET:
+            Returns the value last applied, which excludes a pending update.
+        """,
+    )
+
+    async def follow(self, values: AsyncIterable[Any]) -> None:
+        """Updates the widget with every value yielded by an asynchronous iterable.
+
+        Args:
+            values: An asynchronous iterable of values.
+
+        Returns when *values* is exhausted.
+        """
+        async for value in values:
+            self.update(value)
+
+    def update(self, value: Any) -> None:
+        """Updates the value.
+
+        Args:
+            value: The new value.
+
+        The update is applied via :py:attr:`batcher`, if set. Otherwise, it's applied
+        immediately.
+        """
+        if self._uw_batcher is None:
+            self._uw_set_value(value)
+        else:
+            self._uw_batcher.submit(self, lambda: self._uw_set_value(value))
+
+    def _uw_get_markup(self, value: Any) -> Tuple[DisplayAttribute, str]:
+        return (self._uw_attr, self._uw_formatter(value))
+
+    def _uw_set_value(self, value: Any) -> None:
+        self._uw_value = value
+        self._w.set_text(self._uw_get_markup(value))
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 __all__ = (
+    "iter_parse_text",
     "parse_text",
+    "CompiledMarkup",
+    "ParseCache",
+    "PatternSet",
     "TextEmbed",
+    "TextParser",
     # Type Aliases
     "Markup",
     "StringMarkup",
@@ -15,8 +20,13 @@ __all__ = (
 )
 
 import re
+import sys
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
 from functools import lru_cache
-from itertools import islice
+from threading import Lock
+from time import perf_counter
 from typing import (
     Any,
     Callable,
@@ -25,12 +35,23 @@ from typing import (
     Iterable,
     Iterator,
     List,
+    NamedTuple,
     Optional,
     Tuple,
+    Type,
     Union,
 )
 
 import urwid
+from urwid.canvas import apply_text_layout, shards_trim_sides
+from urwid.util import rle_append_modify, rle_join_modify, rle_len, trim_text_attr_cs
+
+from . import instrumentation
+
+try:
+    from re import _parser as sre_parse  # Python >= 3.11
+except ImportError:
+    import sre_parse
 
 # NOTE: Any new "private" attribute of any subclass of an urwid class should be
 # prepended with "_uw" to avoid clashes with names used by urwid itself.
@@ -72,9 +93,16 @@ class TextEmbed(urwid.Text):
            >>> # w1 and w3 span 2 columns, w2 spans 5 columns
            >>> TextEmbed((2, [w1, (5, w2), w3]))
 
-        Visible embedded widgets are always rendered (may be cached) whenever the
-        ``TextEmbed`` widget is re-rendered (i.e an uncached render). Hence, this
-        allows for dynamic parts of text without updating the entire widget.
+        Embedded widgets are rendered along with the ``TextEmbed`` widget and are
+        re-rendered (on the next render) after they're updated. Hence, this allows
+        for dynamic parts of text without updating the entire widget.
+        The text layout and the canvases of lines are reused across renders with the
+        same size and focus; only lines containing embedded widgets that have been
+        updated are re-composed. Also, the layout of a short text is shared by all
+        widgets with the same text, display attributes, widths of embedded widgets,
+        alignment and wrap mode (e.g identical rows of a table), via a process-wide
+        cache (see :py:meth:`layout_cache_info`); only their embedded widgets are
+        rendered separately.
         Going a step further, embeddded widgets can be swapped using
         :py:class:`urwid.WidgetPlaceholder` but their widths will remain the same.
 
@@ -86,9 +114,13 @@ class TextEmbed(urwid.Text):
            - As regards the "space" wrap mode, each embedded widget is treated as a
              single WORD (i.e containing no whitespace). In other words, whitespace
              within embedded widgets do not influence wrapping.
-           - After updating or swapping an embedded widget, the containing
-             :py:class:`TextEmbed` widget's canvases should be invalidated to ensure
-             it re-renders.
+           - After an embedded widget is updated (i.e invalidated), the next render
+             of the containing :py:class:`TextEmbed` widget re-renders only the
+             lines containing the widget. This works via urwid's canvas cache and is
+             automatic for widgets whose canvases are cached by urwid (the default
+             for most widgets), like for any other container widget. Otherwise, the
+             lines containing the widget are re-rendered on every render of the
+             :py:class:`TextEmbed` widget.
 
     Raises:
         TypeError: A widget markup element has a non-integer display attribute.
@@ -124,6 +156,9 @@ class TextEmbed(urwid.Text):
 
        :py:func:`parse_text`
           Parses a string into a text/widget markup that can be used with this class.
+
+       :py:class:`CompiledMarkup`
+          A text/widget markup processed once for use with many widgets.
     """
 
     PLACEHOLDER_HEAD: ClassVar[str] = "\uf8fe"
@@ -163,12 +198,31 @@ class TextEmbed(urwid.Text):
     # spaces when `align != "left"` and `wrap != "clip"`
     _UW_TAIL_PATTERN = re.compile(f"^( *)({PLACEHOLDER_TAIL}+)")
 
+    # Matches a whole line containing any part of a placeholder
+    _UW_PLACEHOLDER_LINE_PATTERN = re.compile(
+        f"^.*[{PLACEHOLDER_HEAD}{PLACEHOLDER_TAIL}].*$", re.M
+    )
+
+    # The process-wide cache of shared layouts (see `_uw_layout_block()`), in LRU
+    # order. Only the layouts of texts of up to `_UW_SHARED_LAYOUT_MAX_LEN`
+    # characters are cached.
+    _UW_SHARED_LAYOUTS: ClassVar[OrderedDict[tuple, _SharedLayout]] = OrderedDict()
+    _UW_SHARED_LAYOUTS_LOCK: ClassVar[Lock] = Lock()
+    _UW_SHARED_LAYOUT_MAX_LEN: ClassVar[int] = 1024
+    _uw_shared_layouts_maxsize: ClassVar[Optional[int]] = 256
+    _uw_shared_layouts_hits: ClassVar[int] = 0
+    _uw_shared_layouts_misses: ClassVar[int] = 0
+    _uw_shared_layouts_evictions: ClassVar[int] = 0
+
     def __init_subclass__(cls, **kwargs: Any) -> None:
         placeholder_tail_overriden = "PLACEHOLDER_TAIL" in cls.__dict__
         if "PLACEHOLDER_HEAD" in cls.__dict__ or placeholder_tail_overriden:
             cls._UW_PLACEHOLDER_PATTERN = re.compile(
                 f"({cls.PLACEHOLDER_HEAD}{cls.PLACEHOLDER_TAIL}*)"
             )
+            cls._UW_PLACEHOLDER_LINE_PATTERN = re.compile(
+                f"^.*[{cls.PLACEHOLDER_HEAD}{cls.PLACEHOLDER_TAIL}].*$", re.M
+            )
         if placeholder_tail_overriden:
             cls._UW_TAIL_PATTERN = re.compile(f"^( *)({cls.PLACEHOLDER_TAIL}+)")
 
@@ -184,7 +238,12 @@ class TextEmbed(urwid.Text):
     )
 
     embedded = property(
-        lambda self: [(widget, width) for widget, width, _ in self._uw_embedded],
+        lambda self: [
+            (widget, width)
+            for widget, width in zip(
+                self._uw_embedded.widgets, self._uw_embedded.widths
+            )
+        ],
         doc="""Embedded widgets.
 
         Returns:
@@ -226,422 +285,2159 @@ class TextEmbed(urwid.Text):
               the index of the widget within the :py:attr:`embedded` widgets list and
               the run length is the width of the widget.
         """
-        return super().get_text()
+        text, attrib = super().get_text()
+        # Internally, embedded widgets are identified by their index since the text
+        # was last set, which is offset by widgets removed along with lines in excess
+        # of `max_lines`
+        base = self._uw_embedded.base
+        if base:
+            attrib = [
+                (attr - base, run) if isinstance(attr, int) else (attr, run)
+                for attr, run in attrib
+            ]
+
+        return text, attrib
 
     def render(
         self, size: Tuple[int,], focus: bool = False
     ) -> Union[urwid.TextCanvas, urwid.CompositeCanvas]:
-        text_canv = fix_text_canvas_attr(super().render(size, focus))
-        embedded = self._uw_embedded
-        if not embedded:
-            return text_canv
+        blocks = self._uw_get_layout(size)
+        window = [(block, block.top, block.bottom) for block in blocks]
+        if self._uw_deferred_render and self._uw_embedded:
+            return _DeferredCanvas(self, window, focus)
 
-        def append_text_lines():
-            nonlocal top
+        return self._uw_render_window(window, focus)
 
-            if n_lines:
-                partial_canv = urwid.CompositeCanvas(text_canv)
-                partial_canv.trim(top, n_lines)
-                canvases.append((partial_canv, None, focus))
-                top += n_lines
+    def render_rows(
+        self, size: Tuple[int,], start: int, stop: int, focus: bool = False
+    ) -> Union[urwid.TextCanvas, urwid.CompositeCanvas]:
+        """Renders a range of rows of the widget.
 
-        text = text_canv.text
-        canvases = []
-        placeholder_pattern = type(self)._UW_PLACEHOLDER_PATTERN
-        placeholder_tail = type(self).PLACEHOLDER_TAIL
-        tail = None
-        top = 0
-        n_lines = 0
-        clipped = self.wrap == "clip"
+        Args:
+            size: As in :py:meth:`render`.
+            start: The index of the first row to render.
+            stop: The index of the row after the last row to render.
+            focus: As in :py:meth:`render`.
 
-        if clipped:
-            if self.align != "left":
-                translation = self.get_line_translation(size[0])
-            text_canv_content = tuple(text_canv.content())
-        else:
-            embedded_iter = iter(embedded)
+        Returns:
+            A canvas of the rows from *start* up to (but excluding) *stop*, of the
+            canvas that :py:meth:`render` would return.
 
-        for row_index, line in enumerate(text):
-            line = line.decode()
-            if clipped:
-                if line.startswith(placeholder_tail):  # align != "left"
-                    widget_index = text_canv_content[row_index][0][0]
-                    widget, width, start_pos = embedded[widget_index]
-                    tail_canv = widget.render((width, 1), focus)
-                    left_trim = -translation[row_index][0][0]
-                    # the placeholder is clipped => left_trim > start_pos
-                    tail_width = width - (left_trim - start_pos)
-                    tail = (tail_width, tail_canv)
-                    embedded_iter = islice(embedded, widget_index + 1, None)
-                else:
-                    tail = None
-            if tail:
-                if clipped:
-                    append_text_lines()
-                line_canv = urwid.CompositeCanvas(text_canv)
-                line_canv.trim(top, 1)
-                partial_canv, tail = self._uw_embed(
-                    line, line_canv, embedded_iter, focus, tail
-                )
-                canvases.append((partial_canv, None, focus))
-                n_lines = 0
-                top += 1
-            elif placeholder_pattern.search(line):
-                append_text_lines()
-                if clipped:
-                    for attr, *_ in text_canv_content[row_index]:
-                        if isinstance(attr, int):
-                            break
-                    embedded_iter = islice(embedded, attr, None)
-                line_canv = urwid.CompositeCanvas(text_canv)
-                line_canv.trim(top, 1)
-                partial_canv, tail = self._uw_embed(
-                    line, line_canv, embedded_iter, focus
+        Raises:
+            TypeError: An argument is of an unexpected type.
+            ValueError: The range of rows is empty or out of the range of rows of the
+              widget.
+
+        Only embedded widgets within the range of rows are rendered. Hence, the cost
+        depends on the number of rows rendered, rather than that of the whole widget.
+        This is useful for containers that display only a part of the widget at a
+        time. See also :py:attr:`deferred_render`.
+
+        NOTE:
+            Unlike with :py:meth:`render`, the canvas is not cached by urwid.
+        """
+        for name, value in (("start", start), ("stop", stop)):
+            if not isinstance(value, int):
+                raise TypeError(
+                    f"Invalid type for {name!r} (got: {type(value).__name__!r})"
                 )
-                canvases.append((partial_canv, None, focus))
-                n_lines = 0
-                top += 1
-            else:
-                n_lines += 1
-        append_text_lines()
+        n_rows = self.rows(size, focus)
+        if not 0 <= start < stop <= n_rows:
+            raise ValueError(
+                f"Invalid range of rows (got: {start}:{stop}, rows: {n_rows})"
+            )
+
+        return self._uw_render_window(
+            [(block, block.top, block.bottom) for block in self._uw_get_layout(size)],
+            focus,
+            start,
+            stop,
+        )
 
-        return urwid.CanvasCombine(canvases)
+    def rows(self, size: Tuple[int], focus: bool = False) -> int:
+        return sum(block.bottom - block.top for block in self._uw_get_layout(size))
 
-    def set_text(self, markup: Markup) -> None:
+    def set_text(self, markup: Union[Markup, CompiledMarkup]) -> None:
         """Sets the widget's content.
 
-        Also supports widget markup elements. See the class description.
+        Also supports widget markup elements (see the class description) and
+        compiled markup (see :py:class:`CompiledMarkup`).
+        """
+        if not isinstance(markup, CompiledMarkup):
+            markup = CompiledMarkup(markup, type(self))
+        self._uw_embedded = self._uw_get_embedded(markup)
+        self._uw_text_offset = 0
+        self._uw_layout_cache = {}
+        self._uw_layout_start = None
+        self._uw_last_line_width = markup._last_line_width
+        # Same as `urwid.Text.set_text()` but without decomposing the markup again
+        self._text = text = markup._text
+        self._attrib = list(markup._attrib)
+        self._invalidate()
+        self._uw_attrib_len = markup._attrib_len
+        self._uw_n_lines = text.count("\n") + 1
+        if self._uw_max_lines and self._uw_n_lines > self._uw_max_lines:
+            self._uw_drop_lines(self._uw_n_lines - self._uw_max_lines)
+
+    def append(self, markup: Union[Markup, CompiledMarkup]) -> None:
+        """Appends to the widget's content.
+
+        Args:
+            markup: The text markup to append. Also supports widget markup elements
+              (see the class description) and compiled markup (see
+              :py:class:`CompiledMarkup`).
+
+        Unlike with :py:meth:`set_text`, the existing content (including embedded
+        widgets) is left as-is and only *markup* is processed. Also, with the default
+        text layout, only the last line of the existing content is laid out again and
+        the laid out text of successive appends is joined, such that the number of
+        shards of a render grows only logarithmically with the number of appends.
+
+        NOTE:
+            The text content is kept in a single string (as with
+            :py:class:`urwid.Text`), which is copied whole upon every append (and
+            removal of lines in excess of :py:attr:`max_lines`). Hence, the cost of
+            appending is ``O(n)`` in the size of the content, though the per-character
+            cost of the copy is far less than that of parsing and laying out the
+            appended text. For a log tail, setting :py:attr:`max_lines` keeps this
+            cost bounded.
+
+        If :py:attr:`max_lines` is set, lines in excess are removed from the start of
+        the content.
         """
-        markup, self._uw_embedded = self._uw_substitute_widgets(markup)
-        super().set_text(markup)
-        self._uw_update_widget_start_pos()
+        if not isinstance(markup, CompiledMarkup):
+            markup = CompiledMarkup(markup, type(self))
+        new_embedded = self._uw_get_embedded(markup, self._uw_last_line_width)
+        new_text = markup._text
+        if not new_text:
+            return
+        embedded = self._uw_embedded
+        widget_index = embedded.base + len(embedded)
+        if widget_index and new_embedded:
+            new_attrib = [
+                (attr + widget_index, run) if isinstance(attr, int) else (attr, run)
+                for attr, run in markup._attrib
+            ]
+        else:
+            new_attrib = list(markup._attrib)
+        if markup._multiline:
+            self._uw_last_line_width = markup._last_line_width
+        else:
+            self._uw_last_line_width += markup._last_line_width
+
+        text, attrib = super().get_text()
+        if self._uw_attrib_len < len(text):
+            rle_append_modify(attrib, (None, len(text) - self._uw_attrib_len))
+        if rle_len(new_attrib) < len(new_text):
+            rle_append_modify(new_attrib, (None, len(new_text) - rle_len(new_attrib)))
+        rle_join_modify(attrib, new_attrib)
+        self._text = text + new_text
+        self._uw_attrib_len = len(self._text)
+        if attrib and attrib[-1][0] is None:
+            # As with `set_text()`, the attributes don't cover trailing text without
+            # a display attribute
+            self._uw_attrib_len -= attrib.pop()[1]
+        self._uw_n_lines += new_text.count("\n")
+        embedded.extend(new_embedded)
+
+        # The last line of the existing text may be continued by the new text, hence
+        # it's laid out again along with the new text, when next rendered
+        if not isinstance(self.layout, urwid.StandardTextLayout):
+            # Lines may not be laid out independently
+            self._uw_layout_cache.clear()
+        elif self._uw_layout_start is None:
+            line_start = self._uw_text_offset + text.rfind("\n") + 1
+            for size, blocks in tuple(self._uw_layout_cache.items()):
+                last_block = blocks[-1]
+                if not size or last_block.translation == [[]]:
+                    # The width of the layout may have changed or the text could
+                    # not be displayed
+                    del self._uw_layout_cache[size]
+                    continue
+                block_line_start = line_start - last_block.offset
+                bottom = last_block.bottom
+                while bottom > last_block.top and (
+                    get_line_offset(last_block.translation[bottom - 1])
+                    >= block_line_start
+                ):
+                    bottom -= 1
+                if bottom == last_block.top:
+                    del blocks[-1]
+                else:
+                    last_block.bottom = bottom
+            self._uw_layout_start = line_start
+        self._invalidate()
+
+        if self._uw_max_lines and self._uw_n_lines > self._uw_max_lines:
+            self._uw_drop_lines(self._uw_n_lines - self._uw_max_lines)
+
+    def _uw_set_max_lines(self, max_lines: Optional[int]) -> None:
+        if max_lines is not None:
+            if not isinstance(max_lines, int):
+                raise TypeError(
+                    "Invalid type for 'max_lines' "
+                    f"(got: {type(max_lines).__name__!r})"
+                )
+            if max_lines <= 0:
+                raise ValueError(f"Invalid maximum number of lines (got: {max_lines})")
+        self._uw_max_lines = max_lines
+        if max_lines and self._uw_n_lines > max_lines:
+            self._uw_drop_lines(self._uw_n_lines - max_lines)
+
+    _uw_max_lines = None
+
+    max_lines = property(
+        lambda self: self._uw_max_lines,
+        _uw_set_max_lines,
+        doc="""The maximum number of lines of the widget's content.
+
+        :type: Optional[int]
+
+        GET:
+            Returns the maximum number of lines or ``None`` if unlimited (the
+            default).
+
+        SET:
+            Sets the maximum number of lines. If the content has more lines (now or
+            later, via :py:meth:`set_text` or :py:meth:`append`), lines in excess are
+            removed from the start of the content, along with any widgets embedded in
+            them.
+
+        Raises:
+            TypeError: The value is neither an integer nor ``None``.
+            ValueError: The value is not positive.
+
+        Lines are separated by ``"\\n"`` in the text content of the widget, not by
+        wrapping. Removing lines copies the remaining text content (see
+        :py:meth:`append`).
+        """,
+    )
+
+    deferred_render = property(
+        lambda self: self._uw_deferred_render,
+        lambda self, deferred: setattr(self, "_uw_deferred_render", bool(deferred)),
+        doc="""Whether rendering embedded widgets is deferred.
+
+        :type: bool
+
+        GET:
+            Returns ``True`` if rendering embedded widgets is deferred. Otherwise,
+            ``False`` (the default).
+
+        SET:
+            Sets whether rendering embedded widgets is deferred.
+
+        If ``True``, the canvas returned by :py:meth:`render` (when any widget is
+        embedded) renders only the rows of the widget (and the widgets embedded
+        within them) requested of it, at the time its content is requested.
+
+        Hence, when only a part of the widget is displayed, such as within a
+        :py:class:`urwid.ListBox`, the cost of drawing a frame depends on the number
+        of rows displayed, rather than that of the whole widget. The rows are
+        rendered every time the canvas is drawn but lines are reused as described in
+        the class description.
+
+        NOTE:
+            Since the embedded widgets are rendered only when the canvas is drawn,
+            the canvas is not cached by urwid; neither are those of the containing
+            widgets. Hence, they're re-rendered whenever the screen is drawn.
+        """,
+    )
+
+    _uw_deferred_render = False
+
+    def set_align_mode(self, mode: str) -> None:
+        super().set_align_mode(mode)
+        self._uw_layout_cache.clear()
+
+    align = property(lambda self: super().align, set_align_mode)
 
     def set_wrap_mode(self, mode: str) -> None:
         if mode == "ellipsis":
             raise NotImplementedError("Wrap mode 'ellipsis' is not implemented.")
         super().set_wrap_mode(mode)
+        self._uw_layout_cache.clear()
 
     wrap = property(lambda self: super().wrap, set_wrap_mode)
 
-    def _uw_update_widget_start_pos(self) -> None:
-        """Updates the start position of embedded widgets on their respective lines."""
-        if not self._uw_embedded:
-            return
+    @staticmethod
+    def layout_cache_clear() -> None:
+        """Clears the process-wide cache of shared layouts and resets its statistics.
 
-        # - Text is clipped per line.
-        # - Since the pad/trim amount in the translation (produced by
-        #   `StandardTextLayout.align_layout()`) is relative to the start of the line
-        #   wrt the layout width (maxcol), the position of an embedded widgets on its
-        #   respective line should be relative to the start of the line, not considering
-        #   alignment.
-        find_placeholders = type(self)._UW_PLACEHOLDER_PATTERN.finditer
-        embedded_iter = iter(self._uw_embedded)
-        self._uw_embedded = [
-            # Using `calc_width()` instead of `match.start()` directly to account for
-            # wide and zero-width characters
-            (widget, width, urwid.calc_width(line, 0, match.start()))
-            for line in super().get_text()[0].splitlines()
-            for match, (widget, width, _) in zip(find_placeholders(line), embedded_iter)
-        ]
+        Layouts already in use by widgets are unaffected.
+        """
+        with TextEmbed._UW_SHARED_LAYOUTS_LOCK:
+            TextEmbed._UW_SHARED_LAYOUTS.clear()
+            TextEmbed._uw_shared_layouts_hits = 0
+            TextEmbed._uw_shared_layouts_misses = 0
+            TextEmbed._uw_shared_layouts_evictions = 0
 
-    @classmethod
-    def _uw_substitute_widgets(
-        cls, markup: Markup
-    ) -> Tuple[Markup, List[Tuple[urwid.Widget, int, int]]]:
-        """Extracts embedded widgets from *markup* and replace widget markup elements
-        with placeholders.
+    @staticmethod
+    def layout_cache_info() -> _CacheInfo:
+        """Returns statistics of the process-wide cache of shared layouts.
 
         Returns:
-            A tuple containing:
-
-            - The given markup flattened and with all widget elements replaced by
-              placeholders.
-            - A list of ``(widget, width, start_position)`` tuples describing the
-              embedded widgets, where *start_position* is initialized to zero and
-              later updated by :py:meth:`_uw_update_widget_start_pos`.
+            A named tuple with the fields:
+
+            - ``hits``: the number of layouts shared
+            - ``misses``: the number of layouts computed
+            - ``evictions``: the number of layouts evicted to free space
+            - ``maxsize``: the maximum number of layouts cached (``None`` if
+              unlimited)
+            - ``currsize``: the number of layouts currently cached
+
+        A layout (including the text canvas and the positions of the placeholders of
+        embedded widgets) is looked up whenever the whole text of a widget is laid
+        out, keyed by the text, display attributes, layout width, alignment, wrap
+        mode, text layout object and placeholders. Only the layouts of texts of up to
+        1024 characters are cached.
+
+        The statistics are reset by :py:meth:`layout_cache_clear`.
         """
+        with TextEmbed._UW_SHARED_LAYOUTS_LOCK:
+            return _CacheInfo(
+                TextEmbed._uw_shared_layouts_hits,
+                TextEmbed._uw_shared_layouts_misses,
+                TextEmbed._uw_shared_layouts_evictions,
+                TextEmbed._uw_shared_layouts_maxsize,
+                len(TextEmbed._UW_SHARED_LAYOUTS),
+            )
 
-        def recurse_markup(attr: Union[DisplayAttribute, int], markup: Markup) -> None:
-            if isinstance(markup, list):
-                for markup in markup:
-                    recurse_markup(attr, markup)
-            elif isinstance(markup, tuple):
-                if len(markup) != 2:
-                    raise urwid.TagMarkupException(
-                        "Tuples must be in the form `(attribute, tagmarkup)` "
-                        f"(got: {markup!r})"
-                    )
-                recurse_markup(*markup)
-            elif isinstance(markup, urwid.Widget):
-                if not isinstance(attr, int):
-                    raise TypeError(
-                        "Invalid type for embedded widget width "
-                        f"(got: {type(attr).__name__!r})"
-                    )
-                if "box" not in markup.sizing():
-                    raise ValueError(f"Not a box widget (got: {markup!r})")
-                if attr <= 0:
-                    raise ValueError(f"Invalid widget width (got: {attr!r})")
-                new_markup.append(
-                    (len(embedded), placeholder_head + placeholder_tail * (attr - 1))
+    @staticmethod
+    def set_layout_cache_size(maxsize: Optional[int]) -> None:
+        """Sets the maximum number of layouts in the process-wide cache of shared
+        layouts.
+
+        Args:
+            maxsize: The maximum number of layouts cached. If ``None``, the cache is
+              unlimited. If zero, layouts are not shared.
+
+        Raises:
+            TypeError: *maxsize* is neither an integer nor ``None``.
+            ValueError: *maxsize* is negative.
+
+        If more layouts than *maxsize* are currently cached, the least recently used
+        ones are evicted. The default maximum is ``256``.
+        """
+        if maxsize is not None:
+            if not isinstance(maxsize, int):
+                raise TypeError(
+                    f"Invalid type for 'maxsize' (got: {type(maxsize).__name__!r})"
                 )
-                embedded.append((markup, attr, 0))
-            else:
-                # Normalize text type to `str` since other parts of this class use
-                # and expect `str`
-                if isinstance(markup, bytes):
-                    markup = markup.decode()
-                new_markup.append(markup if attr is None else (attr, markup))
+            if maxsize < 0:
+                raise ValueError(f"Invalid cache size (got: {maxsize})")
 
-        embedded = []
-        new_markup = []
-        placeholder_head = cls.PLACEHOLDER_HEAD
-        placeholder_tail = cls.PLACEHOLDER_TAIL
-        recurse_markup(None, markup)
+        with TextEmbed._UW_SHARED_LAYOUTS_LOCK:
+            TextEmbed._uw_shared_layouts_maxsize = maxsize
+            TextEmbed._uw_evict_shared_layouts()
 
-        return new_markup, embedded
+    def _uw_drop_lines(self, n_lines: int) -> None:
+        """Removes lines from the start of the widget's content.
 
-    @classmethod
-    def _uw_embed(
-        cls,
-        line: str,
-        line_canv: urwid.CompositeCanvas,
-        embedded_iter: Iterator[Tuple[urwid.Widget, int, int]],
-        focus: bool = False,
-        tail: Optional[Tuple[int, urwid.Canvas]] = None,
-    ) -> Tuple[urwid.CompositeCanvas, Optional[Tuple[int, urwid.Canvas]]]:
-        """Replaces widget placeholders in a line with with the widgets' contents.
+        Args:
+            n_lines: The number of lines to remove.
+        """
+        text, attrib = super().get_text()
+        cut = 0
+        for _ in range(n_lines):
+            cut = text.index("\n", cut) + 1
+
+        self._uw_embedded.drop(text.count(type(self).PLACEHOLDER_HEAD, 0, cut))
+
+        attrib_index = run_total = 0
+        while attrib_index < len(attrib) and run_total < cut:
+            run_total += attrib[attrib_index][1]
+            attrib_index += 1
+        if run_total > cut:
+            attrib_index -= 1
+            attrib[attrib_index] = (attrib[attrib_index][0], run_total - cut)
+        del attrib[:attrib_index]
+
+        self._text = text[cut:]
+        self._uw_attrib_len = max(self._uw_attrib_len - cut, 0)
+        self._uw_text_offset += cut
+        self._uw_n_lines -= n_lines
+
+        if isinstance(self.layout, urwid.StandardTextLayout):
+            for size, blocks in tuple(self._uw_layout_cache.items()):
+                if not size:  # The width of the layout may have changed
+                    del self._uw_layout_cache[size]
+                    continue
+                while blocks:
+                    block = blocks[0]
+                    if block.translation == [[]]:  # Text that can not be displayed
+                        del self._uw_layout_cache[size]
+                        break
+                    block_cut = self._uw_text_offset - block.offset
+                    top = block.top
+                    while top < block.bottom and (
+                        get_line_offset(block.translation[top]) < block_cut
+                    ):
+                        top += 1
+                    if top < block.bottom:
+                        block.top = top
+                        break
+                    del blocks[0]
+            if self._uw_layout_start is not None:
+                self._uw_layout_start = max(self._uw_layout_start, self._uw_text_offset)
+        else:  # Lines may not be laid out independently
+            self._uw_layout_cache.clear()
+        self._invalidate()
+
+    def _uw_get_embedded(
+        self, markup: CompiledMarkup, line_width: int = 0
+    ) -> _EmbeddedTable:
+        """Returns the widgets bound to the slots of a compiled markup.
 
         Args:
-            line: A line of the original text canvas.
-            line_canv: A canvas corresponding to *line*.
-            embedded_iter: An iterator of ``(widget, width, start_position)`` tuples
-              in the same order as :py:attr:`embedded`, where *start_position* is as
-              determined by :py:meth:`_uw_update_widget_start_pos`.
-            focus: As in :py:meth:`render`.
-            tail: The description of the "tail" of an embedded widget that is the first
-              part of the line ``(tail_width, tail_canv)``, if it was wrapped/clipped,
-              where:
+            markup: The compiled markup.
+            line_width: The width (in screen columns) of the text preceding *markup*
+              on its first line.
+
+        Returns:
+            A table of the embedded widgets, their widths and their start positions,
+            where the start position of a widget is the column at which it starts on
+            its line.
+
+        Raises:
+            ValueError: *markup* was compiled for a class with different placeholders.
+            ValueError: *markup* has an unbound widget slot.
+        """
+        # - Text is clipped per line.
+        # - Since the pad/trim amount in the translation (produced by
+        #   `StandardTextLayout.align_layout()`) is relative to the start of the line
+        #   wrt the layout width (maxcol), the position of an embedded widgets on its
+        #   respective line should be relative to the start of the line, not considering
+        #   alignment.
+        if markup._placeholders != (self.PLACEHOLDER_HEAD, self.PLACEHOLDER_TAIL):
+            raise ValueError(
+                "Markup compiled for a class with different placeholders "
+                f"(got: {markup!r})"
+            )
+        if None in markup._widgets:
+            raise ValueError(f"Unbound widget slot(s) (got: {markup!r})")
 
-              - *tail_width* is the width of the remaining (unused) portion of the
-                widget's canvas content towards it's right end.
-              - *tail_canv* is the original rendered canvas of the widget, unmodified.
+        embedded = _EmbeddedTable(
+            markup._widgets, markup._widths, markup._start_positions
+        )
+        if line_width:
+            start_positions = embedded.start_positions
+            for slot in range(markup._n_first_line_slots):
+                start_positions[slot] += line_width
 
-              OR ``None`` if a widget is not the first part of the line.
+        return embedded
 
-        Returns:
-            A tuple containing:
+    @classmethod
+    def _uw_split_line(
+        cls,
+        text_canv: urwid.TextCanvas,
+        row: int,
+        tail_left: Optional[int] = None,
+    ) -> List[Tuple[int, Optional[urwid.TextCanvas], Optional[int]]]:
+        """Splits a line of a text canvas into text parts and parts of widgets.
+
+        Args:
+            text_canv: The text canvas of a block of the widget's text.
+            row: The index of the line in *text_canv*.
+            tail_left: The number of columns of the canvas of the widget whose tail
+              is the first part of the line, to the left of the tail, if the line
+              starts with a tail (see *tail_width* of
+              :py:meth:`_uw_index_placeholders`). Otherwise, ``None``.
 
-            - A ``CompositeCanvas`` containing the separate parts from the original
-              text canvas and the embedded widgets' canvases.
-            - The description of the "tail" of an embedded widget that is the last part
-              of the line ``(tail_width, tail_canv)`` (see the description of *tail*
-              above), if it was wrapped/clipped OR ``None`` if it wasn't wrapped/clipped
-              or a widget is not the last part of the line.
+        Returns:
+            A list of ``(cols, canv, left)`` tuples, one for each part of the line,
+            in order, where
+
+            - *cols* is the width of the part.
+            - *canv* is a canvas of the part, if it's a text part. Otherwise (a part
+              of a widget), ``None``.
+            - *left* is the number of columns of the widget's canvas to the left of
+              the part, if it's a part of a widget. Otherwise, ``None``.
         """
-        canvases = []
-        line_index = 0
+        line = text_canv._text[row].decode()
+        parts = []
+        col = 0
 
-        if tail:
-            # - Since this is the line after the head, then it must contain [a part of]
-            #   the tail
+        if tail_left is not None:
             # - Only one possible occurence of a tail per line
             # - Might be preceded by padding spaces when `align != "left"`
             _, padding, tail_string, line = cls._UW_TAIL_PATTERN.split(line)
-
             if padding:
                 # Can use `len(padding)` since all characters should be spaces
-                canv = urwid.Text(padding).render((len(padding),), focus)
-                canvases.append((canv, None, focus, len(padding)))
-                line_index += len(padding)
-
-            tail_width, tail_canv = tail
-            canv = urwid.CompositeCanvas(tail_canv)
-            canv.pad_trim_left_right(tail_width - tail_canv.cols(), 0)
-            canvases.append((canv, None, focus, len(tail_string)))
-            line_index += len(tail_string)
-
-            if not line:
-                tail = (
-                    (tail_width - len(tail_string), tail_canv)
-                    if len(tail_string) < tail_width
-                    else None
-                )
-                return urwid.CanvasJoin(canvases), tail
-            tail = None
+                parts.append((len(padding), get_blank_canvas(len(padding)), None))
+            parts.append((len(tail_string), None, tail_left))
+            col = len(padding) + len(tail_string)
 
         placeholder_pattern = cls._UW_PLACEHOLDER_PATTERN
+        text = text_canv._text[row]
+        attr = text_canv._attr[row]
+        cs = text_canv._cs[row]
 
         for part in placeholder_pattern.split(line):
             if not part:
                 continue
 
             if placeholder_pattern.fullmatch(part):
-                widget, width, _ = next(embedded_iter)
-                canv = widget.render((width, 1), focus)
                 # `len(part)`, in case the placeholder was wrapped
-                canvases.append((canv, None, focus, len(part)))
-                line_index += len(part)
-                if len(part) != width:
-                    tail = (width - len(part), canv)
+                parts.append((len(part), None, 0))
+                col += len(part)
             else:
-                # Using `calc_width()` instead of `len(part)` directly to account for
-                # wide and zero-width characters
-                maxcol = urwid.calc_width(part, 0, len(part))
-                canv = urwid.CompositeCanvas(line_canv)
-                canv.pad_trim_left_right(-line_index, 0)
-                canvases.append((canv, None, focus, maxcol))
-                line_index += maxcol
+                maxcol = get_text_width(part)
+                part_text, part_attr, part_cs = trim_text_attr_cs(
+                    text, attr, cs, col, col + maxcol
+                )
+                parts.append(
+                    (
+                        maxcol,
+                        urwid.TextCanvas(
+                            [part_text],
+                            [part_attr],
+                            [part_cs],
+                            maxcol=maxcol,
+                            check_width=False,
+                        ),
+                        None,
+                    )
+                )
+                col += maxcol
 
-        return urwid.CanvasJoin(canvases), tail
+        return parts
 
+    def _uw_get_line_parts(
+        self,
+        block: _TextBlock,
+        row: int,
+        widget_index: int,
+        tail_width: Optional[int],
+    ) -> List[Tuple[int, Optional[urwid.TextCanvas], Optional[int]]]:
+        """Returns the parts of a line of a block.
 
-def parse_text(
-    text: str,
-    patterns: Iterable[re.Pattern],
-    repl: Callable[[re.Pattern, Tuple[Optional[str]], Tuple[int, int], ...], Markup],
-    *repl_args: Any,
-    **repl_kwargs: Any,
-) -> Markup:
-    r"""Parses a string into a text/widget markup.
+        Args:
+            block: A block of the widget's text.
+            row: The index of the line in the text canvas of *block*.
+            widget_index, tail_width: As in the items returned by
+              :py:meth:`_TextBlock.get_lines`.
 
-    Args:
-        text: The string to parse.
-        patterns: An iterable of RegEx pattern objects.
-        repl: A callable to replace a substring of *text* matched by any of the given
-          RegEx patterns.
-        repl_args: Additional positional arguments to be passed to *repl* whenever it's
-          called.
-        repl_kwargs: keyword arguments to be passed to *repl* whenever it's called.
+        Returns:
+            As :py:meth:`_uw_split_line` does. The line is split only the first time.
+        """
+        parts = block.parts.get(row)
+        if parts is None:
+            parts = block.parts[row] = self._uw_split_line(
+                block.text_canv,
+                row,
+                (
+                    None
+                    if tail_width is None
+                    else self._uw_embedded[widget_index][1] - tail_width
+                ),
+            )
 
-    Returns:
-        A text/widget markup (see :py:data:`Markup`) that should be compatible with
-        :py:class:`TextEmbed` and/or :py:class:`urwid.Text`, depending on the values
-        returned by *repl*.
+        return parts
 
-    Raises:
-        TypeError: An argument is of an unexpected type.
-        ValueError: *patterns* is empty.
-        ValueError: A given pattern object was not compiled from a :py:class:`str`
-          instance.
+    def _uw_render_inline(
+        self, window: List[Tuple[_TextBlock, int, int]], focus: bool
+    ) -> Optional[urwid.CompositeCanvas]:
+        """Renders the laid out text with the canvases of the embedded widgets inline.
 
-    Whenever any of the given RegEx patterns matches a **non-empty** substring of
-    *text*, *repl* is called with the following arguments (in the given order):
+        Args:
+            window: As in :py:meth:`_uw_render_window`.
+            focus: As in :py:meth:`render`.
 
-    - the :py:class:`~re.Pattern` object that matched the substring
-    - a tuple containing the match groups
+        Returns:
+            A canvas of all rows of *window*, with a single shard per block, each with
+            a single view of an :py:class:`_InlineCanvas` of the block, or ``None`` if
+            the canvas of any of the embedded widgets is not a single view of a
+            single-row canvas (see :py:func:`get_single_row_view`).
 
-      - starting with the whole match,
-      - followed by the all the subgroups of the match, from 1 up to however many
-        groups are in the pattern, if any (``None`` for each group that didn't
-        participate in the match)
+        The inline canvas of a block is reused across renders until any of the
+        widgets embedded in the block is invalidated.
+        """
+        if instrumentation.enabled:
+            n_renders = n_lines = n_tails = n_blocks = 0
+        fetch = urwid.CanvasCache.fetch
+        embedded = self._uw_embedded
+        widgets = embedded.widgets
+        widths = embedded.widths
+        base = embedded.base
+        shards = []
+        children = []
+        n_rows = 0
+        for block, top, bottom in window:
+            key, canv = block.inline.get(focus, (None, None))
+            if canv is None or fetch(key, _TextBlock, (), focus) is not canv:
+                # The block was never rendered inline or any of its widgets has been
+                # invalidated since it was last rendered
+                if block.spans is None or block.spans[:2] != (top, bottom):
+                    block.spans = (
+                        top,
+                        bottom,
+                        *self._uw_index_spans(block, top, bottom),
+                    )
+                _, _, spans, placements = block.spans
+                last_views = (
+                    block.inline_views.pop(focus, {})
+                    if canv is None
+                    else canv._uw_views
+                )
+                views = {}
+                block_children = []
+                for widget_index, col, row in placements:
+                    position = widget_index - base
+                    if not 0 <= position < len(widgets):
+                        return None  # Removed since `window` was retrieved
+                    widget_canv = widgets[position].render((widths[position], 1), focus)
+                    view = last_views.get(widget_index)
+                    if view is None or view[0] is not widget_canv:
+                        view = get_single_row_view(widget_canv)
+                        if view is None:
+                            return None
+                        view = (widget_canv, *view)
+                    views[widget_index] = view
+                    block_children.append((col, row, widget_canv, None))
+
+                canv = _InlineCanvas(block.text_canv, spans, views)
+                canv.children = block_children
+                key = object()
+                canv.finalize(key, (), focus)
+                urwid.CanvasCache.store(_TextBlock, canv)
+                block.inline[focus] = (key, canv)
+                if instrumentation.enabled:
+                    n_renders += len(views)
+                    n_lines += len(spans)
+                    n_tails += sum(
+                        tail_width is not None
+                        for row, _, tail_width, _ in block.index
+                        if top <= row < bottom
+                    )
+                    n_blocks += 1
+            shards.append(
+                (bottom - top, [(0, top, canv.cols(), bottom - top, None, canv)])
+            )
+            children.append((0, n_rows - top, canv, None))
+            n_rows += bottom - top
+
+        canv = urwid.CompositeCanvas()
+        canv.shards = shards
+        canv.children = children
+        if instrumentation.enabled:
+            emit = instrumentation.emit
+            emit("text_embed.widget_renders", self, n_renders)
+            emit("text_embed.placeholder_lines", self, n_lines)
+            emit("text_embed.tail_continuations", self, n_tails)
+            emit("text_embed.composite_canvases", self, n_blocks + 1)
+
+        return canv
+
+    def _uw_index_spans(self, block: _TextBlock, top: int, bottom: int) -> Tuple[
+        Dict[
+            int,
+            List[Tuple[int, Optional[urwid.TextCanvas], Optional[int], Optional[int]]],
+        ],
+        List[Tuple[int, int, int]],
+    ]:
+        """Indexes the parts of the lines of a block with embedded widgets.
 
-    - a tuple containing the span (start and end indexes) of the substring
-    - *repl_args* unpacked
-    - *repl_kwargs* unpacked
+        Args:
+            block: A block of the widget's text.
+            top, bottom: The range of rows of *block* to index.
 
-    and *should* return a valid text/widget markup (see :py:data:`Markup`). If the
-    value returned is *false* (such as ``None`` or an empty string), it is omitted
-    from the result.
+        Returns:
+            A tuple ``(spans, placements)``, where
 
-    .. collapse:: Example:
+            - *spans* is as in :py:class:`_InlineCanvas`.
+            - *placements* is a list of ``(widget_index, col, row)`` tuples, one for
+              each widget (even if wrapped/clipped) on the lines, in order, where
+              *col* and *row* are the position of the first part of the widget.
+        """
+        spans = {}
+        placements = []
+        for row, widget_index, tail_width, _ in block.index:
+            if not top <= row < bottom:
+                continue
+            row_spans = spans[row] = []
+            col = 0
+            for cols, part_canv, left in self._uw_get_line_parts(
+                block, row, widget_index, tail_width
+            ):
+                if part_canv is None:
+                    if not placements or widget_index > placements[-1][0]:
+                        placements.append((widget_index, col, row))
+                    row_spans.append((cols, None, left, widget_index))
+                    widget_index += 1
+                else:
+                    row_spans.append((cols, part_canv, None, None))
+                col += cols
 
-        >>> import re
-        >>> from urwid import Filler
-        >>> from urwidgets import Hyperlink, TextEmbed, parse_text
-        >>>
-        >>> MARKDOWN = {
-        >>>     re.compile(r"\*\*(.+?)\*\*"): lambda g: ("bold", g[1]),
-        >>>     re.compile("https://[^ ]+"): (
-        >>>         lambda g: (len(g[0]), Filler(Hyperlink(g[0])))
-        >>>     ),
-        >>>     re.compile(r"\[(.+)\]\((.+)\)"): (
-        >>>         lambda g: (len(g[1]), Filler(Hyperlink(g[2], text=g[1])))
-        >>>     ),
-        >>> }
-        >>>
-        >>> link = "https://urwid.org"
-        >>> text = f"[This]({link}) is a **link** to {link}"
-        >>> print(text)
-        [This](https://urwid.org) is a **link** to https://urwid.org
-        >>>
-        >>> markup = parse_text(
-        >>>     text, MARKDOWN, lambda pattern, groups, span: MARKDOWN[pattern](groups)
-        >>> )
-        >>> print(markup)
-        [
-          (4, <Filler box widget <Hyperlink flow widget>>),
-          ' is a ',
-          ('bold', 'link'),
-          ' to ',
-          (17, <Filler box widget <Hyperlink flow widget>>),
-        ]
-        >>>
-        >>> text_widget = TextEmbed(markup)
-        >>> canv = text_widget.render(())
-        >>> # The hyperlinks (`This` and `https://urwid.org`) should be highlighted
-        >>> # on mouse hover and clickable (in the terminal), if supported.
-        >>> print(canv.text[0].decode())
-        This is a link to https://urwid.org
+        return spans, placements
 
-    NOTE:
-        In the case of overlapping matches, the substring that occurs first is matched
-        and if they start at the same index, the pattern that appears first in
-        *patterns* takes precedence.
-    """
-    if not isinstance(text, str):
-        raise TypeError(f"Tnvalid type for 'text' (got: {type(text).__name__!r})")
-    if not text:
-        return text
+    def _uw_render_line(
+        self,
+        block: _TextBlock,
+        row: int,
+        widget_index: int,
+        tail_width: Optional[int],
+        canvases: Tuple[urwid.Canvas, ...],
+    ) -> urwid.CompositeCanvas:
+        """Embeds the given widgets' canvases in a line of a block.
 
-    patterns = tuple(patterns)
-    if not patterns:
-        raise ValueError("No RegEx patterns")
+        Args:
+            block: A block of the widget's text.
+            row: The index of the line in the text canvas of *block*.
+            widget_index, tail_width, canvases: As in the items returned by
+              :py:meth:`_TextBlock.get_lines`.
 
-    combined_pattern, indexed_patterns = combine_patterns(patterns)
-    full_markup = []
-    ptr = 0
-    for match in combined_pattern.finditer(text):
-        span = match.span()
-        if ptr < span[0]:
-            full_markup.append(text[ptr : span[0]])
-        if match.group():
-            pattern_index = match.lastindex
-            pattern = indexed_patterns[pattern_index]
-            markup = repl(
-                pattern,
-                match.groups()[pattern_index - 1 : pattern_index + pattern.groups],
-                span,
-                *repl_args,
-                **repl_kwargs,
-            )
-            if markup:
-                full_markup.append(markup)
-        ptr = span[1]
-    if ptr < len(text):
-        full_markup.append(text[ptr:])
+        Returns:
+            A canvas of the line, with a single shard.
 
-    return full_markup[0] if len(full_markup) == 1 else full_markup
+        The line is split (see :py:meth:`_uw_split_line`) only the first time it's
+        rendered, after which only the widgets' canvases are substituted.
+        """
+        parts = self._uw_get_line_parts(block, row, widget_index, tail_width)
+        cviews = []
+        children = []
+        coords = {}
+        canvases = iter(canvases)
+        col = 0
+        for cols, canv, left in parts:
+            if canv is None:
+                canv = next(canvases)
+                children.append((col, 0, canv, None))
+                if canv.coords:
+                    coords.update(canv.translate_coords(col, 0))
+                if isinstance(canv, urwid.CompositeCanvas):
+                    # A single shard, since the canvas has a single row
+                    shards = canv.shards
+                    if left or cols < canv.cols():
+                        shards = shards_trim_sides(shards, left, cols)
+                    cviews.extend(shards[0][1])
+                else:
+                    cviews.append((left, 0, cols, 1, None, canv))
+            else:
+                cviews.append((0, 0, cols, 1, None, canv))
+            col += cols
 
+        line_canv = urwid.CompositeCanvas()
+        line_canv.shards = [(1, cviews)]
+        line_canv.children = children
+        line_canv.coords = coords
 
-# Private
+        return line_canv
 
-RE_INLINE_FLAGS = {re.A: "a", re.I: "i", re.L: "L", re.M: "m", re.S: "s", re.X: "x"}
+    def _uw_render_window(
+        self,
+        window: List[Tuple[_TextBlock, int, int]],
+        focus: bool = False,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> Union[urwid.TextCanvas, urwid.CompositeCanvas]:
+        """Renders a range of rows of the laid out text.
 
+        Args:
+            window: A list of ``(block, top, bottom)`` tuples, in order, where *top*
+              and *bottom* are the range of rows of *block* in use (see
+              :py:class:`_TextBlock`), when the layout was retrieved.
+            focus: As in :py:meth:`render`.
+            start: The index of the first row to render, counting from the first row
+              of *window*.
+            stop: The index of the row after the last row to render or ``None`` for
+              till the last row of *window*.
 
-@lru_cache()
-def combine_patterns(
-    patterns: Tuple[re.Pattern],
-) -> Tuple[re.Pattern, Dict[int, re.Pattern]]:
-    """Combines multiple RegEx patterns with their respective flags into a single OR-ed
-    pattern.
+        Returns:
+            A canvas of the rows.
+        """
+        if instrumentation.enabled:
+            start_time = perf_counter()
+            n_lines = n_tails = 0
+        embedded = self._uw_embedded
+        if not embedded and len(window) == 1 and not start:
+            block, top, bottom = window[0]
+            if not top and bottom == block.text_canv.rows() and stop in (None, bottom):
+                if instrumentation.enabled:
+                    instrumentation.emit(
+                        "text_embed.render", self, perf_counter() - start_time
+                    )
+                if block.shared:
+                    return urwid.CompositeCanvas(block.text_canv)
+                return block.text_canv
+        if embedded and not start and stop is None:
+            canv = self._uw_render_inline(window, focus)
+            if canv is not None:
+                if instrumentation.enabled:
+                    instrumentation.emit(
+                        "text_embed.render", self, perf_counter() - start_time
+                    )
+                return canv
+
+        def render_widget(index: int) -> Optional[urwid.Canvas]:
+            # Each widget is rendered at most once per render, so that all parts of a
+            # wrapped/clipped widget come from the same canvas
+            canv = rendered.get(index)
+            if canv is None:
+                try:
+                    widget, width, _ = embedded[index]
+                except KeyError:  # Removed since `window` was retrieved
+                    return None
+                canv = rendered[index] = widget.render((width, 1), focus)
+            return canv
+
+        fetch = urwid.CanvasCache.fetch
+        rendered = {}
+        # The canvas is assembled directly from the shards of the lines, such that
+        # every run of lines without embedded widgets is a single shard with a single
+        # view of the text canvas and every line with embedded widgets is a single
+        # shard
+        shards = []
+        children = []
+        coords = {}
+        n_rows = 0
+        offset = 0  # The index of the first row of the current block in the window
+        for block, top, bottom in window:
+            block_offset = offset
+            offset += bottom - top
+            if start >= offset:
+                continue
+            if stop is not None:
+                if stop <= block_offset:
+                    break
+                bottom = min(bottom, top + stop - block_offset)
+            top = max(top, top + start - block_offset)
+
+            text_canv = block.text_canv
+            maxcol = text_canv.cols()
+            lines = block.get_lines(focus)
+            line_rows = block.line_rows
+            for line_index in range(
+                bisect_right(line_rows, top) - 1 if top else 0, len(lines)
+            ):
+                row, widget_index, tail_width, canvs, canv, key = lines[line_index]
+                if row >= bottom:
+                    break
+                if widget_index is None:
+                    first = max(row, top)
+                    rows = min(line_rows[line_index + 1], bottom) - first
+                    shards.append((rows, [(0, first, maxcol, rows, None, text_canv)]))
+                    n_rows += rows
+                    continue
+                if row < top:
+                    continue
+                if canv is None or fetch(key, _TextBlock, (), focus) is not canv:
+                    # The line was never rendered or any of its widgets has been
+                    # invalidated since it was last rendered
+                    new_canvs = tuple(
+                        map(
+                            render_widget,
+                            range(widget_index, widget_index + len(canvs)),
+                        )
+                    )
+                    if None in new_canvs:
+                        if canv is None:  # Display the line without the widgets
+                            shards.append((1, [(0, row, maxcol, 1, None, text_canv)]))
+                            n_rows += 1
+                            continue
+                    elif any(new is not old for new, old in zip(new_canvs, canvs)):
+                        canv = self._uw_render_line(
+                            block, row, widget_index, tail_width, new_canvs
+                        )
+                        canv.finalize(key, (), focus)
+                        urwid.CanvasCache.store(_TextBlock, canv)
+                        lines[line_index] = (
+                            row,
+                            widget_index,
+                            tail_width,
+                            new_canvs,
+                            canv,
+                            key,
+                        )
+                        if instrumentation.enabled:
+                            n_lines += 1
+                            n_tails += tail_width is not None
+                    else:  # Dropped from the canvas cache but none has changed
+                        urwid.CanvasCache.store(_TextBlock, canv)
+                shards.extend(canv.shards)
+                children.append((0, n_rows, canv, None))
+                if canv.coords:
+                    coords.update(canv.translate_coords(0, n_rows))
+                n_rows += 1
+
+        canv = urwid.CompositeCanvas()
+        canv.shards = shards
+        canv.children = children
+        canv.coords = coords
+        if instrumentation.enabled:
+            emit = instrumentation.emit
+            emit("text_embed.render", self, perf_counter() - start_time)
+            emit("text_embed.widget_renders", self, len(rendered))
+            emit("text_embed.placeholder_lines", self, n_lines)
+            emit("text_embed.tail_continuations", self, n_tails)
+            emit("text_embed.composite_canvases", self, n_lines + 1)
+
+        return canv
+
+    def _uw_get_layout(self, size: Tuple[int,]) -> List[_TextBlock]:
+        """Returns the layout of the widget's text for the given size.
+
+        The layout is computed only once for every combination of size, alignment and
+        wrap mode, and is afterwards only extended or trimmed by :py:meth:`append` and
+        :py:attr:`max_lines`. Like the layout cache of :py:class:`urwid.Text`, only
+        that for the latest size is kept.
+
+        The text appended since the last render is laid out as a new block, after
+        which the last two blocks are joined (see :py:meth:`_TextBlock.join`) for as
+        long as the last has at least as many rows in use as the one before it.
+        Hence, the number of blocks (and of the shards of a render) grows only
+        logarithmically with the number of appends and every row is copied only a
+        logarithmic number of times (amortized).
 
-    Returns:
-        A tuple containing
+        Returns:
+            The list of laid out blocks of the widget's text, in order.
+        """
+        blocks = self._uw_layout_cache.get(size)
+        if blocks is not None and self._uw_layout_start is not None:
+            # Lay out the text appended since the last render
+            block = self._uw_layout_block(
+                self._uw_layout_start - self._uw_text_offset, size[0]
+            )
+            if block.translation == [[]]:  # Text that can not be displayed
+                blocks = None
+            else:
+                blocks.append(block)
+                while len(blocks) > 1 and (
+                    blocks[-1].bottom - blocks[-1].top
+                    >= blocks[-2].bottom - blocks[-2].top
+                ):
+                    blocks[-2:] = [blocks[-2].join(blocks[-1])]
+        if blocks is None:
+            maxcol = size[0] if size else self.pack(size)[0]
+            blocks = [self._uw_layout_block(0, maxcol)]
+            self._uw_layout_cache = {size: blocks}
+        self._uw_layout_start = None
+
+        return blocks
+
+    def _uw_layout_block(self, start: int, maxcol: int) -> _TextBlock:
+        """Lays out a block of the widget's text.
 
-        - the combined RegEx pattern
-        - a dictionary mapping the index of the group in the combined pattern
-          corresponding to each given pattern to the pattern
+        Args:
+            start: The index of the start of the block (which must be the start of a
+              line) in the widget's text. The block spans till the end of the text.
+            maxcol: The layout width.
+
+        Returns:
+            The laid out block.
+        """
+        text, attrib = super().get_text()
+        block_text = text[start:]
+        if start:
+            # The attributes may not cover trailing text without a display attribute
+            attrib_index = len(attrib)
+            run_total = len(text) - self._uw_attrib_len
+            while run_total < len(block_text):
+                attrib_index -= 1
+                run_total += attrib[attrib_index][1]
+            attrib = attrib[attrib_index:]
+            if attrib:
+                attrib[0] = (
+                    attrib[0][0],
+                    attrib[0][1] - (run_total - len(block_text)),
+                )
+
+        key = None
+        if (
+            not start
+            and len(block_text) <= TextEmbed._UW_SHARED_LAYOUT_MAX_LEN
+            and TextEmbed._uw_shared_layouts_maxsize != 0
+        ):
+            # The placeholder indexes depend on the widths and start positions of the
+            # embedded widgets, which are implied by the text and the indexes of the
+            # widgets (display attributes).
+            key = (
+                block_text,
+                tuple(attrib),
+                maxcol,
+                self.align,
+                self.wrap,
+                self.layout,
+                (type(self).PLACEHOLDER_HEAD, type(self).PLACEHOLDER_TAIL),
+            )
+            shared = TextEmbed._uw_fetch_shared_layout(key)
+            if shared is not None:
+                text_canv, translation, index, parts = shared
+                return _TextBlock(
+                    text_canv, translation, index, self._uw_text_offset, parts
+                )
+
+        translation = self.layout.layout(block_text, maxcol, self.align, self.wrap)
+        text_canv = apply_text_layout(block_text, attrib, translation, maxcol)
+        if self.wrap == "clip" and self.align == "center":
+            fix_text_canvas_attr(text_canv)
+        widget_index = (
+            self._uw_embedded.base
+            + len(self._uw_embedded)
+            - block_text.count(type(self).PLACEHOLDER_HEAD)
+        )
+        index = self._uw_index_placeholders(text_canv, translation, widget_index)
+        if key is not None:
+            parts = {}
+            if TextEmbed._uw_store_shared_layout(
+                key, (text_canv, translation, index, parts)
+            ):
+                return _TextBlock(
+                    text_canv, translation, index, self._uw_text_offset, parts
+                )
+
+        return _TextBlock(text_canv, translation, index, self._uw_text_offset + start)
+
+    @staticmethod
+    def _uw_evict_shared_layouts() -> None:
+        """Evicts the least recently used shared layouts in excess of the maximum.
+
+        Must be called with the cache lock held.
+        """
+        layouts = TextEmbed._UW_SHARED_LAYOUTS
+        maxsize = TextEmbed._uw_shared_layouts_maxsize
+        if maxsize is not None:
+            while len(layouts) > maxsize:
+                layouts.popitem(last=False)
+                TextEmbed._uw_shared_layouts_evictions += 1
+
+    @staticmethod
+    def _uw_fetch_shared_layout(key: tuple) -> Optional[_SharedLayout]:
+        """Returns a shared layout or ``None`` if not cached."""
+        layouts = TextEmbed._UW_SHARED_LAYOUTS
+        with TextEmbed._UW_SHARED_LAYOUTS_LOCK:
+            try:
+                shared = layouts.get(key)
+            except TypeError:  # Unhashable display attribute
+                return None
+            if shared is None:
+                TextEmbed._uw_shared_layouts_misses += 1
+            else:
+                layouts.move_to_end(key)
+                TextEmbed._uw_shared_layouts_hits += 1
+
+        return shared
+
+    @staticmethod
+    def _uw_store_shared_layout(key: tuple, shared: _SharedLayout) -> bool:
+        """Caches a shared layout.
+
+        Returns:
+            ``True`` if the layout was cached. Otherwise, ``False``.
+        """
+        with TextEmbed._UW_SHARED_LAYOUTS_LOCK:
+            if TextEmbed._uw_shared_layouts_maxsize == 0:
+                return False
+            try:
+                TextEmbed._UW_SHARED_LAYOUTS[key] = shared
+            except TypeError:  # Unhashable display attribute
+                return False
+            TextEmbed._uw_evict_shared_layouts()
+
+        return True
+
+    def _uw_index_placeholders(
+        self,
+        text_canv: urwid.TextCanvas,
+        translation: List[List[Tuple[int, ...]]],
+        widget_index: int,
+    ) -> List[Tuple[int, int, Optional[int], int]]:
+        """Indexes the lines of a text canvas containing any part of a placeholder.
+
+        Args:
+            text_canv: The text canvas of a block of the widget's text (with
+              placeholders).
+            translation: The layout structure from which *text_canv* was produced.
+            widget_index: The index of the first widget in the block.
+
+        Returns:
+            A list of ``(row, widget_index, tail_width, n_widgets)`` tuples, in order,
+            one for each line containing any part of a placeholder, where
+
+            - *row* is the index of the line in *text_canv*.
+            - *widget_index* is the index of the first widget on the line.
+            - *tail_width* is the width of the tail of a wrapped/clipped widget at the
+              start of the line i.e the number of columns of the widget's canvas from
+              the start of the line to its right end, or ``None`` if the line doesn't
+              start with a tail.
+            - *n_widgets* is the number of widgets on the line.
+        """
+        embedded = self._uw_embedded
+        placeholder_head = type(self).PLACEHOLDER_HEAD
+        placeholder_tail = type(self).PLACEHOLDER_TAIL
+        placeholder_pattern = type(self)._UW_PLACEHOLDER_PATTERN
+        tail_pattern = type(self)._UW_TAIL_PATTERN
+        text = b"\n".join(text_canv._text).decode()
+        clipped = self.wrap == "clip"
+        index = []
+        row = 0
+        pos = 0
+        tail_width = None  # Width of the tail carried over to the next line
+
+        for match in type(self)._UW_PLACEHOLDER_LINE_PATTERN.finditer(text):
+            row += text.count("\n", pos, match.start())
+            pos = match.start()
+            line = match.group()
+            n_heads = line.count(placeholder_head)
+
+            if clipped:
+                line_attr = text_canv._attr[row]
+                if line.startswith(placeholder_tail):  # align != "left"
+                    widget_index = line_attr[0][0]
+                    _, width, start_pos = embedded[widget_index]
+                    left_trim = -translation[row][0][0]
+                    # the placeholder is clipped => left_trim > start_pos
+                    tail_width = width - (left_trim - start_pos)
+                    index.append((row, widget_index, tail_width, n_heads + 1))
+                else:
+                    for widget_index, _ in line_attr:
+                        if isinstance(widget_index, int):
+                            break
+                    index.append((row, widget_index, None, n_heads))
+                continue
+
+            if tail_width:
+                # - Only one possible occurence of a tail per line
+                # - Might be preceded by padding spaces when `align != "left"`
+                tail_string = tail_pattern.match(line).group(2)
+                index.append((row, widget_index - 1, tail_width, n_heads + 1))
+                tail_width -= len(tail_string)
+            else:
+                index.append((row, widget_index, None, n_heads))
+
+            if n_heads:
+                widget_index += n_heads
+                # Only the last placeholder on a line may be wrapped
+                part = placeholder_pattern.findall(line)[-1]
+                tail_width = embedded[widget_index - 1][1] - len(part)
+
+        return index
+
+
+class CompiledMarkup:
+    """A text/widget markup, processed for use with :py:class:`TextEmbed`.
+
+    Args:
+        markup: A text/widget markup (see :py:class:`TextEmbed`). In place of a
+          widget, ``None`` may be given (e.g ``(5, None)``) to leave a widget slot
+          unbound.
+        text_embed_cls: The class (:py:class:`TextEmbed` or a subclass) of the
+          widgets with which the compiled markup is to be used.
+
+    Raises:
+        TypeError: A widget markup element has a non-integer display attribute.
+        ValueError: A widget doesn't support box sizing.
+        ValueError: A widget has a non-positive width (display attribute).
+
+    The markup is flattened into the text, display attribute runs and widget slots
+    once, after which it can be used to set (or append to) the content of any number
+    of :py:class:`TextEmbed` widgets, at a cost proportional to the number of widget
+    slots and display attribute runs. Also, markup of any depth of nesting is
+    supported.
+
+    Different widgets can be bound to the slots of a compiled markup via
+    :py:meth:`bind`. A compiled markup with unbound slots can not be used with a
+    widget.
+
+    .. collapse:: Example:
+
+        >>> from urwidgets import CompiledMarkup, TextEmbed
+        >>> from urwid import Filler, Text
+        >>>
+        >>> row = CompiledMarkup([("bold", "Name: "), (10, None), " Age: ", (3, None)])
+        >>> rows = [
+        ...     TextEmbed(row.bind([Filler(Text(name)), Filler(Text(str(age)))]))
+        ...     for name, age in (("Alice", 32), ("Bob", 27))
+        ... ]
+    """
+
+    __slots__ = (
+        "_attrib",
+        "_attrib_len",
+        "_last_line_width",
+        "_multiline",
+        "_n_first_line_slots",
+        "_placeholders",
+        "_start_positions",
+        "_text",
+        "_widgets",
+        "_widths",
+    )
+
+    def __init__(
+        self, markup: Markup, text_embed_cls: Type[TextEmbed] = TextEmbed
+    ) -> None:
+        placeholders = (
+            text_embed_cls.PLACEHOLDER_HEAD,
+            text_embed_cls.PLACEHOLDER_TAIL,
+        )
+        (
+            self._text,
+            attrib,
+            slots,
+            self._n_first_line_slots,
+            self._last_line_width,
+        ) = compile_markup(markup, *placeholders)
+        self._attrib = tuple(attrib)
+        self._attrib_len = rle_len(attrib)
+        self._multiline = "\n" in self._text
+        self._placeholders = placeholders
+        self._widgets, self._widths, self._start_positions = (
+            (tuple(field) for field in zip(*slots)) if slots else ((), (), ())
+        )
+
+    def __repr__(self) -> str:
+        n_unbound = self._widgets.count(None)
+        return (
+            f"<{type(self).__name__}: {len(self._text)} characters, "
+            f"{len(self._widths)} widget slots"
+            + (f" ({n_unbound} unbound)" if n_unbound else "")
+            + ">"
+        )
+
+    attrib = property(
+        lambda self: list(self._attrib),
+        doc="""Run-length encoding of display attributes of the text.
+
+        :type: List[Tuple[Union[DisplayAttribute, int], int]]
+
+        As in :py:meth:`TextEmbed.get_text`, where the display attribute of a widget
+        slot is the index of the slot.
+        """,
+    )
+
+    text = property(
+        lambda self: self._text,
+        doc="""The text, with a placeholder for every widget slot.
+
+        :type: str
+        """,
+    )
+
+    widgets = property(
+        lambda self: self._widgets,
+        doc="""The widgets bound to the slots, in order.
+
+        :type: Tuple[Optional[urwid.Widget], ...]
+
+        ``None`` for an unbound slot.
+        """,
+    )
+
+    widths = property(
+        lambda self: self._widths,
+        doc="""The widths of the widget slots, in order.
+
+        :type: Tuple[int, ...]
+        """,
+    )
+
+    def bind(self, widgets: Iterable[urwid.Widget]) -> CompiledMarkup:
+        """Binds widgets to the slots.
+
+        Args:
+            widgets: A widget for every slot, in order.
+
+        Returns:
+            A compiled markup with the same text, display attributes and widget slots
+            as this one but with *widgets* bound to the slots. This one is left as-is.
+
+        Raises:
+            TypeError: An item of *widgets* is not a widget.
+            ValueError: The number of widgets differs from the number of slots.
+            ValueError: A widget doesn't support box sizing.
+        """
+        widgets = tuple(widgets)
+        if len(widgets) != len(self._widths):
+            raise ValueError(
+                f"Expected {len(self._widths)} widget(s) (got: {len(widgets)})"
+            )
+        for widget in widgets:
+            if not isinstance(widget, urwid.Widget):
+                raise TypeError(
+                    f"Invalid type for widget (got: {type(widget).__name__!r})"
+                )
+            if "box" not in widget.sizing():
+                raise ValueError(f"Not a box widget (got: {widget!r})")
+
+        compiled = object.__new__(type(self))
+        for name in CompiledMarkup.__slots__:
+            setattr(compiled, name, getattr(self, name))
+        compiled._widgets = widgets
+
+        return compiled
+
+
+def parse_text(
+    text: str,
+    patterns: Iterable[re.Pattern],
+    repl: Callable[[re.Pattern, Tuple[Optional[str]], Tuple[int, int], ...], Markup],
+    *repl_args: Any,
+    **repl_kwargs: Any,
+) -> Markup:
+    r"""Parses a string into a text/widget markup.
+
+    Args:
+        text: The string to parse.
+        patterns: An iterable of RegEx pattern objects or a :py:class:`PatternSet`.
+        repl: A callable to replace a substring of *text* matched by any of the given
+          RegEx patterns.
+        repl_args: Additional positional arguments to be passed to *repl* whenever it's
+          called.
+        repl_kwargs: keyword arguments to be passed to *repl* whenever it's called.
+
+    Returns:
+        A text/widget markup (see :py:data:`Markup`) that should be compatible with
+        :py:class:`TextEmbed` and/or :py:class:`urwid.Text`, depending on the values
+        returned by *repl*.
+
+    Raises:
+        TypeError: An argument is of an unexpected type.
+        ValueError: *patterns* is empty.
+        ValueError: A given pattern object was not compiled from a :py:class:`str`
+          instance.
+
+    Whenever any of the given RegEx patterns matches a **non-empty** substring of
+    *text*, *repl* is called with the following arguments (in the given order):
+
+    - the :py:class:`~re.Pattern` object that matched the substring
+    - a tuple containing the match groups
+
+      - starting with the whole match,
+      - followed by the all the subgroups of the match, from 1 up to however many
+        groups are in the pattern, if any (``None`` for each group that didn't
+        participate in the match)
+
+    - a tuple containing the span (start and end indexes) of the substring
+    - *repl_args* unpacked
+    - *repl_kwargs* unpacked
+
+    and *should* return a valid text/widget markup (see :py:data:`Markup`). If the
+    value returned is *false* (such as ``None`` or an empty string), it is omitted
+    from the result.
+
+    .. collapse:: Example:
+
+        >>> import re
+        >>> from urwid import Filler
+        >>> from urwidgets import Hyperlink, TextEmbed, parse_text
+        >>>
+        >>> MARKDOWN = {
+        >>>     re.compile(r"\*\*(.+?)\*\*"): lambda g: ("bold", g[1]),
+        >>>     re.compile("https://[^ ]+"): (
+        >>>         lambda g: (len(g[0]), Filler(Hyperlink(g[0])))
+        >>>     ),
+        >>>     re.compile(r"\[(.+)\]\((.+)\)"): (
+        >>>         lambda g: (len(g[1]), Filler(Hyperlink(g[2], text=g[1])))
+        >>>     ),
+        >>> }
+        >>>
+        >>> link = "https://urwid.org"
+        >>> text = f"[This]({link}) is a **link** to {link}"
+        >>> print(text)
+        [This](https://urwid.org) is a **link** to https://urwid.org
+        >>>
+        >>> markup = parse_text(
+        >>>     text, MARKDOWN, lambda pattern, groups, span: MARKDOWN[pattern](groups)
+        >>> )
+        >>> print(markup)
+        [
+          (4, <Filler box widget <Hyperlink flow widget>>),
+          ' is a ',
+          ('bold', 'link'),
+          ' to ',
+          (17, <Filler box widget <Hyperlink flow widget>>),
+        ]
+        >>>
+        >>> text_widget = TextEmbed(markup)
+        >>> canv = text_widget.render(())
+        >>> # The hyperlinks (`This` and `https://urwid.org`) should be highlighted
+        >>> # on mouse hover and clickable (in the terminal), if supported.
+        >>> print(canv.text[0].decode())
+        This is a link to https://urwid.org
+
+    NOTE:
+        In the case of overlapping matches, the substring that occurs first is matched
+        and if they start at the same index, the pattern that appears first in
+        *patterns* takes precedence.
+    """
+    if not isinstance(text, str):
+        raise TypeError(f"Tnvalid type for 'text' (got: {type(text).__name__!r})")
+    if not text:
+        return text
+
+    if instrumentation.enabled:
+        start_time = perf_counter()
+    full_markup = list(
+        iter_markup((text,), get_pattern_set(patterns), repl, repl_args, repl_kwargs)
+    )
+    if instrumentation.enabled:
+        instrumentation.emit("parse_text", None, perf_counter() - start_time)
+
+    return full_markup[0] if len(full_markup) == 1 else full_markup
+
+
+def iter_parse_text(
+    text: Union[str, Iterable[str]],
+    patterns: Iterable[re.Pattern],
+    repl: Callable[[re.Pattern, Tuple[Optional[str]], Tuple[int, int], ...], Markup],
+    *repl_args: Any,
+    max_match_len: int = 4096,
+    **repl_kwargs: Any,
+) -> Iterator[Markup]:
+    """Lazily parses a string or a stream of strings into text/widget markup elements.
+
+    Args:
+        text: The string to parse or an iterable of consecutive chunks of the string
+          (e.g a file opened in text mode).
+        patterns: An iterable of RegEx pattern objects or a :py:class:`PatternSet`.
+        repl: A callable to replace a substring of *text* matched by any of the given
+          RegEx patterns.
+        repl_args: Additional positional arguments to be passed to *repl* whenever it's
+          called.
+        max_match_len: The maximum length of a substring that may be matched by any of
+          the given patterns, including any text examined by lookaround assertions.
+          Only applies if *text* is an iterable of chunks.
+        repl_kwargs: keyword arguments to be passed to *repl* whenever it's called.
+
+    Returns:
+        An iterator that yields the elements of the markup that :py:func:`parse_text`
+        would return for the entire string (as a list), in order.
+
+    Raises:
+        TypeError: An argument is of an unexpected type.
+        ValueError: *patterns* is empty.
+        ValueError: A given pattern object was not compiled from a :py:class:`str`
+          instance.
+        ValueError: *max_match_len* is not positive.
+
+    *repl* is called as described for :py:func:`parse_text`, as matches are found,
+    and the span passed to it is relative to the start of the entire string.
+
+    The text is only scanned as elements are requested from the iterator, so the
+    caller may stop early. Also, when parsing chunks, only a bounded part of the
+    string (proportional to *max_match_len* and the size of a chunk) is held in
+    memory at a time, no matter the size of the entire string. Matches may span
+    chunks but substrings matched by the patterns should never be longer than
+    *max_match_len*.
+
+    NOTE:
+        When parsing chunks, a substring not matched by any of the patterns may be
+        yielded in parts.
+
+    TIP:
+        *max_match_len* is not passed on to *repl*.
+    """
+    if isinstance(text, str):
+        text = (text,)
+    elif not isinstance(text, Iterable):
+        raise TypeError(f"Invalid type for 'text' (got: {type(text).__name__!r})")
+
+    pattern_set = get_pattern_set(patterns)
+    check_max_match_len(max_match_len)
+
+    return iter_markup(text, pattern_set, repl, repl_args, repl_kwargs, max_match_len)
+
+
+class TextParser:
+    """A parser of strings into text/widget markup, for strings that grow.
+
+    Args:
+        patterns: See :py:func:`parse_text`.
+        repl: See :py:func:`parse_text`.
+        repl_args: See :py:func:`parse_text`.
+        max_match_len: See :py:func:`iter_parse_text`.
+        repl_kwargs: See :py:func:`parse_text`.
+
+    Raises:
+        TypeError: An argument is of an unexpected type.
+        ValueError: *patterns* is empty.
+        ValueError: A given pattern object was not compiled from a :py:class:`str`
+          instance.
+        ValueError: *max_match_len* is not positive.
+
+    The result of :py:meth:`parse` is the same as that of :py:func:`parse_text` with
+    the same arguments but when the string parsed is an extension of (i.e starts
+    with) the string last parsed, only the part of the string from a resume point
+    near the end of the last string is scanned, and *repl* is called only for new
+    matches.
+
+    The resume point is at least *max_match_len* characters before the end of the
+    last string, since no match that starts before then could be affected by the
+    extension, provided substrings matched by the patterns are never longer than
+    *max_match_len*. For matches found after the resume point, the result of *repl*
+    is reused if they're found again (with the same span and groups).
+
+    .. collapse:: Example:
+
+        >>> import re
+        >>> from urwid import Filler
+        >>> from urwidgets import Hyperlink, TextEmbed, TextParser
+        >>>
+        >>> parser = TextParser(
+        >>>     [re.compile("https://[^ ]+")],
+        >>>     lambda pattern, groups, span: (
+        >>>         len(groups[0]), Filler(Hyperlink(groups[0]))
+        >>>     ),
+        >>> )
+        >>> message = "See https://urwid.org"
+        >>> text_widget = TextEmbed(parser.parse(message))
+        >>> message += " and https://github.com/urwid/urwid"
+        >>> # Only the new link is replaced
+        >>> text_widget.set_text(parser.parse(message))
+    """
+
+    def __init__(
+        self,
+        patterns: Iterable[re.Pattern],
+        repl: Callable[
+            [re.Pattern, Tuple[Optional[str]], Tuple[int, int], ...], Markup
+        ],
+        *repl_args: Any,
+        max_match_len: int = 4096,
+        **repl_kwargs: Any,
+    ) -> None:
+        self._pattern_set = get_pattern_set(patterns)
+        check_max_match_len(max_match_len)
+
+        self._repl = repl
+        self._repl_args = repl_args
+        self._repl_kwargs = repl_kwargs
+        self._max_match_len = max_match_len
+        self.reset()
+
+    def parse(self, text: str) -> Markup:
+        """Parses a string into a text/widget markup.
+
+        Args:
+            text: The string to parse.
+
+        Returns:
+            See :py:func:`parse_text`.
+
+        Raises:
+            TypeError: *text* is not a string.
+        """
+        if not isinstance(text, str):
+            raise TypeError(f"Invalid type for 'text' (got: {type(text).__name__!r})")
+        if not text.startswith(self._text):
+            self.reset()
+        self._text = text
+        if not text:
+            return text
+
+        instrumented = instrumentation.enabled
+        if instrumented:
+            start_time = perf_counter()
+            n_repl_calls = 0
+        final_end = len(text) - self._max_match_len
+        final_markup = self._markup
+        markup = final_markup
+        last_matches = self._matches
+        matches = self._matches = {}
+        text_start = self._text_start
+        for start, end, pattern, groups in self._pattern_set._finditer(text, self._ptr):
+            if start >= final_end and markup is final_markup:
+                # Neither this match nor the text before it is final
+                self._ptr = max(self._ptr, text_start, final_end)
+                self._text_start = text_start
+                markup = final_markup.copy()
+            if text_start < start:
+                markup.append(text[text_start:start])
+            if end > start:
+                key = (start, end, pattern)
+                last_groups, match_markup = last_matches.get(key, (None, None))
+                if last_groups != groups:
+                    match_markup = self._repl(
+                        pattern,
+                        groups,
+                        (start, end),
+                        *self._repl_args,
+                        **self._repl_kwargs,
+                    )
+                    if instrumented:
+                        n_repl_calls += 1
+                if markup is not final_markup:
+                    matches[key] = (groups, match_markup)
+                if match_markup:
+                    markup.append(match_markup)
+            text_start = end
+        if markup is final_markup:
+            self._ptr = max(self._ptr, text_start, final_end)
+            self._text_start = text_start
+            markup = final_markup.copy()
+        if text_start < len(text):
+            markup.append(text[text_start:])
+        if instrumented:
+            instrumentation.emit("repl_calls", self, n_repl_calls)
+            instrumentation.emit("text_parser.parse", self, perf_counter() - start_time)
+
+        return markup[0] if len(markup) == 1 else markup
+
+    def reset(self) -> None:
+        """Clears the state of the parser.
+
+        The string parsed next is scanned entirely.
+        """
+        self._text = ""
+        self._markup = []  # The final elements of the markup
+        self._matches = {}  # {(start, end, pattern): (groups, markup), ...}
+        # The scan resumes from `_ptr` and any text before the next match starts from
+        # `_text_start`, which is the end of the last final match
+        self._ptr = self._text_start = 0
+
+
+class ParseCache:
+    """A cache of the results of parsing strings into text/widget markup, for strings
+    that are parsed repeatedly.
+
+    Args:
+        patterns: See :py:func:`parse_text`.
+        repl: See :py:func:`parse_text`.
+        repl_args: See :py:func:`parse_text`.
+        maxsize: The maximum number of strings whose results are cached. If ``None``,
+          the number is unlimited. If zero, no result is cached.
+        max_bytes: The maximum total estimated size (in bytes) of the cached
+          entries. If ``None``, the size is unlimited. See the description below.
+        share_markup: If ``True``, the markup is cached and returned for every parse
+          of the same string. Otherwise, only the matches found in the string are
+          cached and the markup is produced again (calling *repl* for every match) for
+          every parse of the same string, without scanning it.
+        repl_kwargs: See :py:func:`parse_text`.
+
+    Raises:
+        TypeError: An argument is of an unexpected type.
+        ValueError: *patterns* is empty.
+        ValueError: A given pattern object was not compiled from a :py:class:`str`
+          instance.
+        ValueError: *maxsize* or *max_bytes* is negative.
+
+    The result of :py:meth:`parse` is the same as that of :py:func:`parse_text` with
+    the same arguments but the patterns and *repl* are only applied to a string if
+    it's not found in the cache. When the cache is full, the least recently parsed
+    strings are evicted first.
+
+    The size of an entry is estimated (via :py:func:`sys.getsizeof`) as that of the
+    string plus those of the lists, tuples and strings (including the text and
+    groups of matches) of its cached result, plus the shallow sizes of any other
+    objects in it, such as embedded widgets, but excluding the patterns which are
+    shared by all entries. A result larger than *max_bytes* is not cached.
+
+    With *share_markup*, the same markup (including embedded widgets) is returned
+    for every parse of a string, hence it should not be modified and can only be
+    used in one place at a time if it contains widgets that can't.
+
+    .. collapse:: Example:
+
+        >>> import re
+        >>> from urwid import Filler
+        >>> from urwidgets import Hyperlink, ParseCache, TextEmbed
+        >>>
+        >>> cache = ParseCache(
+        >>>     [re.compile("https://[^ ]+")],
+        >>>     lambda pattern, groups, span: (
+        >>>         len(groups[0]), Filler(Hyperlink(groups[0]))
+        >>>     ),
+        >>>     maxsize=50_000,
+        >>>     share_markup=False,
+        >>> )
+        >>> # Messages scrolled back into view are not scanned again
+        >>> widgets = [TextEmbed(cache.parse(message)) for message in messages]
+    """
+
+    def __init__(
+        self,
+        patterns: Iterable[re.Pattern],
+        repl: Callable[
+            [re.Pattern, Tuple[Optional[str]], Tuple[int, int], ...], Markup
+        ],
+        *repl_args: Any,
+        maxsize: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        share_markup: bool = True,
+        **repl_kwargs: Any,
+    ) -> None:
+        for name, value in (("maxsize", maxsize), ("max_bytes", max_bytes)):
+            if value is not None:
+                if not isinstance(value, int):
+                    raise TypeError(
+                        f"Invalid type for {name!r} (got: {type(value).__name__!r})"
+                    )
+                if value < 0:
+                    raise ValueError(f"Invalid value for {name!r} (got: {value})")
+
+        self._pattern_set = get_pattern_set(patterns)
+        self._repl = repl
+        self._repl_args = repl_args
+        self._repl_kwargs = repl_kwargs
+        self._maxsize = maxsize
+        self._max_bytes = max_bytes
+        self._share_markup = bool(share_markup)
+        self._lock = Lock()
+        self.clear()
+
+    def cache_info(self) -> _ParseCacheInfo:
+        """Returns statistics of the cache.
+
+        Returns:
+            A named tuple with the fields:
+
+            - ``hits``: the number of parses of strings found in the cache
+            - ``misses``: the number of parses of strings not found in the cache
+            - ``evictions``: the number of strings evicted to free space
+            - ``maxsize``: the maximum number of strings cached (``None`` if
+              unlimited)
+            - ``currsize``: the number of strings currently cached
+            - ``max_bytes``: the maximum total estimated size of the entries cached
+              (``None`` if unlimited)
+            - ``currbytes``: the total estimated size of the entries currently
+              cached
+
+        The statistics are reset by :py:meth:`clear`.
+        """
+        with self._lock:
+            return _ParseCacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self._maxsize,
+                len(self._cache),
+                self._max_bytes,
+                self._n_bytes,
+            )
+
+    def clear(self) -> None:
+        """Clears the cache and resets its statistics."""
+        with self._lock:
+            # {text: (markup or matches, size), ...}, in LRU order
+            self._cache: OrderedDict[str, Tuple[Any, int]] = OrderedDict()
+            self._n_bytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def parse(self, text: str) -> Markup:
+        """Parses a string into a text/widget markup or returns the cached result.
+
+        Args:
+            text: The string to parse.
+
+        Returns:
+            See :py:func:`parse_text`.
+
+        Raises:
+            TypeError: *text* is not a string.
+        """
+        if not isinstance(text, str):
+            raise TypeError(f"Invalid type for 'text' (got: {type(text).__name__!r})")
+
+        cache = self._cache
+        with self._lock:
+            entry = cache.get(text)
+            if entry is None:
+                self._misses += 1
+            else:
+                cache.move_to_end(text)
+                self._hits += 1
+
+        if entry is None:
+            if self._share_markup:
+                value = parse_text(
+                    text,
+                    self._pattern_set,
+                    self._repl,
+                    *self._repl_args,
+                    **self._repl_kwargs,
+                )
+            else:
+                value = list(self._pattern_set._finditer(text))
+            size = get_entry_size(text, value)
+            if self._maxsize != 0 and (
+                self._max_bytes is None or size <= self._max_bytes
+            ):
+                with self._lock:
+                    if text not in cache:
+                        cache[text] = (value, size)
+                        self._n_bytes += size
+                        self._evict()
+        else:
+            value = entry[0]
+
+        if self._share_markup:
+            return value
+
+        return get_markup(text, value, self._repl, self._repl_args, self._repl_kwargs)
+
+    def _evict(self) -> None:
+        """Evicts the least recently parsed strings in excess of the maximums.
+
+        Must be called with the lock held.
+        """
+        cache = self._cache
+        maxsize = self._maxsize
+        max_bytes = self._max_bytes
+        while (maxsize is not None and len(cache) > maxsize) or (
+            max_bytes is not None and self._n_bytes > max_bytes
+        ):
+            _, (_, size) = cache.popitem(last=False)
+            self._n_bytes -= size
+            self._evictions += 1
+
+
+class PatternSet:
+    r"""A precompiled set of RegEx patterns.
+
+    Args:
+        patterns: An iterable of RegEx pattern objects.
+
+    Raises:
+        TypeError: An argument is of an unexpected type.
+        ValueError: *patterns* is empty.
+        ValueError: A given pattern object was not compiled from a :py:class:`str`
+          instance.
+
+    The patterns are combined into a single RegEx pattern only once, upon creation.
+
+    If there are multiple patterns and every match of each pattern must start with a
+    literal string (e.g ``https://``, ``**`` or ``[``), which is determined upon
+    creation, matches are instead searched for via the prefixes; only the patterns
+    whose prefixes occur at a position are tried there, in the given order, and only
+    the groups of the pattern that matched are extracted. This is much faster with
+    many patterns and yields the same matches, except that the patterns are matched
+    separately, hence numbered backreferences within them are not affected by the
+    groups of other patterns. See :py:attr:`prefiltered`.
+
+    An instance may be given wherever an iterable of patterns is expected by
+    :py:func:`parse_text`, :py:func:`iter_parse_text` or :py:class:`TextParser`, in
+    which case the patterns are used as-is.
+
+    When any other iterable of patterns is given instead, a pattern set is looked up
+    in a process-wide cache keyed by the patterns (in the given order), and created
+    and cached if not found. When the cache is full, the least recently used pattern
+    set is evicted. See :py:meth:`cache_info` and :py:meth:`set_cache_size`.
+
+    An instance is also an iterable of the patterns, in the given order.
+
+    .. collapse:: Example:
+
+        >>> import re
+        >>> from urwidgets import PatternSet, parse_text
+        >>>
+        >>> BOLD = PatternSet([re.compile(r"\*\*(.+?)\*\*")])
+        >>> parse_text("a **bold** word", BOLD, lambda pattern, groups, span: (
+        >>>     "bold", groups[1]
+        >>> ))
+        ['a ', ('bold', 'bold'), ' word']
+    """
+
+    _cache: ClassVar[OrderedDict[Tuple[re.Pattern, ...], PatternSet]] = OrderedDict()
+    _cache_lock: ClassVar[Lock] = Lock()
+    _cache_maxsize: ClassVar[Optional[int]] = 128
+    _cache_hits: ClassVar[int] = 0
+    _cache_misses: ClassVar[int] = 0
+    _cache_evictions: ClassVar[int] = 0
+
+    def __init__(self, patterns: Iterable[re.Pattern]) -> None:
+        patterns = tuple(patterns)
+        if not patterns:
+            raise ValueError("No RegEx patterns")
+
+        self._patterns = patterns
+        self._combined_pattern, self._indexed_patterns = combine_patterns(patterns)
+        self._prefilter = get_prefilter(patterns) if len(patterns) > 1 else None
+
+    def __iter__(self) -> Iterator[re.Pattern]:
+        return iter(self._patterns)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self._patterns)!r})"
+
+    patterns = property(
+        lambda self: self._patterns,
+        doc="""The patterns in the set.
+
+        :type: Tuple[re.Pattern, ...]
+        """,
+    )
+
+    prefiltered = property(
+        lambda self: self._prefilter is not None,
+        doc="""Whether matches are searched for via the literal prefixes of the
+        patterns.
+
+        :type: bool
+
+        See the description of the class.
+        """,
+    )
+
+    @staticmethod
+    def cache_clear() -> None:
+        """Clears the process-wide pattern set cache and resets its statistics."""
+        with PatternSet._cache_lock:
+            PatternSet._cache.clear()
+            PatternSet._cache_hits = PatternSet._cache_misses = 0
+            PatternSet._cache_evictions = 0
+
+    @staticmethod
+    def cache_info() -> _CacheInfo:
+        """Returns statistics of the process-wide pattern set cache.
+
+        Returns:
+            A named tuple with the fields:
+
+            - ``hits``: the number of lookups that found a pattern set
+            - ``misses``: the number of lookups that did not find a pattern set
+            - ``evictions``: the number of pattern sets evicted to free space
+            - ``maxsize``: the maximum number of pattern sets cached (``None`` if
+              unlimited)
+            - ``currsize``: the number of pattern sets currently cached
+
+        The statistics are reset by :py:meth:`cache_clear`.
+        """
+        with PatternSet._cache_lock:
+            return _CacheInfo(
+                PatternSet._cache_hits,
+                PatternSet._cache_misses,
+                PatternSet._cache_evictions,
+                PatternSet._cache_maxsize,
+                len(PatternSet._cache),
+            )
+
+    @staticmethod
+    def set_cache_size(maxsize: Optional[int]) -> None:
+        """Sets the maximum number of pattern sets in the process-wide cache.
+
+        Args:
+            maxsize: The maximum number of pattern sets cached. If ``None``, the
+              cache is unlimited. If zero, pattern sets are not cached.
+
+        Raises:
+            TypeError: *maxsize* is neither an integer nor ``None``.
+            ValueError: *maxsize* is negative.
+
+        If more pattern sets than *maxsize* are currently cached, the least recently
+        used ones are evicted. The default maximum is ``128``.
+        """
+        if maxsize is not None:
+            if not isinstance(maxsize, int):
+                raise TypeError(
+                    f"Invalid type for 'maxsize' (got: {type(maxsize).__name__!r})"
+                )
+            if maxsize < 0:
+                raise ValueError(f"Invalid cache size (got: {maxsize})")
+
+        with PatternSet._cache_lock:
+            PatternSet._cache_maxsize = maxsize
+            PatternSet._evict()
+
+    def _finditer(
+        self, text: str, pos: int = 0
+    ) -> Iterator[Tuple[int, int, re.Pattern, Tuple[Optional[str], ...]]]:
+        """Finds all matches of the patterns in a string.
+
+        Args:
+            text: The string.
+            pos: The index in *text* at which to start the search, as in
+              :py:meth:`re.Pattern.finditer`.
+
+        Yields:
+            A tuple ``(start, end, pattern, groups)`` for every match (including
+            empty matches, in the absence of a prefilter), in order, where *pattern*
+            and *groups* are as passed to *repl* (see :py:func:`parse_text`).
+        """
+        if self._prefilter is None:
+            indexed_patterns = self._indexed_patterns
+            for match in self._combined_pattern.finditer(text, pos):
+                yield (*match.span(), *get_match_pattern(match, indexed_patterns))
+            return
+
+        search, candidates = self._prefilter
+        while True:
+            hit = search(text, pos)
+            if hit is None:
+                return
+            start = hit.start()
+            for pattern, prefix in candidates[text[start]]:
+                if text.startswith(prefix, start):
+                    match = pattern.match(text, start)
+                    if match:
+                        pos = match.end()
+                        yield start, pos, pattern, (match.group(), *match.groups())
+                        break
+            else:
+                pos = start + 1
+
+    @staticmethod
+    def _get(patterns: Tuple[re.Pattern, ...]) -> PatternSet:
+        """Returns a cached pattern set or creates (and caches) a new one.
+
+        Args:
+            patterns: The patterns.
+        """
+        cache = PatternSet._cache
+        with PatternSet._cache_lock:
+            pattern_set = cache.get(patterns)
+            if pattern_set is not None:
+                cache.move_to_end(patterns)
+                PatternSet._cache_hits += 1
+                return pattern_set
+            PatternSet._cache_misses += 1
+
+        pattern_set = PatternSet(patterns)
+        with PatternSet._cache_lock:
+            if PatternSet._cache_maxsize != 0:
+                cache[patterns] = pattern_set
+                PatternSet._evict()
+
+        return pattern_set
+
+    @staticmethod
+    def _evict() -> None:
+        """Evicts the least recently used pattern sets in excess of the maximum.
+
+        Must be called with the cache lock held.
+        """
+        cache = PatternSet._cache
+        maxsize = PatternSet._cache_maxsize
+        if maxsize is not None:
+            while len(cache) > maxsize:
+                cache.popitem(last=False)
+                PatternSet._cache_evictions += 1
+
+
+# Private
+
+RE_INLINE_FLAGS = {re.A: "a", re.I: "i", re.L: "L", re.M: "m", re.S: "s", re.X: "x"}
+
+
+class _CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+def compile_markup(
+    markup: Markup, placeholder_head: str, placeholder_tail: str
+) -> Tuple[
+    str,
+    List[Tuple[Union[DisplayAttribute, int], int]],
+    List[Tuple[Optional[urwid.Widget], int, int]],
+    int,
+    int,
+]:
+    """Flattens a text/widget markup, replacing widget markup elements with
+    placeholders.
+
+    Args:
+        markup: The text/widget markup.
+        placeholder_head: The first character of every placeholder.
+        placeholder_tail: The subsequent characters of every placeholder.
+
+    Returns:
+        A tuple ``(text, attrib, slots, n_first_line_slots, last_line_width)``, where
+
+        - *text* and *attrib* are as returned by :py:func:`urwid.decompose_tagmarkup`
+          for the markup with placeholders in place of widgets, with the index of
+          the slot as the display attribute of each placeholder.
+        - *slots* is a list of ``(widget, width, start_position)`` tuples describing
+          the widget slots, where *widget* is ``None`` for an unbound slot and
+          *start_position* is the column at which the slot starts on its line.
+        - *n_first_line_slots* is the number of slots on the first line.
+        - *last_line_width* is the width of the last line of the text.
+
+    The markup is traversed iteratively, hence any depth of nesting is supported.
+    """
+    slots = []
+    new_markup = []
+    line_width = 0
+    # Text on the current line after the last slot, measured only when needed
+    line_text = []
+    n_first_line_slots = None
+    stack = [(None, iter((markup,)))]
+
+    while stack:
+        attr, elements = stack[-1]
+        for element in elements:
+            if isinstance(element, list):
+                stack.append((attr, iter(element)))
+                break
+            if isinstance(element, tuple):
+                if len(element) != 2:
+                    raise urwid.TagMarkupException(
+                        "Tuples must be in the form `(attribute, tagmarkup)` "
+                        f"(got: {element!r})"
+                    )
+                stack.append((element[0], iter(element[1:])))
+                break
+            if isinstance(element, urwid.Widget) or (
+                element is None and isinstance(attr, int)
+            ):
+                if not isinstance(attr, int):
+                    raise TypeError(
+                        "Invalid type for embedded widget width "
+                        f"(got: {type(attr).__name__!r})"
+                    )
+                if element is not None and "box" not in element.sizing():
+                    raise ValueError(f"Not a box widget (got: {element!r})")
+                if attr <= 0:
+                    raise ValueError(f"Invalid widget width (got: {attr!r})")
+                if line_text:
+                    line_width += get_text_width("".join(line_text))
+                    line_text.clear()
+                new_markup.append(
+                    (len(slots), placeholder_head + placeholder_tail * (attr - 1))
+                )
+                slots.append((element, attr, line_width))
+                line_width += attr
+            else:
+                # Normalize text type to `str` since other parts of this module use
+                # and expect `str`
+                if isinstance(element, bytes):
+                    element = element.decode()
+                new_markup.append(element if attr is None else (attr, element))
+                if not isinstance(element, str):  # Invalid; left to the decomposer
+                    continue
+                line_start = element.rfind("\n") + 1
+                if line_start:
+                    if n_first_line_slots is None:
+                        n_first_line_slots = len(slots)
+                    line_width = 0
+                    line_text.clear()
+                    element = element[line_start:]
+                if element:
+                    line_text.append(element)
+        else:
+            stack.pop()
+
+    if line_text:
+        line_width += get_text_width("".join(line_text))
+    text, attrib = urwid.decompose_tagmarkup(new_markup)
+
+    return (
+        text,
+        attrib,
+        slots,
+        len(slots) if n_first_line_slots is None else n_first_line_slots,
+        line_width,
+    )
+
+
+def combine_patterns(
+    patterns: Tuple[re.Pattern],
+) -> Tuple[re.Pattern, Dict[int, re.Pattern]]:
+    """Combines multiple RegEx patterns with their respective flags into a single OR-ed
+    pattern.
+
+    Returns:
+        A tuple containing
+
+        - the combined RegEx pattern
+        - a dictionary mapping the index of the group in the combined pattern
+          corresponding to each given pattern to the pattern
     """
     grouped_patterns = []
     indexed_patterns = {}  # <index of group in combined pattern>: <pattern>
@@ -663,7 +2459,717 @@ def combine_patterns(
     return re.compile("|".join(grouped_patterns)), indexed_patterns
 
 
-def fix_text_canvas_attr(canv: urwid.TextCanvas) -> urwid.TextCanvas:
+# The text canvas, translation, placeholder index and line parts of a layout shared
+# by blocks of multiple widgets
+_SharedLayout = Tuple[
+    urwid.TextCanvas,
+    List[List[Tuple[int, ...]]],
+    List[Tuple[int, int, Optional[int], int]],
+    Dict[int, List[Tuple[int, Optional[urwid.TextCanvas], Optional[int]]]],
+]
+
+
+class _ParseCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: Optional[int]
+    currsize: int
+    max_bytes: Optional[int]
+    currbytes: int
+
+
+def check_max_match_len(max_match_len: int) -> None:
+    """Validates a maximum match length."""
+    if not isinstance(max_match_len, int):
+        raise TypeError(
+            "Invalid type for 'max_match_len' "
+            f"(got: {type(max_match_len).__name__!r})"
+        )
+    if max_match_len <= 0:
+        raise ValueError(f"Invalid maximum match length (got: {max_match_len})")
+
+
+def get_literal_prefix(pattern: re.Pattern) -> str:
+    """Returns the literal string with which every match of a pattern starts.
+
+    Returns:
+        The prefix, which is empty if there's none or it couldn't be determined.
+    """
+    if pattern.flags & re.IGNORECASE:
+        return ""
+    prefix = []
+    try:
+        collect_literal_prefix(sre_parse.parse(pattern.pattern, pattern.flags), prefix)
+    except Exception:  # Any change in the internals of `re`
+        return ""
+
+    return "".join(prefix)
+
+
+def collect_literal_prefix(items: Iterable[Tuple[Any, Any]], prefix: List[str]) -> bool:
+    """Collects the literal characters at the start of a parsed RegEx pattern.
+
+    Args:
+        items: The parsed pattern, as produced by ``sre_parse.parse()``.
+        prefix: The list to which the characters are appended.
+
+    Returns:
+        ``True`` if every item is a literal character or zero-width assertion i.e the
+        prefix may extend beyond the items. Otherwise, ``False``.
+    """
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            prefix.append(chr(av))
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue  # Zero-width
+        elif op == sre_parse.SUBPATTERN:
+            _, add_flags, _, sub_items = av
+            if add_flags & re.IGNORECASE or not collect_literal_prefix(
+                sub_items, prefix
+            ):
+                return False
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            min_repeats, _, sub_items = av
+            if min_repeats:
+                collect_literal_prefix(sub_items, prefix)
+            return False
+        else:
+            return False
+
+    return True
+
+
+def get_prefilter(patterns: Tuple[re.Pattern, ...]) -> Optional[
+    Tuple[
+        Callable[[str, int], Optional[re.Match]],
+        Dict[str, Tuple[Tuple[re.Pattern, str], ...]],
+    ]
+]:
+    """Returns a literal prefilter for a set of RegEx patterns.
+
+    Returns:
+        ``None`` if any of the patterns has no literal prefix (see
+        :py:func:`get_literal_prefix`). Otherwise, a tuple containing
+
+        - the ``search`` method of a pattern matching any of the prefixes
+        - a dictionary mapping the first character of every prefix to a tuple of
+          ``(pattern, prefix)`` tuples for the patterns whose prefixes start with the
+          character, in the given order
+    """
+    candidates = {}
+    for pattern in patterns:
+        prefix = get_literal_prefix(pattern)
+        if not prefix:
+            return None
+        candidates.setdefault(prefix[0], []).append((pattern, prefix))
+
+    prefixes = {prefix for items in candidates.values() for _, prefix in items}
+    search = re.compile("|".join(map(re.escape, sorted(prefixes)))).search
+
+    return search, {char: tuple(items) for char, items in candidates.items()}
+
+
+def get_pattern_set(patterns: Iterable[re.Pattern]) -> PatternSet:
+    """Returns the given pattern set or a pattern set of the given patterns.
+
+    See :py:class:`PatternSet`.
+    """
+    if isinstance(patterns, PatternSet):
+        return patterns
+
+    return PatternSet._get(tuple(patterns))
+
+
+def get_markup(
+    text: str,
+    matches: List[Tuple[int, int, re.Pattern, Tuple[Optional[str], ...]]],
+    repl: Callable[[re.Pattern, Tuple[Optional[str]], Tuple[int, int], ...], Markup],
+    repl_args: Tuple[Any, ...],
+    repl_kwargs: Dict[str, Any],
+) -> Markup:
+    """Produces the markup of a string from the matches found in it.
+
+    Args:
+        text: The string.
+        matches: The matches found in *text*, as yielded by
+          :py:meth:`PatternSet._finditer`.
+        repl: See :py:func:`parse_text`.
+        repl_args: See :py:func:`parse_text`.
+        repl_kwargs: See :py:func:`parse_text`.
+
+    Returns:
+        See :py:func:`parse_text`.
+    """
+    if not text:
+        return text
+
+    markup = []
+    ptr = 0
+    for start, end, pattern, groups in matches:
+        if ptr < start:
+            markup.append(text[ptr:start])
+        if end > start:
+            match_markup = repl(
+                pattern, groups, (start, end), *repl_args, **repl_kwargs
+            )
+            if match_markup:
+                markup.append(match_markup)
+        ptr = end
+    if ptr < len(text):
+        markup.append(text[ptr:])
+
+    return markup[0] if len(markup) == 1 else markup
+
+
+def get_entry_size(text: str, value: Any) -> int:
+    """Estimates the size of an entry of a :py:class:`ParseCache`.
+
+    Args:
+        text: The parsed string.
+        value: The cached result of parsing *text*, either a markup or the matches
+          found in *text*.
+
+    Returns:
+        The size, in bytes, of *text* plus those of the lists, tuples and strings in
+        *value*, plus the shallow sizes of other objects in *value* excluding
+        patterns. Objects occurring more than once are counted once.
+    """
+    getsizeof = sys.getsizeof
+    size = getsizeof(text)
+    seen = {id(text)}
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, re.Pattern):
+            continue
+        seen.add(id(item))
+        size += getsizeof(item)
+        if isinstance(item, (list, tuple)):
+            stack.extend(item)
+
+    return size
+
+
+def get_match_pattern(
+    match: re.Match, indexed_patterns: Dict[int, re.Pattern]
+) -> Tuple[re.Pattern, Tuple[Optional[str], ...]]:
+    """Returns the pattern that matched and the match groups for a match of a combined
+    pattern.
+
+    Args:
+        match: A match of a combined pattern.
+        indexed_patterns: As returned by :py:func:`combine_patterns`.
+
+    Returns:
+        A tuple containing the pattern and a tuple of the match groups, as passed to
+        *repl* (see :py:func:`parse_text`).
+    """
+    pattern_index = match.lastindex
+    pattern = indexed_patterns[pattern_index]
+
+    return pattern, match.groups()[pattern_index - 1 : pattern_index + pattern.groups]
+
+
+def iter_markup(
+    chunks: Iterable[str],
+    pattern_set: PatternSet,
+    repl: Callable[[re.Pattern, Tuple[Optional[str]], Tuple[int, int], ...], Markup],
+    repl_args: Tuple[Any, ...],
+    repl_kwargs: Dict[str, Any],
+    max_match_len: int = 0,
+) -> Iterator[Markup]:
+    """Parses consecutive chunks of a string into text/widget markup elements.
+
+    Args:
+        chunks: The chunks of the string to parse.
+        pattern_set: The patterns.
+        repl: See :py:func:`parse_text`.
+        repl_args: See :py:func:`parse_text`.
+        repl_kwargs: See :py:func:`parse_text`.
+        max_match_len: See :py:func:`iter_parse_text`. Only required if there may be
+          more than one chunk.
+
+    Yields:
+        The elements of the markup.
+
+    A part of the string is final (i.e is parsed and yielded) only when it ends at
+    least *max_match_len* characters before the end of the string received so far,
+    since no match that starts before the part (or any match that starts within the
+    part but differs from that found) could be longer than *max_match_len*
+    characters. Hence, the scan of the string is resumed from the end of the final
+    part when a chunk is received.
+
+    The received string is scanned only when its unscanned part is at least twice as
+    long as *max_match_len*, so that the scan proceeds by at least *max_match_len*
+    characters every time.
+    """
+    buffer = ""
+    buffer_offset = 0  # The index of the start of the buffer in the entire string
+    ptr = 0  # The index of the end of the final part of the string, in the buffer
+    instrumented = instrumentation.enabled
+    n_repl_calls = 0
+    try:
+        chunks = iter(chunks)
+        chunk = next(chunks, None)
+        while chunk is not None:
+            if not isinstance(chunk, str):
+                raise TypeError(
+                    "Invalid type for a chunk of 'text' "
+                    f"(got: {type(chunk).__name__!r})"
+                )
+            buffer += chunk
+            chunk = next(chunks, None)
+            if chunk is None:  # The end of the string
+                end = len(buffer)
+            elif len(buffer) - ptr < 2 * max_match_len:
+                continue
+            else:
+                end = len(buffer) - max_match_len
+
+            for start, match_end, pattern, groups in pattern_set._finditer(buffer, ptr):
+                if start >= end:
+                    break
+                if ptr < start:
+                    yield buffer[ptr:start]
+                if match_end > start:
+                    markup = repl(
+                        pattern,
+                        groups,
+                        (buffer_offset + start, buffer_offset + match_end),
+                        *repl_args,
+                        **repl_kwargs,
+                    )
+                    if instrumented:
+                        n_repl_calls += 1
+                    if markup:
+                        yield markup
+                ptr = match_end
+            if ptr < end:
+                yield buffer[ptr:end]
+                ptr = end
+
+            if chunk is not None:
+                # Text before the final part is retained for lookbehind assertions and
+                # word boundaries at the point where the scan resumes
+                history_start = max(ptr - max_match_len, 0)
+                buffer = buffer[history_start:]
+                buffer_offset += history_start
+                ptr -= history_start
+    finally:
+        if instrumented:
+            instrumentation.emit("repl_calls", None, n_repl_calls)
+
+
+class _DeferredCanvas(urwid.Canvas):
+    """A canvas of a :py:class:`TextEmbed` widget that renders only the rows requested
+    of it, when requested.
+
+    Args:
+        text_embed: The widget.
+        window: As in :py:meth:`TextEmbed._uw_render_window`.
+        focus: As in :py:meth:`TextEmbed.render`.
+    """
+
+    # The content reflects the state of the embedded widgets when it's requested
+    cacheable = False
+
+    def __init__(
+        self,
+        text_embed: TextEmbed,
+        window: List[Tuple[_TextBlock, int, int]],
+        focus: bool,
+    ) -> None:
+        super().__init__()
+        self._uw_text_embed = text_embed
+        self._uw_window = window
+        self._uw_focus = focus
+        self._uw_cols = window[0][0].text_canv.cols()
+        self._uw_rows = sum(bottom - top for _, top, bottom in window)
+
+    def cols(self) -> int:
+        return self._uw_cols
+
+    def content(
+        self,
+        trim_left: int = 0,
+        trim_top: int = 0,
+        cols: Optional[int] = None,
+        rows: Optional[int] = None,
+        attr: Optional[Dict[DisplayAttribute, DisplayAttribute]] = None,
+    ) -> Iterator[List[Tuple[DisplayAttribute, Optional[str], bytes]]]:
+        if not cols:
+            cols = self._uw_cols - trim_left
+        if not rows:
+            rows = self._uw_rows - trim_top
+
+        canv = self._uw_text_embed._uw_render_window(
+            self._uw_window, self._uw_focus, trim_top, trim_top + rows
+        )
+        if trim_left or cols < self._uw_cols or attr:
+            canv = urwid.CompositeCanvas(canv)
+            canv.pad_trim_left_right(-trim_left, trim_left + cols - self._uw_cols)
+            if attr:
+                canv.fill_attr_apply(attr)
+
+        return canv.content()
+
+    def rows(self) -> int:
+        return self._uw_rows
+
+
+class _InlineCanvas(urwid.Canvas):
+    """A canvas of a block of a :py:class:`TextEmbed` widget's text, with the
+    canvases of the embedded widgets inline.
+
+    Args:
+        text_canv: The text canvas of the block.
+        spans: A mapping from the index of every line (of *text_canv*) with embedded
+          widgets to a list of ``(cols, canv, left, widget_index)`` tuples, one for
+          each part of the line, in order, where *cols*, *canv* and *left* are as in
+          the items returned by :py:meth:`TextEmbed._uw_split_line` and
+          *widget_index* is the index of the widget, for a part of a widget.
+        views: A mapping from the index of every embedded widget to a tuple
+          ``(canv, trim_left, trim_top, view_canv)``, where *canv* is the widget's
+          canvas and the rest describe its only view, as returned by
+          :py:func:`get_single_row_view`.
+
+    The lines with embedded widgets are composed only when their content is
+    requested, from the content of the canvases of their parts, such that
+    the content of the widget's canvas (e.g the ``OSC 8`` escape sequences of a
+    :py:class:`~urwidgets.Hyperlink`) is inline with the text.
+    """
+
+    def __init__(
+        self,
+        text_canv: urwid.TextCanvas,
+        spans: Dict[
+            int,
+            List[Tuple[int, Optional[urwid.TextCanvas], Optional[int], Optional[int]]],
+        ],
+        views: Dict[int, Tuple[urwid.Canvas, int, int, urwid.Canvas]],
+    ) -> None:
+        super().__init__()
+        self._uw_text_canv = text_canv
+        self._uw_spans = spans
+        self._uw_views = views
+
+    def cols(self) -> int:
+        return self._uw_text_canv.cols()
+
+    def content(
+        self,
+        trim_left: int = 0,
+        trim_top: int = 0,
+        cols: Optional[int] = None,
+        rows: Optional[int] = None,
+        attr: Optional[Dict[DisplayAttribute, DisplayAttribute]] = None,
+    ) -> Iterator[List[Tuple[DisplayAttribute, Optional[str], bytes]]]:
+        text_canv = self._uw_text_canv
+        spans = self._uw_spans
+        views = self._uw_views
+        if not cols:
+            cols = text_canv.cols() - trim_left
+        if not rows:
+            rows = text_canv.rows() - trim_top
+        end = trim_left + cols
+        row = trim_top
+        stop = trim_top + rows
+
+        while row < stop:
+            row_spans = spans.get(row)
+            if row_spans is None:
+                run_stop = row + 1
+                while run_stop < stop and run_stop not in spans:
+                    run_stop += 1
+                yield from text_canv.content(trim_left, row, cols, run_stop - row, attr)
+                row = run_stop
+                continue
+
+            line = []
+            col = 0
+            for part_cols, part_canv, left, widget_index in row_spans:
+                part_end = col + part_cols
+                if part_end <= trim_left:
+                    col = part_end
+                    continue
+                if col >= end:
+                    break
+                part_trim = trim_left - col if trim_left > col else 0
+                part_cols = (end if end < part_end else part_end) - col - part_trim
+                if part_canv is None:
+                    _, view_left, view_top, part_canv = views[widget_index]
+                    part_trim += view_left + left
+                else:
+                    view_top = 0
+                line += next(part_canv.content(part_trim, view_top, part_cols, 1, attr))
+                col = part_end
+            yield line
+            row += 1
+
+    def rows(self) -> int:
+        return self._uw_text_canv.rows()
+
+
+class _EmbeddedTable:
+    """The widgets embedded in a :py:class:`TextEmbed` widget, their widths and start
+    positions, in parallel sequences.
+
+    Widgets are indexed from :py:attr:`base`, the number of widgets removed from the
+    start of the table since it was created.
+    """
+
+    __slots__ = ("base", "start_positions", "widgets", "widths")
+
+    def __init__(
+        self,
+        widgets: Iterable[urwid.Widget],
+        widths: Iterable[int],
+        start_positions: Iterable[int],
+    ) -> None:
+        self.base = 0
+        self.widgets = list(widgets)
+        self.widths = array("l", widths)
+        self.start_positions = array("l", start_positions)
+
+    def __getitem__(self, index: int) -> Tuple[urwid.Widget, int, int]:
+        """Returns the ``(widget, width, start_position)`` of an embedded widget.
+
+        Raises:
+            KeyError: There's no widget at *index* (e.g it has been removed).
+        """
+        position = index - self.base
+        if not 0 <= position < len(self.widgets):
+            raise KeyError(index)
+        return (
+            self.widgets[position],
+            self.widths[position],
+            self.start_positions[position],
+        )
+
+    def __len__(self) -> int:
+        return len(self.widgets)
+
+    def drop(self, n: int) -> None:
+        """Removes widgets from the start of the table."""
+        del self.widgets[:n]
+        del self.widths[:n]
+        del self.start_positions[:n]
+        self.base += n
+
+    def extend(self, table: _EmbeddedTable) -> None:
+        """Appends the widgets of another table to the end of this one."""
+        self.widgets += table.widgets
+        self.widths += table.widths
+        self.start_positions += table.start_positions
+
+
+class _TextBlock:
+    """A laid out block of consecutive whole lines of a :py:class:`TextEmbed`
+    widget's text.
+    """
+
+    __slots__ = (
+        "bottom",
+        "index",
+        "inline",
+        "inline_views",
+        "line_rows",
+        "lines",
+        "offset",
+        "parts",
+        "shared",
+        "spans",
+        "text_canv",
+        "top",
+        "translation",
+    )
+
+    def __init__(
+        self,
+        text_canv: urwid.TextCanvas,
+        translation: List[List[Tuple[int, ...]]],
+        index: List[Tuple[int, int, Optional[int], int]],
+        offset: int,
+        parts: Optional[
+            Dict[int, List[Tuple[int, Optional[urwid.TextCanvas], Optional[int]]]]
+        ] = None,
+    ) -> None:
+        # Whether the text canvas, translation, index and parts are shared with blocks
+        # of other widgets (see `TextEmbed._uw_layout_block()`), in which case the
+        # text canvas must never be finalized (i.e returned from a render as-is)
+        self.shared = parts is not None
+        self.text_canv = text_canv
+        self.translation = translation
+        # See `TextEmbed._uw_index_placeholders()`
+        self.index = index
+        # Offset of the start of the block within the widget's text, counted from
+        # when the text was last set i.e including any lines removed since then
+        self.offset = offset
+        # The range of rows of `text_canv` in use. Rows of lines removed from the start
+        # of the widget's text or laid out again in a following block are excluded.
+        self.top = 0
+        self.bottom = text_canv.rows()
+        self.lines = {}  # {focus: lines}
+        # {row: parts}, see `TextEmbed._uw_split_line()`
+        self.parts = {} if parts is None else parts
+        # {focus: (key, canv)}, see `TextEmbed._uw_render_inline()`
+        self.inline = {}
+        # {focus: views}, the views (see `_InlineCanvas`) of the blocks joined into
+        # this one, reused when this block is first rendered inline
+        self.inline_views = {}
+        # `(top, bottom, spans, placements)`, see `TextEmbed._uw_index_spans()`
+        self.spans = None
+        self.line_rows = None
+
+    def join(self, other: _TextBlock) -> _TextBlock:
+        """Joins the rows in use of this block and those of the following block.
+
+        Args:
+            other: The block laid out from the text following that of this block.
+
+        Returns:
+            A new block with the rows in use of both blocks, in order, and the line
+            parts already split of both. The text is not laid out again.
+        """
+        top, bottom = self.top, other.bottom
+        text_canv, other_canv = self.text_canv, other.text_canv
+        rows = slice(self.top, self.bottom)
+        other_rows = slice(other.top, other.bottom)
+        shift = other.offset - self.offset
+        row_shift = self.bottom - self.top - other.top
+        block = _TextBlock(
+            urwid.TextCanvas(
+                text_canv._text[rows] + other_canv._text[other_rows],
+                text_canv._attr[rows] + other_canv._attr[other_rows],
+                text_canv._cs[rows] + other_canv._cs[other_rows],
+                maxcol=text_canv.cols(),
+                check_width=False,
+            ),
+            self.translation[rows]
+            + [
+                shift_line_layout(line_layout, shift)
+                for line_layout in other.translation[other_rows]
+            ],
+            [
+                (row - top, *rest)
+                for row, *rest in self.index
+                if top <= row < self.bottom
+            ]
+            + [
+                (row + row_shift, *rest)
+                for row, *rest in other.index
+                if other.top <= row < bottom
+            ],
+            self.offset,
+        )
+        for row, parts in self.parts.items():
+            if top <= row < self.bottom:
+                block.parts[row - top] = parts
+        for row, parts in other.parts.items():
+            if other.top <= row < bottom:
+                block.parts[row + row_shift] = parts
+        for focus in {
+            *self.inline,
+            *self.inline_views,
+            *other.inline,
+            *other.inline_views,
+        }:
+            # The views keep the canvases of the embedded widgets cached by urwid
+            block.inline_views[focus] = {
+                **self.get_inline_views(focus),
+                **other.get_inline_views(focus),
+            }
+
+        return block
+
+    def get_inline_views(
+        self, focus: bool
+    ) -> Dict[int, Tuple[urwid.Canvas, int, int, urwid.Canvas]]:
+        """Returns the views of the embedded widgets last rendered inline (see
+        :py:class:`_InlineCanvas`) for a focus state.
+        """
+        _, canv = self.inline.get(focus, (None, None))
+
+        return self.inline_views.get(focus, {}) if canv is None else canv._uw_views
+
+    def get_lines(self, focus: bool) -> List[
+        Tuple[
+            int,
+            Optional[int],
+            Optional[int],
+            Tuple[Optional[urwid.Canvas], ...],
+            Optional[urwid.CompositeCanvas],
+            Optional[object],
+        ]
+    ]:
+        """Splits the text canvas into lines with embedded widgets and runs of
+        consecutive lines without.
+
+        Args:
+            focus: The focus state the lines are rendered with.
+
+        Returns:
+            A list of ``(row, widget_index, tail_width, canvases, canv, key)`` tuples,
+            in order, one for each run of consecutive lines without embedded widgets and
+            one for each line with embedded widgets, where
+
+            - *row* is the index of the (first) line in the text canvas.
+            - *widget_index* and *tail_width* are as in the items of the placeholder
+              line index for a line with embedded widgets or ``None`` for a run of
+              lines without.
+            - *canvases* is a tuple of the canvases of the widgets on the line, in
+              order (empty for a run of lines without embedded widgets).
+            - *canv* is ``None`` for a run of lines without embedded widgets or the
+              canvas of a line with embedded widgets.
+            - *key* is ``None`` for a run of lines without embedded widgets or a unique
+              object for a line with embedded widgets.
+
+              The canvas of the line is stored in urwid's canvas cache (with widget
+              class :py:class:`_TextBlock`, size ``()`` and the focus state) as the
+              canvas of *key*, such that it's evicted when any of the widgets on the
+              line is invalidated.
+
+            The items for lines with embedded widgets are initially without canvases
+            i.e *canv* and every item of *canvases* is ``None``.
+
+        The list is computed once per focus state and is meant to be updated in-place
+        as the widgets' canvases change. Also, :py:attr:`line_rows` is set to the list
+        of the *row* of every item, followed by the number of rows in the text canvas.
+        """
+        lines = self.lines.get(focus)
+        if lines is None:
+            text_canv = self.text_canv
+            lines = self.lines[focus] = []
+            line_rows = []
+            top = 0
+            for row, widget_index, tail_width, n_widgets in (
+                *self.index,
+                (text_canv.rows(), None, None, 0),
+            ):
+                if top < row:
+                    lines.append((top, None, None, (), None, None))
+                    line_rows.append(top)
+                if widget_index is not None:
+                    lines.append(
+                        (
+                            row,
+                            widget_index,
+                            tail_width,
+                            (None,) * n_widgets,
+                            None,
+                            object(),
+                        )
+                    )
+                    line_rows.append(row)
+                top = row + 1
+            line_rows.append(text_canv.rows())
+            self.line_rows = line_rows
+
+        return lines
+
+
+def fix_text_canvas_attr(canv: urwid.TextCanvas) -> None:
     """Workaround for a bug in in `urwid.text_layout.StandardTextLayout`.
 
     When `wrap=clip, align=center` and there's a line starting with a markup that has
@@ -674,10 +3180,73 @@ def fix_text_canvas_attr(canv: urwid.TextCanvas) -> urwid.TextCanvas:
     See https://github.com/urwid/urwid/issues/542.
     """
     for line_attr in canv._attr:
-        if line_attr[0] == (None, 0):
+        if line_attr and line_attr[0] == (None, 0):
             del line_attr[0]
 
-    return canv
+
+@lru_cache(maxsize=128)
+def get_blank_canvas(cols: int) -> urwid.TextCanvas:
+    """Returns a (shared) single-row canvas of *cols* spaces."""
+    return urwid.TextCanvas([b" " * cols], maxcol=cols, check_width=False)
+
+
+def get_single_row_view(
+    canv: urwid.Canvas,
+) -> Optional[Tuple[int, int, urwid.Canvas]]:
+    """Returns the only view of a single-row canvas.
+
+    Returns:
+        A ``(trim_left, trim_top, canv)`` tuple describing the view, or ``None`` if
+        the canvas is composed of multiple views, the view has a display attribute
+        mapping or the canvas has coordinates (e.g of a pop-up).
+    """
+    if canv.coords:
+        return None
+    if not isinstance(canv, urwid.CompositeCanvas):
+        return 0, 0, canv
+    shards = canv.shards
+    if len(shards) != 1 or len(shards[0][1]) != 1:
+        return None
+    trim_left, trim_top, _, _, attr_map, view_canv = shards[0][1][0]
+    if attr_map or isinstance(view_canv, urwid.CompositeCanvas):
+        return None
+
+    return trim_left, trim_top, view_canv
+
+
+def get_text_width(text: str) -> int:
+    """Returns the width of *text* in screen columns.
+
+    Printable ASCII text is measured by length; otherwise, :py:func:`urwid.calc_width`
+    is used, to account for wide and zero-width characters.
+    """
+    if text.isascii() and text.isprintable():
+        return len(text)
+    return urwid.calc_width(text, 0, len(text))
+
+
+def get_line_offset(line_layout: List[Tuple[int, ...]]) -> int:
+    """Returns the offset (within the text that was laid out) of the start of the
+    text in a line layout structure.
+    """
+    for segment in line_layout:
+        if segment[1] is not None:
+            return segment[1]
+
+    return 0  # Text that can not be displayed, see `StandardTextLayout.layout()`
+
+
+def shift_line_layout(
+    line_layout: List[Tuple[int, ...]], shift: int
+) -> List[Tuple[int, ...]]:
+    """Shifts the text offsets in a line layout structure."""
+    return [
+        (
+            segment[0],
+            *[None if offset is None else offset + shift for offset in segment[1:]],
+        )
+        for segment in line_layout
+    ]
 
 
 # Only 511 (zero is excluded) unique bit patterns (and not even all can occur)
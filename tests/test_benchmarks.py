@@ -0,0 +1,90 @@
+"""Smoke tests of the benchmark scripts, with minimal timing."""
+
+import json
+import sys
+from importlib.util import module_from_spec, spec_from_file_location
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).parent.parent / "benchmarks"
+
+
+def load_script(name):
+    spec = spec_from_file_location(f"benchmarks_{name}", BENCHMARKS_DIR / f"{name}.py")
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def bench():
+    path = sys.path.copy()
+    yield load_script("bench")
+    sys.path[:] = path
+
+
+@pytest.fixture(scope="module")
+def memory():
+    path = sys.path.copy()
+    yield load_script("memory")
+    sys.path[:] = path
+
+
+class TestBench:
+    def test_list(self, bench, capsys):
+        assert bench.main(["--list"]) == 0
+        output = capsys.readouterr().out
+        for name in bench.BENCHMARKS:
+            assert name in output
+
+    def test_run_all(self, bench, capsys):
+        assert bench.main(["-q", "-r", "1", "-t", "0"]) == 0
+        output = capsys.readouterr().out
+        for name in bench.BENCHMARKS:
+            assert f"{name}[" in output
+
+    def test_save_and_compare(self, bench, tmp_path):
+        results = tmp_path / "results.json"
+        args = ["-q", "-r", "1", "-t", "0", "hyperlink.render"]
+        assert bench.main([*args, "-s", str(results)]) == 0
+        assert json.loads(results.read_text())["results"]
+        compare_args = [*args, "-c", str(results), "--threshold"]
+        assert bench.main([*compare_args, "1e9"]) == 0
+        # Any run is "slower" than the baseline with a threshold of -100%
+        assert bench.main([*compare_args, "-100"]) == 1
+
+    def test_unknown(self, bench):
+        with pytest.raises(SystemExit):
+            bench.main(["unknown"])
+
+
+class TestMemory:
+    def test_list(self, memory, capsys):
+        assert memory.main(["--list"]) == 0
+        output = capsys.readouterr().out
+        for name in memory.BENCHMARKS:
+            assert name in output
+
+    def test_run_all(self, memory, capsys):
+        assert memory.main(["-n", "10"]) == 0
+        output = capsys.readouterr().out
+        for name in memory.BENCHMARKS:
+            assert f"{name} " in output
+
+    def test_save_and_compare(self, memory, tmp_path, capsys):
+        results = tmp_path / "results.json"
+        assert memory.main(["-n", "10", "hyperlink", "-s", str(results)]) == 0
+        assert json.loads(results.read_text())["results"]["hyperlink"] > 0
+        baseline = BENCHMARKS_DIR / "memory-baseline.json"
+        assert memory.main(["-n", "10", "hyperlink", "-c", str(baseline)]) == 0
+        assert "Comparison with baseline" in capsys.readouterr().out
+
+    def test_baseline(self, memory):
+        with open(BENCHMARKS_DIR / "memory-baseline.json") as file:
+            assert set(json.load(file)["results"]) == set(memory.BENCHMARKS)
+
+    @pytest.mark.parametrize("args", [["unknown"], ["-n", "0"]])
+    def test_invalid(self, memory, args):
+        with pytest.raises(SystemExit):
+            memory.main(args)
@@ -0,0 +1,210 @@
+import re
+
+import pytest
+import urwid
+from urwid import Filler, Text
+
+from urwidgets import DocumentWalker, TextEmbed, parse_text
+
+LINES = [f"line {index}" for index in range(10)]
+DOCUMENT = "\n".join(LINES)
+
+
+def get_texts(walker):
+    return [walker[position].text for position in walker.positions()]
+
+
+class TestChunks:
+    def test_text(self):
+        walker = DocumentWalker(DOCUMENT, chunk_lines=4)
+        assert list(walker.positions()) == [0, 1, 2]
+        assert get_texts(walker) == [
+            "\n".join(LINES[:4]),
+            "\n".join(LINES[4:8]),
+            "\n".join(LINES[8:]),
+        ]
+        assert list(walker.positions(reverse=True)) == [2, 1, 0]
+
+    @pytest.mark.parametrize(
+        "content, texts",
+        [
+            ("", [""]),
+            ("a\nb", ["a\nb"]),
+            ("a\nb\n", ["a\nb", ""]),
+            ("a\nb\nc", ["a\nb", "c"]),
+        ],
+    )
+    def test_boundaries(self, content, texts):
+        assert get_texts(DocumentWalker(content, chunk_lines=2)) == texts
+
+    def test_markup(self):
+        widget = Filler(Text("ab"))
+        walker = DocumentWalker(
+            ["a\nb", ("x", "c\nd"), "\ne ", (2, widget)], chunk_lines=2
+        )
+        assert walker[0].text == "a\nbc"
+        assert walker[0].attrib == [(None, 3), ("x", 1)]
+        assert walker[1].attrib[0] == ("x", 1)
+        assert walker[1].embedded == [(widget, 2)]
+
+    def test_nested_line_breaks(self):
+        # Line breaks within nested lists do not end chunks
+        walker = DocumentWalker(["a\n", ("x", ["b\nc", "\n"]), "d"], chunk_lines=1)
+        assert get_texts(walker) == ["a", "b\nc\nd"]
+
+    def test_parser(self):
+        parsed = []
+
+        def parser(text):
+            parsed.append(text)
+            return parse_text(
+                text, [re.compile("line 5")], lambda *_: (6, Filler(Text("LINK")))
+            )
+
+        walker = DocumentWalker(DOCUMENT, parser, chunk_lines=4)
+        assert parsed == []
+        walker[1]
+        assert parsed == ["\n".join(LINES[4:8])]
+        assert walker[1].embedded[0][1] == 6
+
+    def test_lazy_split(self):
+        walker = DocumentWalker(DOCUMENT, chunk_lines=1)
+        walker[0]
+        walker.next_position(0)
+        # Only the chunks up to the one after the requested one are found
+        assert len(walker._uw_bounds) <= 4
+
+    def test_text_embed_cls(self):
+        class CustomTextEmbed(TextEmbed):
+            pass
+
+        walker = DocumentWalker(
+            DOCUMENT, text_embed_cls=CustomTextEmbed, align="right", wrap="clip"
+        )
+        assert type(walker[0]) is CustomTextEmbed
+        assert (walker[0].align, walker[0].wrap) == ("right", "clip")
+
+
+class TestNavigation:
+    def test_positions(self):
+        walker = DocumentWalker(DOCUMENT, chunk_lines=4)
+        assert walker.next_position(0) == 1
+        assert walker.prev_position(2) == 1
+        with pytest.raises(IndexError):
+            walker.next_position(2)
+        with pytest.raises(IndexError):
+            walker.prev_position(0)
+
+    def test_focus(self):
+        walker = DocumentWalker(DOCUMENT, chunk_lines=4)
+        assert walker.focus == 0
+        walker.set_focus(2)
+        assert walker.focus == 2
+        with pytest.raises(IndexError):
+            walker.set_focus(3)
+
+    @pytest.mark.parametrize("position", [-1, 3, "0"])
+    def test_invalid_position(self, position):
+        with pytest.raises(IndexError):
+            DocumentWalker(DOCUMENT, chunk_lines=4)[position]
+
+    def test_list_box(self):
+        list_box = urwid.ListBox(DocumentWalker(DOCUMENT, chunk_lines=3))
+        canv = list_box.render((10, 4))
+        assert [row.decode().rstrip() for row in canv.text] == LINES[:4]
+        list_box.keypress((10, 4), "page down")
+        canv = list_box.render((10, 4))
+        assert [row.decode().rstrip() for row in canv.text] == LINES[4:8]
+
+
+class TestLimits:
+    def test_max_chunks(self):
+        walker = DocumentWalker(DOCUMENT, chunk_lines=1, max_chunks=3)
+        first = walker[0]
+        for position in range(1, 4):
+            walker[position]
+        assert len(walker._uw_widgets) == 3
+        # Discarded and created again
+        assert walker[0] is not first
+        assert walker[0].text == first.text
+
+    def test_least_recently_used(self):
+        walker = DocumentWalker(DOCUMENT, chunk_lines=1, max_chunks=2)
+        first = walker[0]
+        walker[1]
+        walker[0]
+        walker[2]
+        assert walker[0] is first
+
+    def test_embedded_widgets_reused(self):
+        widget = Filler(Text("ab"))
+        walker = DocumentWalker(
+            ["x ", (2, widget), "\ny\nz"], chunk_lines=1, max_chunks=1
+        )
+        walker[0]
+        walker[1]
+        assert walker[0].embedded == [(widget, 2)]
+
+    def test_parsed_again(self):
+        parsed = []
+
+        def parser(text):
+            parsed.append(text)
+            return [text, (2, Filler(Text("ab")))]
+
+        walker = DocumentWalker("x\ny", parser, chunk_lines=1, max_chunks=1)
+        widget = walker[0].embedded[0][0]
+        walker[1]
+        # New widgets, as created by the parser
+        assert walker[0].embedded[0][0] is not widget
+        assert parsed == ["x", "y", "x"]
+
+    def test_max_chars(self):
+        content = "\n".join("x" * length for length in (10, 20, 30, 40))
+        walker = DocumentWalker(content, chunk_lines=1, max_chars=50)
+        for position in range(3):
+            walker[position]
+        # 20 + 30 <= 50
+        assert sorted(walker._uw_widgets) == [1, 2]
+        walker[3]
+        assert sorted(walker._uw_widgets) == [3]
+
+    def test_max_chars_keeps_last(self):
+        walker = DocumentWalker("x" * 100, max_chars=10)
+        widget = walker[0]
+        assert walker[0] is widget
+
+    def test_max_chars_modified_chunk(self):
+        walker = DocumentWalker("ab\ncd\nef", chunk_lines=1, max_chars=4)
+        walker[0].set_text("a much longer text")
+        walker[1]
+        walker[2]
+        assert sorted(walker._uw_widgets) == [1, 2]
+        assert walker._uw_n_chars == 4
+
+    @pytest.mark.parametrize(
+        "kwargs, exception",
+        [
+            ({"chunk_lines": 0}, ValueError),
+            ({"chunk_lines": 1.0}, TypeError),
+            ({"max_chunks": 0}, ValueError),
+            ({"max_chunks": None}, TypeError),
+            ({"max_chars": 0}, ValueError),
+            ({"max_chars": "1"}, TypeError),
+        ],
+    )
+    def test_invalid(self, kwargs, exception):
+        with pytest.raises(exception):
+            DocumentWalker(DOCUMENT, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "args, exception",
+    [
+        ((b"text",), TypeError),
+        ((["text"], str.upper), TypeError),
+    ],
+)
+def test_invalid_content(args, exception):
+    with pytest.raises(exception):
+        DocumentWalker(*args)
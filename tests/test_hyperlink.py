@@ -0,0 +1,353 @@
+import gc
+from threading import Thread
+
+import pytest
+import urwid
+
+from urwidgets import Hyperlink, HyperlinkFactory, HyperlinkIDAllocator
+
+URI = "https://urwid.org"
+
+
+def get_start(id, uri=URI):
+    return f"\033]8;id={id};{uri}\033\\".encode()
+
+
+END = b"\033]8;;\033\\"
+
+
+@pytest.fixture(autouse=True)
+def id_allocator():
+    Hyperlink.ID_ALLOCATOR = allocator = HyperlinkIDAllocator()
+    yield allocator
+    Hyperlink.ID_ALLOCATOR = HyperlinkIDAllocator()
+    gc.collect()
+
+
+class TestRender:
+    def test_content(self):
+        canv = Hyperlink(URI, "link", "urwid").render((8,))
+        assert (canv.cols(), canv.rows()) == (8, 1)
+        assert list(canv.content()) == [
+            [
+                (None, "U", get_start(0)),
+                ("link", None, b"urwid"),
+                (None, "U", END),
+                (None, None, b"   "),
+            ]
+        ]
+
+    def test_fixed(self):
+        canv = Hyperlink(URI, text="urwid").render(())
+        assert canv.cols() == 5
+        assert canv.text == [get_start(0) + b"urwid" + END]
+
+    def test_ellipsis(self):
+        canv = Hyperlink(URI, text="urwid widgets").render((8,))
+        assert canv.text == [get_start(0) + "urwid w…".encode() + END]
+
+    def test_wide_text(self):
+        canv = Hyperlink(URI, text="漢字").render((6,))
+        assert canv.text == [get_start(0) + "漢字".encode() + END + b"  "]
+
+    def test_default_text(self):
+        link = Hyperlink(URI)
+        assert link.text == URI
+        assert link.pack() == (len(URI), 1)
+        assert link.rows((4,)) == 1
+
+
+class TestCanvasCache:
+    def test_cached(self):
+        link = Hyperlink(URI)
+        canv = link.render((20,))
+        assert link.render((20,)) is canv
+        assert link.render((20,), True) is not canv
+        assert link.render((30,)) is not canv
+
+    @pytest.mark.parametrize(
+        "name, value", [("text", "urwid"), ("uri", "https://x.y"), ("attrib", "a")]
+    )
+    def test_invalidated(self, name, value):
+        link = Hyperlink(URI)
+        canv = link.render((20,))
+        setattr(link, name, value)
+        new_canv = link.render((20,))
+        assert new_canv is not canv
+        assert getattr(link, name) == value
+        assert list(new_canv.content()) != list(canv.content())
+
+    def test_distinct_ids(self):
+        first = Hyperlink(URI).render(())
+        second = Hyperlink(URI).render(())
+        # Each canvas holds its ID for as long as it exists
+        assert first.text[0].startswith(get_start(0))
+        assert second.text[0].startswith(get_start(1))
+
+
+class TestIDAllocator:
+    def test_distinct(self):
+        allocator = HyperlinkIDAllocator()
+        assert [allocator.acquire(URI) for _ in range(3)] == [0, 1, 2]
+        assert allocator.stats == (3, 3, 3, 0)
+
+    def test_reuse_after_release(self):
+        allocator = HyperlinkIDAllocator()
+        ids = [allocator.acquire(URI) for _ in range(3)]
+        allocator.release(ids[1], URI)
+        allocator.release(ids[0], URI)
+        # Released IDs are reused, last released first, before new ones
+        assert allocator.acquire(URI) == 0
+        assert allocator.acquire(URI) == 1
+        assert allocator.acquire(URI) == 3
+        assert allocator.stats == (4, 4, 6, 2)
+
+    def test_max_ids(self):
+        allocator = HyperlinkIDAllocator(max_ids=2)
+        assert [allocator.acquire(URI) for _ in range(5)] == [0, 1, 0, 1, 0]
+        # Shared IDs are released only when all their holders release them
+        for _ in range(2):
+            allocator.release(0, URI)
+        assert allocator.stats.live == 2
+        allocator.release(0, URI)
+        assert allocator.stats.live == 1
+        assert allocator.acquire(URI) == 0
+
+    def test_per_uri(self):
+        allocator = HyperlinkIDAllocator(per_uri=True)
+        assert allocator.acquire("a") == allocator.acquire("a") == 0
+        assert allocator.acquire("b") == 1
+        allocator.release(0, "a")
+        assert allocator.acquire("c") == 2
+        allocator.release(0, "a")
+        assert allocator.acquire("c") == 2
+        assert allocator.acquire("d") == 0
+        assert allocator.stats == (3, 3, 6, 3)
+
+    def test_max_ids_wrap_around_per_uri(self):
+        allocator = HyperlinkIDAllocator(max_ids=2, per_uri=True)
+        assert [allocator.acquire(uri) for uri in "abcda"] == [0, 1, 0, 1, 0]
+        assert allocator.stats.live == 2
+
+        # "a" (twice) and "c" share ID 0
+        allocator.release(0, "a")
+        allocator.release(0, "c")
+        assert allocator.acquire("e") == 0  # Wrapped around again
+        allocator.release(0, "a")
+        allocator.release(0, "e")
+        assert allocator.stats.live == 1
+        # The released ID is reused, even by a URI that shared it before
+        assert allocator.acquire("c") == 0
+        assert allocator.acquire("c") == 0
+        assert allocator.acquire("b") == 1
+
+    def test_release_later(self):
+        allocator = HyperlinkIDAllocator()
+        allocator.acquire(URI)
+        allocator.release_later(0, URI)
+        assert allocator.stats.live == 0
+
+        allocator.acquire(URI)
+        allocator.release_later(0, URI)
+        assert allocator.acquire(URI) == 0
+        allocator.release_later(0, URI)
+        allocator.release_pending()
+        assert allocator.stats.live == 0
+
+    def test_threads(self):
+        allocator = HyperlinkIDAllocator(max_ids=8, per_uri=True)
+
+        def work(uri):
+            for _ in range(1000):
+                allocator.release(allocator.acquire(uri), uri)
+
+        threads = [Thread(target=work, args=(str(index),)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert allocator.stats.live == 0
+        assert allocator.stats.acquired == 8000
+
+    @pytest.mark.parametrize(
+        "max_ids, exception", [(0, ValueError), (-1, ValueError), (1.0, TypeError)]
+    )
+    def test_invalid(self, max_ids, exception):
+        with pytest.raises(exception):
+            HyperlinkIDAllocator(max_ids)
+
+
+class TestCanvasIDs:
+    def test_released_on_collection(self, id_allocator):
+        canv = Hyperlink(URI).render(())
+        assert id_allocator.stats.live == 1
+        del canv
+        gc.collect()
+        assert id_allocator.stats.live == 0
+
+    def test_collected_with_lock_held(self, id_allocator):
+        canv = Hyperlink(URI).render(())
+        # As if the canvas were collected in the middle of an allocation
+        with id_allocator._lock:
+            del canv
+            gc.collect()
+        assert id_allocator.stats.live == 0
+
+    def test_release_id(self, id_allocator):
+        canv = Hyperlink(URI).render(())
+        canv.release_id()
+        assert id_allocator.stats.live == 0
+        canv.release_id()
+        other_canv = Hyperlink("https://x.y").render(())
+        assert other_canv.text[0].startswith(get_start(0, "https://x.y"))
+        del canv, other_canv
+        gc.collect()
+        assert id_allocator.stats == (0, 1, 2, 1)  # Released once each
+
+    def test_replaced_allocator(self, id_allocator):
+        canv = Hyperlink(URI).render(())
+        Hyperlink.ID_ALLOCATOR = new_allocator = HyperlinkIDAllocator()
+        Hyperlink(URI).render(())
+        assert new_allocator.stats.acquired == 1
+        # Released to the allocator it was acquired from
+        del canv
+        gc.collect()
+        assert id_allocator.stats.live == 0
+
+
+class TestFactory:
+    def test_create(self):
+        link = HyperlinkFactory()(URI, "link", "urwid")
+        assert type(link) is Hyperlink
+        assert (link.uri, link.attrib, link.text) == (URI, "link", "urwid")
+
+    def test_not_interned(self):
+        factory = HyperlinkFactory()
+        assert factory(URI) is not factory(URI)
+
+    def test_interned(self):
+        factory = HyperlinkFactory(intern=True)
+        link = factory(URI)
+        assert factory(URI) is link
+        # The default text is the URI
+        assert factory(URI, None, URI) is link
+        assert factory(URI, "link") is not link
+        assert factory(URI, None, "urwid") is not link
+        assert HyperlinkFactory(intern=True)(URI) is not link
+
+    def test_interned_weakly(self):
+        factory = HyperlinkFactory(intern=True)
+        factory(URI, "link")
+        gc.collect()
+        assert len(factory._interned) == 0
+
+    def test_unhashable_attr(self):
+        factory = HyperlinkFactory(intern=True)
+        attr = {None: "link"}
+        assert factory(URI, attr) is not factory(URI, attr)
+
+    def test_clear(self):
+        factory = HyperlinkFactory(intern=True)
+        link = factory(URI)
+        factory.clear()
+        assert factory(URI) is not link
+
+    def test_build(self):
+        factory = HyperlinkFactory(intern=True)
+        links = factory.build([(URI,), (URI, "link", "urwid"), (URI,)])
+        assert [(link.attrib, link.text) for link in links] == [
+            (None, URI),
+            ("link", "urwid"),
+            (None, URI),
+        ]
+        assert links[0] is links[2]
+
+    def test_subclass(self):
+        class Link(Hyperlink):
+            pass
+
+        assert type(HyperlinkFactory(hyperlink_cls=Link)(URI)) is Link
+
+    @pytest.mark.parametrize("hyperlink_cls", [object, Hyperlink(URI), "Hyperlink"])
+    def test_invalid_class(self, hyperlink_cls):
+        with pytest.raises(TypeError):
+            HyperlinkFactory(hyperlink_cls=hyperlink_cls)
+
+    @pytest.mark.parametrize("intern", [False, True])
+    @pytest.mark.parametrize(
+        "uri, exception",
+        [
+            (b"https://x.y", TypeError),
+            ("", ValueError),
+            ("https://x.y/\x7f", ValueError),
+        ],
+    )
+    def test_invalid_uri(self, intern, uri, exception):
+        factory = HyperlinkFactory(intern=intern)
+        # Validation is memoized; hence, repeated
+        for _ in range(2):
+            with pytest.raises(exception):
+                factory(uri)
+
+
+class TestDirectRender:
+    def test_wrapped_text_not_created(self):
+        link = Hyperlink(URI, "link", "urwid")
+        link.render((5,))
+        link.render((10,))
+        link.pack()
+        link.rows((10,))
+        assert link._uw_wrapped is None
+
+    @pytest.mark.parametrize("text", ["urwid widgets", "漢字", "a\tb"])
+    def test_wrapped_text_created(self, text):
+        link = Hyperlink(URI, text=text)
+        link.render((8,))
+        assert link._uw_wrapped is not None
+
+    @pytest.mark.parametrize("text", ["\t", "\u0301"])
+    def test_no_columns(self, text):
+        # Whitespace or zero-width text, packed
+        canv = Hyperlink(URI, text=text).render(())
+        assert (canv.cols(), canv.rows()) == (0, 1)
+        assert list(canv.content()) == [[]]
+
+    def test_update_created_text(self):
+        link = Hyperlink(URI, text="漢字")
+        link.render((8,))
+        link.text = "漢"
+        link.attrib = "link"
+        assert list(link.render((4,)).content())[0][1] == ("link", None, "漢".encode())
+
+    @pytest.mark.parametrize(
+        "text, trim_left, cols, linked",
+        [
+            ("urwid", 1, 3, True),
+            ("urwid", 0, 8, True),
+            ("urwid", 2, 6, True),
+            ("urwid", 5, 3, False),
+            ("漢字ab", 1, 4, True),
+            ("漢字ab", 2, 3, True),
+            ("漢字ab", 6, 2, False),
+        ],
+    )
+    def test_trimmed(self, text, trim_left, cols, linked):
+        canv = urwid.CompositeCanvas(Hyperlink(URI, "link", text).render((8,)))
+        canv.pad_trim_left_right(-trim_left, trim_left + cols - 8)
+        expected = urwid.CompositeCanvas(urwid.Text(("link", text)).render((8,)))
+        expected.pad_trim_left_right(-trim_left, trim_left + cols - 8)
+
+        row = list(canv.content())[0]
+        assert canv.cols() == cols
+        # Same as a plain text widget, apart from the escape sequences
+        assert [run for run in row if run[1] != "U"] == list(expected.content())[0]
+        assert (get_start(0) in canv.text[0]) is linked
+        assert (END in canv.text[0]) is linked
+
+    def test_attr_map(self):
+        canv = urwid.CompositeCanvas(Hyperlink(URI, "link", "urwid").render((8,)))
+        canv.fill_attr_apply({"link": "mapped", None: "padding"})
+        row = list(canv.content())[0]
+        assert row[1] == ("mapped", None, b"urwid")
+        assert row[3] == ("padding", None, b"   ")
@@ -0,0 +1,110 @@
+import re
+
+import pytest
+import urwid
+from urwid import Filler, Text
+
+from urwidgets import (
+    Hyperlink,
+    TextEmbed,
+    TextParser,
+    instrumentation,
+    iter_parse_text,
+    parse_text,
+)
+from urwidgets.instrumentation import Collector, add_callback, remove_callback
+
+BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+
+def repl(pattern, groups, span):
+    return ("bold", groups[1])
+
+
+def test_disabled_by_default():
+    assert not instrumentation.enabled
+
+
+def test_add_and_remove_callback():
+    events = []
+
+    def callback(*args):
+        events.append(args)
+
+    add_callback(callback)
+    try:
+        assert instrumentation.enabled
+        parse_text("**a**", [BOLD], repl)
+    finally:
+        remove_callback(callback)
+    assert not instrumentation.enabled
+    parse_text("**a**", [BOLD], repl)
+
+    assert events[0] == ("repl_calls", None, 1)
+    assert events[1][:2] == ("parse_text", None)
+    assert isinstance(events[1][2], float)
+    assert len(events) == 2
+
+
+def test_remove_unregistered():
+    with pytest.raises(ValueError):
+        remove_callback(print)
+
+
+def test_registered_twice():
+    with Collector() as collector:
+        add_callback(collector)
+        try:
+            parse_text("**a**", [BOLD], repl)
+        finally:
+            remove_callback(collector)
+        assert instrumentation.enabled
+    assert not instrumentation.enabled
+    assert collector.counts["parse_text"] == 2
+
+
+class TestCollector:
+    def test_text_embed(self):
+        widget = TextEmbed(
+            ["one ", (4, Filler(urwid.Columns([Text("ab"), Text("cd")]))), "\ntwo"]
+        )
+        with Collector(per_source=True) as collector:
+            canv = widget.render((20,))
+            assert widget.render((20,)) is canv  # Cached by urwid
+        assert collector.counts["text_embed.render"] == 1
+        assert collector.times["text_embed.render"] > 0
+        assert collector.counts["text_embed.widget_renders"] == 1
+        assert collector.counts["text_embed.placeholder_lines"] == 1
+        assert collector.sources[widget]["text_embed.widget_renders"] == 1
+
+    def test_hyperlink(self):
+        link = Hyperlink("https://urwid.org")
+        with Collector(per_source=True) as collector:
+            link.render(())
+        assert collector.counts["hyperlink.render"] == 1
+        assert list(collector.sources) == [link]
+
+    def test_parsers(self):
+        parser = TextParser([BOLD], repl)
+        with Collector(per_source=True) as collector:
+            parser.parse("**a** **b**")
+            parser.parse("**a** **b** **c**")
+            list(iter_parse_text("**a**", [BOLD], repl))
+        assert collector.counts["text_parser.parse"] == 2
+        assert collector.sources[parser]["repl_calls"] == 3
+        assert collector.sources[None]["repl_calls"] == 1
+        assert collector.counts["repl_calls"] == 4
+
+    def test_without_sources(self):
+        with Collector() as collector:
+            parse_text("**a**", [BOLD], repl)
+        assert collector.sources is None
+        assert collector.counts["parse_text"] == 1
+
+    def test_reset(self):
+        with Collector(per_source=True) as collector:
+            parse_text("**a**", [BOLD], repl)
+            collector.reset()
+        assert not collector.counts
+        assert not collector.times
+        assert not collector.sources
@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+import urwid
+from urwid import Filler
+
+from urwidgets import LiveValue, TextEmbed, UpdateBatcher
+from urwidgets.instrumentation import Collector
+
+
+def get_rows(canv):
+    return [row.decode() for row in canv.text]
+
+
+class TestUpdateBatcher:
+    def test_coalesce(self):
+        applied = []
+        batcher = UpdateBatcher(main_loop=urwid.MainLoop(None))
+        for key, value in (("a", 1), ("b", 2), ("a", 3), ("c", 4), ("b", 5)):
+            batcher.submit(key, lambda value=value: applied.append(value))
+        assert batcher.pending == 3
+        assert applied == []
+
+        batcher.flush()
+        # In the order of the first submission of each key
+        assert applied == [3, 5, 4]
+        assert batcher.pending == 0
+
+    def test_scheduled_flush(self):
+        applied = []
+        flushes = []
+
+        async def main():
+            batcher = UpdateBatcher(0.01, on_flush=lambda: flushes.append(1))
+            for value in range(100):
+                batcher.submit("key", lambda value=value: applied.append(value))
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.05)
+            return batcher
+
+        batcher = asyncio.run(main())
+        assert applied[-1] == 99
+        assert len(applied) < 100
+        assert len(flushes) == len(applied)
+        assert batcher.pending == 0
+
+    def test_interval(self):
+        times = []
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            batcher = UpdateBatcher(0.02)
+            for _ in range(3):
+                batcher.submit("key", lambda: times.append(loop.time()))
+                await asyncio.sleep(0.03)
+
+        asyncio.run(main())
+        assert len(times) == 3
+        for previous, current in zip(times, times[1:]):
+            assert current - previous >= 0.019
+
+    def test_flush_cancels_scheduled(self):
+        applied = []
+
+        async def main():
+            batcher = UpdateBatcher(0.01)
+            batcher.submit("key", lambda: applied.append(1))
+            batcher.flush()
+            await asyncio.sleep(0.03)
+
+        asyncio.run(main())
+        assert applied == [1]
+
+    def test_cancel(self):
+        applied = []
+
+        async def main():
+            batcher = UpdateBatcher(0.01)
+            batcher.submit("key", lambda: applied.append(1))
+            batcher.cancel()
+            assert batcher.pending == 0
+            await asyncio.sleep(0.03)
+
+        asyncio.run(main())
+        assert applied == []
+
+    def test_main_loop(self):
+        main_loop = urwid.MainLoop(None)
+        batcher = UpdateBatcher(main_loop=main_loop)
+        assert batcher.main_loop is main_loop
+        batcher.submit("key", lambda: None)
+        handle = batcher._handle
+        batcher.cancel()
+        # The alarm was removed
+        assert not main_loop.remove_alarm(handle)
+
+    def test_submitted_during_flush(self):
+        applied = []
+        batcher = UpdateBatcher(main_loop=urwid.MainLoop(None))
+
+        def update():
+            applied.append(1)
+            batcher.submit("key", lambda: applied.append(2))
+
+        batcher.submit("key", update)
+        batcher.flush()
+        assert applied == [1]
+        assert batcher.pending == 1
+        batcher.cancel()
+
+    def test_no_event_loop(self):
+        with pytest.raises(RuntimeError):
+            UpdateBatcher().submit("key", lambda: None)
+
+    def test_instrumentation(self):
+        batcher = UpdateBatcher(main_loop=urwid.MainLoop(None))
+        for key in range(3):
+            batcher.submit(key, lambda: None)
+        with Collector() as collector:
+            batcher.flush()
+        assert collector.counts["update_batcher.flush"] == 3
+
+    @pytest.mark.parametrize(
+        "interval, exception", [(-1, ValueError), ("1", TypeError)]
+    )
+    def test_invalid_interval(self, interval, exception):
+        with pytest.raises(exception):
+            UpdateBatcher(interval)
+        batcher = UpdateBatcher()
+        with pytest.raises(exception):
+            batcher.interval = interval
+
+
+class TestLiveValue:
+    def test_immediate(self):
+        value = LiveValue(1)
+        assert value.value == 1
+        value.update(2)
+        assert value.value == 2
+        assert get_rows(value.render((3,))) == ["2  "]
+
+    def test_batched(self):
+        batcher = UpdateBatcher(main_loop=urwid.MainLoop(None))
+        value = LiveValue(0, batcher)
+        for number in range(10):
+            value.update(number)
+        assert value.value == 0
+        assert batcher.pending == 1
+        batcher.flush()
+        assert value.value == 9
+
+    def test_format(self):
+        value = LiveValue(5, attr="a", formatter="{:>3}%".format, align="right")
+        canv = value.render((6,))
+        assert get_rows(canv) == ["    5%"]
+        assert list(canv.content())[0][-1] == ("a", None, b"  5%")
+
+    def test_ellipsis(self):
+        assert get_rows(LiveValue("a long value").render((6,))) == ["a lon…"]
+
+    def test_follow(self):
+        value = LiveValue()
+
+        async def values():
+            for number in range(3):
+                yield number
+                await asyncio.sleep(0)
+
+        asyncio.run(value.follow(values()))
+        assert value.value == 2
+
+    def test_embedded(self):
+        batcher = UpdateBatcher(main_loop=urwid.MainLoop(None))
+        first, second = LiveValue(0, batcher), LiveValue(0, batcher)
+        widget = TextEmbed(["A: ", (3, Filler(first)), "\nB: ", (3, Filler(second))])
+        canv = widget.render(())
+        first.update(10)
+        second.update(20)
+        assert widget.render(()) is canv
+        batcher.flush()
+        assert get_rows(widget.render(())) == ["A: 10 ", "B: 20 "]
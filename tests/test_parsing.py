@@ -0,0 +1,442 @@
+import re
+import sys
+
+import pytest
+
+from urwidgets import ParseCache, PatternSet, TextParser, iter_parse_text, parse_text
+from urwidgets.text_embed import get_entry_size, get_literal_prefix
+
+URL = re.compile(r"https://\S+")
+BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+
+def repl(pattern, groups, span):
+    return ("link", span) if pattern is URL else ("bold", groups[1])
+
+
+def merge_text(markup):
+    """Joins consecutive strings, which may be yielded in parts."""
+    merged = []
+    for element in markup:
+        if isinstance(element, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += element
+        else:
+            merged.append(element)
+    return merged
+
+
+def iter_chunks(text, size):
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+TEXT = "see https://urwid.org and **bold** text\nthen https://x.y/z, **b**"
+
+
+class TestIterParseText:
+    def test_string(self):
+        assert list(iter_parse_text(TEXT, [URL, BOLD], repl)) == parse_text(
+            TEXT, [URL, BOLD], repl
+        )
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 100])
+    def test_chunks(self, size):
+        markup = iter_parse_text(
+            iter_chunks(TEXT, size), [URL, BOLD], repl, max_match_len=20
+        )
+        assert merge_text(markup) == parse_text(TEXT, [URL, BOLD], repl)
+
+    def test_match_across_chunk_boundary(self):
+        text = "go to https://urwid.org now"
+        # The URL starts in the first chunk and ends in the third
+        chunks = ["go to htt", "ps://urwid", ".org now"]
+        assert merge_text(iter_parse_text(chunks, [URL], repl, max_match_len=32)) == [
+            "go to ",
+            ("link", (6, 23)),
+            " now",
+        ]
+        assert parse_text(text, [URL], repl)[1] == ("link", (6, 23))
+
+    def test_lazy(self):
+        calls = []
+        consumed = []
+
+        def recording_repl(pattern, groups, span):
+            calls.append(span)
+            return groups[0].upper()
+
+        def chunks():
+            for index in range(100):
+                consumed.append(index)
+                yield "**a** "
+
+        markup = iter_parse_text(chunks(), [BOLD], recording_repl, max_match_len=8)
+        assert not calls and not consumed
+        assert next(markup) == "**A**"
+        assert calls == [(0, 5)]
+        assert len(consumed) < 100
+
+    def test_repl_args(self):
+        markup = iter_parse_text(
+            "**a**",
+            [BOLD],
+            lambda pattern, groups, span, arg, kwarg: (arg, kwarg),
+            "arg",
+            kwarg="kwarg",
+        )
+        assert list(markup) == [("arg", "kwarg")]
+
+    def test_empty(self):
+        assert list(iter_parse_text("", [URL], repl)) == []
+        assert list(iter_parse_text([], [URL], repl)) == []
+
+    @pytest.mark.parametrize(
+        "args, kwargs, exception",
+        [
+            ((1, [URL], repl), {}, TypeError),
+            (("", [], repl), {}, ValueError),
+            (("", [re.compile(b"x")], repl), {}, ValueError),
+            (("", [URL], repl), {"max_match_len": 0}, ValueError),
+            (("", [URL], repl), {"max_match_len": 1.5}, TypeError),
+        ],
+    )
+    def test_invalid(self, args, kwargs, exception):
+        with pytest.raises(exception):
+            iter_parse_text(*args, **kwargs)
+
+
+class TestTextParser:
+    def make_parser(self, max_match_len=16):
+        calls = []
+
+        def recording_repl(pattern, groups, span):
+            calls.append(span)
+            return repl(pattern, groups, span)
+
+        return (
+            TextParser([URL, BOLD], recording_repl, max_match_len=max_match_len),
+            calls,
+        )
+
+    def test_growing_text(self):
+        parser, calls = self.make_parser()
+        for end in range(len(TEXT) + 1):
+            assert parser.parse(TEXT[:end]) == parse_text(TEXT[:end], [URL, BOLD], repl)
+
+    def test_repl_calls(self):
+        parser, calls = self.make_parser()
+        text = "**a** " * 10
+        parser.parse(text)
+        assert len(calls) == 10
+        calls.clear()
+        parser.parse(text + "**b**")
+        # Only matches near the end of the last string are replaced again, if at all
+        assert (60, 65) in calls
+        assert (0, 5) not in calls
+        assert len(calls) <= 4
+
+    def test_extended_match(self):
+        parser, calls = self.make_parser()
+        assert parser.parse("at https://a") == ["at ", ("link", (3, 12))]
+        assert parser.parse("at https://a.b") == ["at ", ("link", (3, 14))]
+
+    def test_not_extension(self):
+        parser, calls = self.make_parser()
+        parser.parse("**a** **b**")
+        calls.clear()
+        assert parser.parse("**c**") == ("bold", "c")
+        assert calls == [(0, 5)]
+
+    def test_reset(self):
+        parser, calls = self.make_parser()
+        parser.parse("**a**")
+        parser.reset()
+        calls.clear()
+        assert parser.parse("**a** x") == [("bold", "a"), " x"]
+        assert calls == [(0, 5)]
+
+    def test_empty(self):
+        parser, _ = self.make_parser()
+        assert parser.parse("") == ""
+
+    def test_invalid(self):
+        parser, _ = self.make_parser()
+        with pytest.raises(TypeError):
+            parser.parse(b"text")
+        with pytest.raises(ValueError):
+            TextParser([URL], repl, max_match_len=0)
+
+
+class TestPatternSet:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        PatternSet.cache_clear()
+        yield
+        PatternSet.set_cache_size(128)
+        PatternSet.cache_clear()
+
+    def test_patterns(self):
+        pattern_set = PatternSet([URL, BOLD])
+        assert pattern_set.patterns == (URL, BOLD)
+        assert list(pattern_set) == [URL, BOLD]
+        assert len(pattern_set) == 2
+
+    def test_parse(self):
+        pattern_set = PatternSet([URL, BOLD])
+        assert parse_text(TEXT, pattern_set, repl) == parse_text(
+            TEXT, [URL, BOLD], repl
+        )
+        # Used as-is, not looked up in the cache
+        assert PatternSet.cache_info().currsize == 1
+
+    def test_cache(self):
+        parse_text(TEXT, [URL, BOLD], repl)
+        parse_text(TEXT, (URL, BOLD), repl)
+        parse_text(TEXT, [BOLD, URL], repl)
+        info = PatternSet.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+    def test_cache_size(self):
+        PatternSet.set_cache_size(2)
+        for patterns in ([URL], [BOLD], [URL, BOLD]):
+            parse_text(TEXT, patterns, repl)
+        info = PatternSet.cache_info()
+        assert (info.evictions, info.maxsize, info.currsize) == (1, 2, 2)
+
+        PatternSet.set_cache_size(1)
+        assert PatternSet.cache_info().currsize == 1
+        PatternSet.set_cache_size(0)
+        parse_text(TEXT, [URL], repl)
+        assert PatternSet.cache_info().currsize == 0
+
+    def test_cache_clear(self):
+        parse_text(TEXT, [URL], repl)
+        PatternSet.cache_clear()
+        assert PatternSet.cache_info() == (0, 0, 0, 128, 0)
+
+    @pytest.mark.parametrize(
+        "patterns, exception",
+        [([], ValueError), ([re.compile(b"x")], ValueError), (1, TypeError)],
+    )
+    def test_invalid(self, patterns, exception):
+        with pytest.raises(exception):
+            PatternSet(patterns)
+
+    @pytest.mark.parametrize("maxsize, exception", [(-1, ValueError), (1.0, TypeError)])
+    def test_invalid_cache_size(self, maxsize, exception):
+        with pytest.raises(exception):
+            PatternSet.set_cache_size(maxsize)
+
+
+class TestPrefilter:
+    LINK = re.compile(r"\[(\w+)\]\((\S+?)\)")
+    TAG = re.compile(r"<(\w+)>(.*?)</\1>")
+
+    @pytest.mark.parametrize(
+        "pattern, prefix",
+        [
+            (r"https://\S+", "https://"),
+            (r"\*\*(.+?)\*\*", "**"),
+            (r"(?:ab)+c", "ab"),
+            (r"(?=a)ab", "ab"),
+            (r"\bfoo", "foo"),
+            (r"a?b", ""),
+            (r"a|b", ""),
+            (r"(?i:ab)c", ""),
+            (r"\w+", ""),
+        ],
+    )
+    def test_literal_prefix(self, pattern, prefix):
+        assert get_literal_prefix(re.compile(pattern)) == prefix
+
+    def test_ignore_case(self):
+        assert get_literal_prefix(re.compile("ab", re.I)) == ""
+
+    @pytest.mark.parametrize(
+        "patterns, prefiltered",
+        [
+            ([URL, BOLD], True),
+            ([URL, BOLD, LINK], True),
+            ([URL], False),
+            ([URL, re.compile(r"\w+@\w+")], False),
+        ],
+    )
+    def test_prefiltered(self, patterns, prefiltered):
+        assert PatternSet(patterns).prefiltered is prefiltered
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            TEXT,
+            "** not bold https://x [a](b) **b** [c] (d) [e](f)",
+            "**https://x**[a](https://y)",
+            "no matches * [ https:/ at all",
+        ],
+    )
+    def test_same_as_combined(self, text):
+        pattern_set = PatternSet([URL, BOLD, self.LINK])
+        combined = PatternSet([URL, BOLD, self.LINK])
+        combined._prefilter = None
+        assert parse_text(text, pattern_set, repl) == parse_text(text, combined, repl)
+
+    def test_order(self):
+        first, second = re.compile(r"ab+"), re.compile(r"a\w+")
+        matched = []
+
+        def repl(pattern, groups, span):
+            matched.append((pattern, groups[0]))
+
+        parse_text("abc abbb axy", PatternSet([first, second]), repl)
+        # The first pattern that matches at a position takes precedence
+        assert matched == [(first, "ab"), (first, "abbb"), (second, "axy")]
+
+    def test_groups(self):
+        groups = []
+        pattern_set = PatternSet([URL, self.LINK, BOLD])
+        parse_text(
+            "[a](b) https://x **c**", pattern_set, lambda *args: groups.append(args[1])
+        )
+        # Only the groups of the pattern that matched
+        assert groups == [("[a](b)", "a", "b"), ("https://x",), ("**c**", "c")]
+
+    def test_backreference(self):
+        pattern_set = PatternSet([BOLD, self.TAG])
+        assert pattern_set.prefiltered
+        assert parse_text(
+            "<b>x</i></b> **y**", pattern_set, lambda *args: args[1][1:]
+        ) == [("b", "x</i>"), " ", ("y",)]
+
+
+class TestParseCache:
+    @pytest.fixture
+    def calls(self):
+        return []
+
+    @pytest.fixture
+    def counting_repl(self, calls):
+        def counting_repl(pattern, groups, span):
+            calls.append(span)
+            return repl(pattern, groups, span)
+
+        return counting_repl
+
+    @pytest.mark.parametrize("share_markup", [True, False])
+    def test_parse(self, counting_repl, share_markup):
+        cache = ParseCache([URL, BOLD], counting_repl, share_markup=share_markup)
+        expected = parse_text(TEXT, [URL, BOLD], repl)
+        assert cache.parse(TEXT) == expected
+        assert cache.parse(TEXT) == expected
+        info = cache.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    def test_shared_markup(self, counting_repl, calls):
+        cache = ParseCache([URL, BOLD], counting_repl)
+        markup = cache.parse(TEXT)
+        assert cache.parse(TEXT) is markup
+        assert len(calls) == 4
+
+    def test_unshared_markup(self, counting_repl, calls, monkeypatch):
+        cache = ParseCache([URL, BOLD], counting_repl, share_markup=False)
+        markup = cache.parse(TEXT)
+
+        # Not scanned again
+        def finditer(*args):
+            raise AssertionError
+
+        monkeypatch.setattr(cache._pattern_set, "_finditer", finditer)
+        new_markup = cache.parse(TEXT)
+        assert new_markup == markup
+        assert new_markup is not markup
+        assert len(calls) == 8
+
+    def test_repl_args(self):
+        cache = ParseCache(
+            [BOLD],
+            lambda pattern, groups, span, *args, **kwargs: (args, kwargs),
+            1,
+            a=2,
+        )
+        assert cache.parse("**x**") == ((1,), {"a": 2})
+
+    def test_maxsize(self):
+        cache = ParseCache([BOLD], repl, maxsize=2)
+        for text in ("**a**", "**b**", "**a**", "**c**"):
+            cache.parse(text)
+        info = cache.cache_info()
+        assert (info.evictions, info.maxsize, info.currsize) == (1, 2, 2)
+        # The least recently parsed string was evicted
+        assert list(cache._cache) == ["**a**", "**c**"]
+
+    def test_unlimited(self):
+        cache = ParseCache([BOLD], repl, maxsize=None)
+        for index in range(2000):
+            cache.parse(f"**{index}**")
+        assert cache.cache_info().currsize == 2000
+
+    def test_disabled(self):
+        cache = ParseCache([BOLD], repl, maxsize=0)
+        assert cache.parse("**a**") == ("bold", "a")
+        cache.parse("**a**")
+        info = cache.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (0, 2, 0)
+
+    @pytest.mark.parametrize("share_markup", [True, False])
+    def test_entry_size(self, share_markup):
+        cache = ParseCache([URL, BOLD], repl, share_markup=share_markup)
+        cache.parse(TEXT)
+        ((value, size),) = cache._cache.values()
+        assert size == get_entry_size(TEXT, value)
+        # Much more than the string alone
+        assert cache.cache_info().currbytes == size > sys.getsizeof(TEXT) * 2
+
+    def test_entry_size_shared_objects(self):
+        value = ["abc", "abc", ("abc",)]
+        assert get_entry_size("", value) == sum(
+            map(sys.getsizeof, ("", value, "abc", value[2]))
+        )
+        # Patterns are not counted
+        value = [(BOLD,)]
+        assert get_entry_size("", value) == sum(
+            map(sys.getsizeof, ("", value, value[0]))
+        )
+
+    def test_max_bytes(self):
+        texts = [f"**{index}**" for index in range(4)]
+        size = get_entry_size(texts[0], parse_text(texts[0], [BOLD], repl))
+        cache = ParseCache([BOLD], repl, max_bytes=size * 2)
+        for text in texts:
+            cache.parse(text)
+        info = cache.cache_info()
+        assert (info.evictions, info.currsize, info.currbytes) == (2, 2, size * 2)
+        assert list(cache._cache) == texts[2:]
+
+    def test_oversize_entry(self):
+        cache = ParseCache([BOLD], repl, max_bytes=1000)
+        cache.parse("**a**")
+        cache.parse("**a** " * 100)
+        info = cache.cache_info()
+        assert (info.evictions, info.currsize) == (0, 1)
+
+    def test_clear(self):
+        cache = ParseCache([BOLD], repl)
+        cache.parse("**a**")
+        cache.parse("**a**")
+        cache.clear()
+        assert cache.cache_info() == (0, 0, 0, 1024, 0, None, 0)
+
+    @pytest.mark.parametrize(
+        "kwargs, exception",
+        [
+            ({"maxsize": -1}, ValueError),
+            ({"maxsize": 1.0}, TypeError),
+            ({"max_bytes": -1}, ValueError),
+            ({"max_bytes": "1"}, TypeError),
+        ],
+    )
+    def test_invalid(self, kwargs, exception):
+        with pytest.raises(exception):
+            ParseCache([BOLD], repl, **kwargs)
+
+    def test_invalid_text(self):
+        with pytest.raises(TypeError):
+            ParseCache([BOLD], repl).parse(b"**a**")
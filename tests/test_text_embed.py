@@ -0,0 +1,834 @@
+import pytest
+import urwid
+from urwid import Filler, Text
+
+from urwidgets import CompiledMarkup, Hyperlink, TextEmbed
+from urwidgets.instrumentation import Collector
+from urwidgets.text_embed import _EmbeddedTable
+
+
+def get_rows(canv):
+    return [row.decode() for row in canv.text]
+
+
+def get_shard_canvases(canv):
+    return [shard[-1] for _, row in canv.shards for shard in row]
+
+
+def make_multi_view_widget():
+    # Renders to multiple canvases, hence never drawn inline with the text
+    return Filler(urwid.Columns([Text("ab"), Text("cd")]))
+
+
+class TestRenderCache:
+    def test_plain_text(self):
+        widget = TextEmbed("line one\nline two\n\nline four")
+        assert get_rows(widget.render((10,))) == [
+            "line one  ",
+            "line two  ",
+            "          ",
+            "line four ",
+        ]
+        assert get_rows(widget.render((5,))) == [
+            "line ",
+            "one  ",
+            "line ",
+            "two  ",
+            "     ",
+            "line ",
+            "four ",
+        ]
+
+    def test_embedded(self):
+        widget = TextEmbed(
+            ["line one\nsecond ", (4, make_multi_view_widget()), " line\nthird"]
+        )
+        assert get_rows(widget.render((20,))) == [
+            "line one            ",
+            "second abcd line    ",
+            "third               ",
+        ]
+
+    def test_reuse_after_invalidation(self):
+        widget = TextEmbed(
+            ["one\ntwo ", (4, make_multi_view_widget()), "\nthree\nfour"]
+        )
+        canv = widget.render((20,))
+        widget._invalidate()
+        new_canv = widget.render((20,))
+
+        line_canvases = get_shard_canvases(canv)
+        new_line_canvases = get_shard_canvases(new_canv)
+        assert get_rows(new_canv) == get_rows(canv)
+        assert len(new_line_canvases) == len(line_canvases)
+        for line_canv, new_line_canv in zip(line_canvases, new_line_canvases):
+            assert new_line_canv is line_canv
+
+    def test_per_size_and_focus(self):
+        widget = TextEmbed(["one two ", (4, make_multi_view_widget())])
+        wide = get_rows(widget.render((20,)))
+        narrow = get_rows(widget.render((8,)))
+        assert get_rows(widget.render((20,), True)) == wide
+        assert get_rows(widget.render((8,))) == narrow == ["one two ", "abcd    "]
+
+    def test_set_text(self):
+        widget = TextEmbed("one\ntwo\nthree")
+        widget.render((10,))
+        widget.set_text("one\n2\nthree")
+        assert get_rows(widget.render((10,))) == [
+            "one       ",
+            "2         ",
+            "three     ",
+        ]
+
+    def test_align_and_wrap(self):
+        widget = TextEmbed("one\ntwo words")
+        widget.render((7,))
+        widget.set_align_mode("right")
+        assert get_rows(widget.render((7,))) == ["    one", "    two", "  words"]
+        widget.set_wrap_mode("clip")
+        assert get_rows(widget.render((7,))) == ["    one", "o words"]
+
+
+class TestPlaceholderIndex:
+    def make_widget(self, align="left"):
+        return TextEmbed(
+            [
+                "aaa ",
+                (4, make_multi_view_widget()),
+                " bbb\n\nccc ",
+                (4, make_multi_view_widget()),
+                "\nddd",
+            ],
+            align,
+        )
+
+    def test_widths(self):
+        widget = self.make_widget()
+        assert get_rows(widget.render((20,))) == [
+            "aaa abcd bbb        ",
+            "                    ",
+            "ccc abcd            ",
+            "ddd                 ",
+        ]
+        assert get_rows(widget.render((8,))) == [
+            "aaa abcd",
+            "bbb     ",
+            "        ",
+            "ccc abcd",
+            "ddd     ",
+        ]
+        # Widgets wrapped onto lines of their own
+        assert get_rows(widget.render((4,))) == [
+            "aaa ",
+            "abcd",
+            "bbb ",
+            "    ",
+            "ccc ",
+            "abcd",
+            "ddd ",
+        ]
+        # Back to a width laid out earlier
+        assert get_rows(widget.render((20,)))[2] == "ccc abcd            "
+
+    def test_fixed(self):
+        assert get_rows(self.make_widget().render(())) == [
+            "aaa abcd bbb",
+            "            ",
+            "ccc abcd    ",
+            "ddd         ",
+        ]
+
+    def test_center(self):
+        assert get_rows(self.make_widget("center").render((10,))) == [
+            " aaa abcd ",
+            "    bbb   ",
+            "          ",
+            " ccc abcd ",
+            "    ddd   ",
+        ]
+
+
+class TestAppend:
+    def test_trailing_line_break(self):
+        widget = TextEmbed("one\n")
+        widget.render((10,))
+        widget.append("two\n")
+        widget.append("three")
+        assert widget.text == "one\ntwo\nthree"
+        assert get_rows(widget.render((10,))) == [
+            "one       ",
+            "two       ",
+            "three     ",
+        ]
+
+    def test_no_trailing_line_break(self):
+        widget = TextEmbed("one two")
+        widget.render((10,))
+        # Continues the last line, which is laid out again
+        widget.append(" three")
+        assert get_rows(widget.render((10,))) == ["one two   ", "three     "]
+        widget.append("\nfour")
+        assert get_rows(widget.render((10,))) == [
+            "one two   ",
+            "three     ",
+            "four      ",
+        ]
+
+    def test_embedded(self):
+        first = make_multi_view_widget()
+        second = Filler(Text("xyz"))
+        widget = TextEmbed(["one ", (4, first)])
+        widget.render((12,))
+        widget.append([" two ", (3, second), "\nthree"])
+        assert widget.embedded == [(first, 4), (second, 3)]
+        assert get_rows(widget.render((12,))) == [
+            "one abcd two",
+            "xyz         ",
+            "three       ",
+        ]
+
+    def test_same_as_set_text(self):
+        chunks = [
+            ["one ", (4, make_multi_view_widget())],
+            [" two\nthree ", (3, Filler(Text("xyz")))],
+            ["", "\n"],
+            "four five six",
+            [("bold", " seven"), "\n"],
+        ]
+        widget = TextEmbed("")
+        for chunk in chunks:
+            widget.render((9,))
+            widget.append(chunk)
+
+        markup = []
+        for chunk in chunks:
+            markup += chunk if isinstance(chunk, list) else [chunk]
+        expected = TextEmbed(markup)
+        assert widget.get_text() == expected.get_text()
+        for size in ((9,), (5,), ()):
+            assert list(widget.render(size).content()) == list(
+                expected.render(size).content()
+            )
+
+    @pytest.mark.parametrize(
+        "markup, chunks",
+        [
+            ([("bold", "ac")], ["cba"]),
+            (["ab"], ["cd", ("x", "ef"), "gh"]),
+            ([("x", "ab"), "c"], [("x", "d"), "\n", ("y", "e")]),
+            ([("x", "ab\n")], ["cd\n", "ef"]),
+        ],
+    )
+    def test_attrib(self, markup, chunks):
+        widget = TextEmbed(markup)
+        for chunk in chunks:
+            widget.render((4,))
+            widget.append(chunk)
+        expected = TextEmbed(markup + chunks)
+        assert widget.get_text() == expected.get_text()
+        assert list(widget.render((4,)).content()) == list(
+            expected.render((4,)).content()
+        )
+
+    def test_empty(self):
+        widget = TextEmbed("one")
+        widget.append("")
+        widget.append([])
+        assert widget.text == "one"
+
+    @pytest.mark.parametrize("wrap", ["space", "clip"])
+    @pytest.mark.parametrize("max_lines", [None, 50])
+    def test_many_appends(self, max_lines, wrap):
+        widget = TextEmbed("", wrap=wrap)
+        widget.max_lines = max_lines
+        markup = []
+        for index in range(300):
+            chunk = [f"line {index} ", (4, make_multi_view_widget()), "\n"]
+            if index % 3:
+                chunk.insert(0, (2, Filler(Text(f"{index % 100:02}"))))
+            markup += chunk
+            widget.append(chunk)
+            canv = widget.render((10,))
+            # Blocks of appended lines are joined
+            assert len(widget._uw_layout_cache[(10,)]) <= 10
+
+        expected = TextEmbed(markup, wrap=wrap)
+        expected.max_lines = max_lines
+        assert widget.text == expected.text
+        assert list(canv.content()) == list(expected.render((10,)).content())
+
+
+class TestMaxLines:
+    def test_append(self):
+        widget = TextEmbed("")
+        widget.max_lines = 3
+        for index in range(5):
+            widget.append(f"line {index}\n")
+        # The empty line after the last line break counts
+        assert widget.text == "line 3\nline 4\n"
+        assert get_rows(widget.render((6,))) == ["line 3", "line 4", "      "]
+
+    def test_embedded_widgets_removed(self):
+        first, second = make_multi_view_widget(), make_multi_view_widget()
+        widget = TextEmbed([(4, first), "\n", (4, second), "\nend"])
+        widget.render((4,))
+        widget.max_lines = 2
+        assert widget.embedded == [(second, 4)]
+        assert get_rows(widget.render((4,))) == ["abcd", "end "]
+
+    def test_set_text(self):
+        widget = TextEmbed("")
+        widget.max_lines = 2
+        widget.set_text("one\ntwo\nthree")
+        assert widget.text == "two\nthree"
+
+    def test_unlimited(self):
+        widget = TextEmbed("one\ntwo")
+        widget.max_lines = 1
+        assert widget.max_lines == 1
+        widget.max_lines = None
+        widget.append("\nthree\nfour")
+        assert widget.max_lines is None
+        assert widget.text == "two\nthree\nfour"
+
+    @pytest.mark.parametrize(
+        "value, exception", [(0, ValueError), (-1, ValueError), ("1", TypeError)]
+    )
+    def test_invalid(self, value, exception):
+        with pytest.raises(exception):
+            TextEmbed("").max_lines = value
+
+
+class TestEmbeddedTable:
+    def test_table(self):
+        first, second = Filler(Text("a")), Filler(Text("b"))
+        table = _EmbeddedTable([first, second], [1, 2], [0, 3])
+        assert len(table) == 2
+        assert table[1] == (second, 2, 3)
+        assert table.widths.typecode == table.start_positions.typecode == "l"
+        with pytest.raises(KeyError):
+            table[2]
+
+    def test_drop_and_extend(self):
+        widgets = [Filler(Text(str(index))) for index in range(4)]
+        table = _EmbeddedTable(widgets[:3], [1, 2, 3], [0, 2, 4])
+        table.drop(2)
+        assert (table.base, len(table)) == (2, 1)
+        assert table[2] == (widgets[2], 3, 4)
+        # Indexes of removed widgets
+        for index in (-1, 0, 1):
+            with pytest.raises(KeyError):
+                table[index]
+
+        table.extend(_EmbeddedTable(widgets[3:], [4], [6]))
+        assert table[3] == (widgets[3], 4, 6)
+        assert list(table.widths) == [3, 4]
+
+    def test_max_lines(self):
+        widgets = [make_multi_view_widget() for _ in range(5)]
+        widget = TextEmbed("")
+        widget.max_lines = 2
+        for index, embedded in enumerate(widgets):
+            widget.append([f"{index} ", (4, embedded), "\n"])
+            widget.render((8,))
+        table = widget._uw_embedded
+        # Widgets are indexed from the first ever embedded
+        assert (table.base, len(table)) == (4, 1)
+        assert table[4][0] is widgets[4]
+        assert widget.embedded == [(widgets[4], 4)]
+        assert get_rows(widget.render((8,))) == ["4 abcd  ", "        "]
+
+
+def make_lines_markup(n_lines):
+    """Returns a markup of lines each containing an embedded widget."""
+    markup = []
+    for index in range(n_lines):
+        markup += [f"line {index:02} ", (4, make_multi_view_widget()), "\n"]
+    return markup[:-1]
+
+
+class TestRenderRows:
+    @pytest.mark.parametrize("start, stop", [(0, 1), (0, 10), (3, 7), (9, 10)])
+    def test_content(self, start, stop):
+        widget = TextEmbed(make_lines_markup(10))
+        full = list(widget.render((20,)).content())
+        canv = widget.render_rows((20,), start, stop)
+        assert canv.rows() == stop - start
+        assert list(canv.content()) == full[start:stop]
+
+    def test_wrapped(self):
+        widget = TextEmbed(make_lines_markup(4))
+        full = list(widget.render((8,)).content())
+        assert len(full) == 8
+        assert list(widget.render_rows((8,), 3, 6).content()) == full[3:6]
+
+    def test_only_rows_rendered(self):
+        widget = TextEmbed(make_lines_markup(10))
+        with Collector() as collector:
+            widget.render_rows((20,), 2, 5)
+        assert collector.counts["text_embed.widget_renders"] == 3
+
+    @pytest.mark.parametrize(
+        "start, stop, exception",
+        [
+            (0, 0, ValueError),
+            (3, 2, ValueError),
+            (-1, 2, ValueError),
+            (0, 11, ValueError),
+            (0.0, 1, TypeError),
+            (0, "1", TypeError),
+        ],
+    )
+    def test_invalid(self, start, stop, exception):
+        with pytest.raises(exception):
+            TextEmbed(make_lines_markup(10)).render_rows((20,), start, stop)
+
+
+class TestDeferredRender:
+    def make_widget(self, n_lines):
+        widget = TextEmbed(make_lines_markup(n_lines))
+        widget.deferred_render = True
+        return widget
+
+    def test_default(self):
+        assert TextEmbed("").deferred_render is False
+
+    def test_content(self):
+        widget = self.make_widget(10)
+        expected = list(TextEmbed(make_lines_markup(10)).render((20,)).content())
+        with Collector() as collector:
+            canv = widget.render((20,))
+            assert collector.counts["text_embed.widget_renders"] == 0
+            assert (canv.cols(), canv.rows()) == (20, 10)
+            assert list(canv.content()) == expected
+            assert collector.counts["text_embed.widget_renders"] == 10
+
+    def test_trimmed(self):
+        widget = self.make_widget(10)
+        expected = urwid.CompositeCanvas(TextEmbed(make_lines_markup(10)).render((20,)))
+        expected.trim(4, 3)
+        canv = urwid.CompositeCanvas(widget.render((20,)))
+        canv.trim(4, 3)
+        with Collector() as collector:
+            assert list(canv.content()) == list(expected.content())
+        assert collector.counts["text_embed.widget_renders"] == 3
+
+    def test_list_box(self):
+        list_box = urwid.ListBox(urwid.SimpleFocusListWalker([self.make_widget(100)]))
+        with Collector() as collector:
+            canv = list_box.render((20, 5))
+            assert canv.text[0].decode() == "line 00 abcd        "
+            assert canv.text[4].decode() == "line 04 abcd        "
+        assert collector.counts["text_embed.widget_renders"] == 5
+
+    def test_no_embedded(self):
+        widget = TextEmbed("one\ntwo")
+        widget.deferred_render = True
+        assert get_rows(widget.render((3,))) == ["one", "two"]
+
+
+class TestTargetedInvalidation:
+    def make_widget(self, texts, inline):
+        markup = []
+        for index, text in enumerate(texts):
+            widget = Filler(text if inline else urwid.Columns([text, Text("-")]))
+            markup += [f"line {index} ", (4, widget), "\n"]
+        return TextEmbed(markup[:-1])
+
+    @pytest.mark.parametrize("inline", [False, True])
+    def test_no_explicit_invalidation(self, inline):
+        texts = [Text(str(index)) for index in range(10)]
+        widget = self.make_widget(texts, inline)
+        canv = widget.render((20,))
+        assert widget.render((20,)) is canv
+
+        texts[5].set_text("X")
+        new_canv = widget.render((20,))
+        assert new_canv is not canv
+        rows = get_rows(new_canv)
+        assert rows[5].startswith("line 5 X")
+        assert rows[4] == get_rows(canv)[4]
+
+    def test_only_updated_lines(self):
+        texts = [Text(str(index)) for index in range(10)]
+        widget = self.make_widget(texts, False)
+        # Held by a container, as when displayed
+        pile = urwid.Pile([widget])
+        pile.render((20,))
+
+        texts[2].set_text("X")
+        texts[7].set_text("Y")
+        with Collector() as collector:
+            canv = pile.render((20,))
+        assert collector.counts["text_embed.widget_renders"] == 2
+        assert collector.counts["text_embed.placeholder_lines"] == 2
+        assert get_rows(canv)[2] == "line 2 X -          "
+        assert get_rows(canv)[7] == "line 7 Y -          "
+
+    def test_replaced_widget(self):
+        placeholder = urwid.WidgetPlaceholder(Filler(Text("a")))
+        widget = TextEmbed(["x ", (2, placeholder), " y"])
+        widget.render((10,))
+        placeholder.original_widget = Filler(Text("b"))
+        assert get_rows(widget.render((10,))) == ["x b  y    "]
+
+
+class TestFlatCanvas:
+    def test_shards(self):
+        widget = TextEmbed(
+            [
+                "one\ntwo\nx ",
+                (4, make_multi_view_widget()),
+                "\nthree\nfour\n",
+                (4, make_multi_view_widget()),
+            ]
+        )
+        canv = widget.render((10,))
+        # A shard per run of lines without widgets and per line with widgets
+        assert [rows for rows, _ in canv.shards] == [2, 1, 2, 1]
+        for _, cviews in canv.shards[::2]:
+            assert len(cviews) == 1
+        assert get_rows(canv) == [
+            "one       ",
+            "two       ",
+            "x abcd    ",
+            "three     ",
+            "four      ",
+            "abcd      ",
+        ]
+
+    def test_inline_shards(self):
+        widget = TextEmbed(["one\nx ", (2, Filler(Text("ab"))), "\nthree"])
+        canv = widget.render((10,))
+        assert [(rows, len(cviews)) for rows, cviews in canv.shards] == [(3, 1)]
+        assert get_rows(canv) == ["one       ", "x ab      ", "three     "]
+
+    def test_trim_and_pad(self):
+        widget = TextEmbed(["one\nx ", (4, make_multi_view_widget()), " y\nthree"])
+        canv = urwid.CompositeCanvas(widget.render((10,)))
+        canv.trim(1, 2)
+        canv.pad_trim_left_right(-1, 2)
+        assert get_rows(canv) == [" abcd y    ", "hree       "]
+
+    def test_cursor(self):
+        edit = urwid.Edit("", "hi")
+        widget = TextEmbed(["ab\ncd ", (4, Filler(edit)), " z"])
+        assert widget.render((10,), True).cursor == (5, 1)
+        edit.set_edit_pos(1)
+        assert widget.render((10,), True).cursor == (4, 1)
+        assert widget.render((10,)).cursor is None
+
+
+class TestInlineCanvas:
+    MARKUP = [
+        "12345 ",
+        (4, Filler(Text("abcd"))),
+        " 6789\nshort ",
+        (2, Filler(Text(("a", "xy")))),
+        "\nno widgets here",
+    ]
+    TEXT = "12345 abcd 6789\nshort xy\nno widgets here"
+
+    @pytest.mark.parametrize("wrap", ["space", "clip"])
+    @pytest.mark.parametrize("align", ["left", "center", "right"])
+    @pytest.mark.parametrize("maxcol", [4, 8, 11, 20])
+    def test_same_as_text(self, align, wrap, maxcol):
+        widget = TextEmbed(self.MARKUP, align, wrap)
+        expected = Text(self.TEXT, align, wrap)
+        canv = widget.render((maxcol,))
+        assert [rows for rows, _ in canv.shards] == [canv.rows()]
+        assert get_rows(canv) == get_rows(expected.render((maxcol,)))
+
+    def test_attributes(self):
+        canv = TextEmbed(self.MARKUP).render((20,))
+        assert list(canv.content())[1] == [
+            (None, None, b"short "),
+            ("a", None, b"xy"),
+            (None, None, b"            "),
+        ]
+
+    def test_trimmed(self):
+        canv = urwid.CompositeCanvas(TextEmbed(self.MARKUP).render((20,)))
+        canv.trim(1)
+        canv.pad_trim_left_right(-7, 0)
+        assert get_rows(canv) == ["y            ", "ets here     "]
+
+    def test_reused(self):
+        text = Text("xy")
+        widget = TextEmbed(["one\nx ", (2, Filler(text)), "\nthree"])
+        (block_canv,) = get_shard_canvases(widget.render((10,)))
+        widget._invalidate()
+        assert get_shard_canvases(widget.render((10,))) == [block_canv]
+
+        text.set_text("zw")
+        canv = widget.render((10,))
+        assert get_shard_canvases(canv) != [block_canv]
+        assert get_rows(canv)[1] == "x zw      "
+
+    def test_multi_view_fallback(self):
+        widget = TextEmbed(
+            ["x ", (2, Filler(Text("ab"))), "\ny ", (4, make_multi_view_widget())]
+        )
+        canv = widget.render((10,))
+        assert len(canv.shards) == 2
+        assert get_rows(canv) == ["x ab      ", "y abcd    "]
+
+    @pytest.mark.parametrize("inline", [False, True])
+    def test_instrumentation(self, inline):
+        def make_widget(text):
+            if inline:
+                return Filler(Text(text))
+            return Filler(urwid.Columns([Text(text[:3]), Text(text[3:])]))
+
+        widget = TextEmbed(
+            ["ab ", (6, make_widget("123456")), " c\nxy ", (6, make_widget("abcdef"))],
+            wrap="any",
+        )
+        with Collector() as collector:
+            canv = widget.render((6,))
+        assert get_rows(canv) == ["ab 123", "456 c ", "xy abc", "def   "]
+        assert collector.counts["text_embed.placeholder_lines"] == 4
+        # The lines starting with the tails of the wrapped widgets
+        assert collector.counts["text_embed.tail_continuations"] == 2
+        # The inline canvas of the block or a canvas per line
+        assert collector.counts["text_embed.composite_canvases"] == (2 if inline else 5)
+
+    def test_hyperlink(self):
+        widget = TextEmbed(
+            ["see ", (5, Filler(Hyperlink("https://urwid.org", text="urwid"))), "!"]
+        )
+        (row,) = widget.render((12,)).text
+        assert row.startswith(b"see \033]8;id=")
+        assert row.endswith(b"urwid\033]8;;\033\\!  ")
+
+
+class TestWidgetPositions:
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "ab ",  # Printable ASCII
+            "漢 ",  # Wide
+            "e\u0301 ",  # Combining
+            "\xe9\xe9 ",  # Non-ASCII
+        ],
+    )
+    def test_after_text(self, text):
+        widget = TextEmbed([text, (4, make_multi_view_widget()), " z"])
+        expected = urwid.Text(f"{text}abcd z")
+        for size in ((12,), (5,), ()):
+            assert get_rows(widget.render(size)) == get_rows(expected.render(size))
+
+    def test_nested(self):
+        first, second, third = (make_multi_view_widget() for _ in range(3))
+        widget = TextEmbed(
+            [
+                ("a", ["x", ("b", "漢")]),
+                (4, first),
+                "\n",
+                (2, [second, ("c", "y"), third]),
+            ]
+        )
+        assert widget.embedded == [(first, 4), (second, 2), (third, 2)]
+        assert widget.text.count(TextEmbed.PLACEHOLDER_HEAD) == 3
+        assert get_rows(widget.render(())) == ["x漢abcd", "acyac  "]
+
+    def test_invalid_width(self):
+        with pytest.raises(ValueError):
+            TextEmbed([(0, make_multi_view_widget())])
+
+
+class TestCompiledMarkup:
+    markup = [("bold", "N: "), (4, None), " A: ", (2, None)]
+
+    def test_properties(self):
+        compiled = CompiledMarkup(self.markup)
+        assert compiled.text.startswith("N: " + TextEmbed.PLACEHOLDER_HEAD)
+        assert len(compiled.text) == 13
+        assert compiled.attrib == [("bold", 3), (0, 4), (None, 4), (1, 2)]
+        assert compiled.widths == (4, 2)
+        assert compiled.widgets == (None, None)
+
+    def test_bind(self):
+        compiled = CompiledMarkup(self.markup)
+        rows = [
+            TextEmbed(compiled.bind([Filler(Text(name)), Filler(Text(age))]))
+            for name, age in (("Alice", "32"), ("Bob", "27"))
+        ]
+        assert compiled.widgets == (None, None)
+        assert get_rows(rows[0].render(())) == ["N: Alic A: 32"]
+        assert get_rows(rows[1].render(())) == ["N: Bob  A: 27"]
+        assert rows[0].attrib == compiled.attrib
+
+    def test_same_as_markup(self):
+        widgets = [make_multi_view_widget(), Filler(Text("xy"))]
+        markup = ["one ", (4, widgets[0]), ("bold", " two\n"), (2, widgets[1])]
+        compiled = TextEmbed(CompiledMarkup(markup))
+        expected = TextEmbed(markup)
+        assert compiled.text == expected.text
+        assert compiled.embedded == expected.embedded
+        for size in ((20,), (5,), ()):
+            assert list(compiled.render(size).content()) == list(
+                expected.render(size).content()
+            )
+
+    def test_append(self):
+        compiled = CompiledMarkup(["x ", (2, None), "\n"])
+        widget = TextEmbed("")
+        for text in ("ab", "cd"):
+            widget.append(compiled.bind([Filler(Text(text))]))
+        assert get_rows(widget.render(())) == ["x ab", "x cd", "    "]
+
+    def test_custom_placeholders(self):
+        class CustomTextEmbed(TextEmbed):
+            PLACEHOLDER_HEAD = "\ue000"
+            PLACEHOLDER_TAIL = "\ue001"
+
+        compiled = CompiledMarkup([(2, Filler(Text("ab")))], CustomTextEmbed)
+        assert compiled.text == "\ue000\ue001"
+        assert get_rows(CustomTextEmbed(compiled).render(())) == ["ab"]
+
+    def test_unbound(self):
+        with pytest.raises(ValueError):
+            TextEmbed(CompiledMarkup(self.markup))
+
+    @pytest.mark.parametrize(
+        "widgets, exception",
+        [
+            ([Filler(Text("x"))], ValueError),
+            ([Text("x"), Filler(Text("y"))], ValueError),
+            (["x", "y"], TypeError),
+        ],
+    )
+    def test_invalid_bind(self, widgets, exception):
+        with pytest.raises(exception):
+            CompiledMarkup(self.markup).bind(widgets)
+
+    def test_invalid_widget(self):
+        with pytest.raises(ValueError):
+            CompiledMarkup([(2, Text("x"))])
+
+
+class TestClip:
+    @pytest.mark.parametrize("align", ["left", "center", "right"])
+    @pytest.mark.parametrize("maxcol", [4, 8, 11, 14, 20])
+    def test_embedded(self, align, maxcol):
+        widget = TextEmbed(
+            [
+                "12345 ",
+                (4, make_multi_view_widget()),
+                " 6789\nshort ",
+                (4, make_multi_view_widget()),
+                "\nno widgets here",
+            ],
+            align,
+            "clip",
+        )
+        expected = Text("12345 abcd 6789\nshort abcd\nno widgets here", align, "clip")
+        size = (maxcol,)
+        assert get_rows(widget.render(size)) == get_rows(expected.render(size))
+
+    def test_center_attributed_line_start(self):
+        # See `fix_text_canvas_attr()`
+        widget = TextEmbed([("a", "abcdef"), "\nxy"], "center", "clip")
+        assert list(widget.render((5,)).content())[0] == [("a", None, b"abcde")]
+        assert get_rows(widget.render((5,))) == ["abcde", "  xy "]
+
+
+class TestSharedLayout:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        TextEmbed.layout_cache_clear()
+        yield
+        TextEmbed.set_layout_cache_size(256)
+        TextEmbed.layout_cache_clear()
+
+    def make_widget(self, text="xy", align="left"):
+        return TextEmbed(["a ", (2, Filler(Text(text))), " b\nc"], align)
+
+    def get_block(self, widget, size):
+        (block,) = widget._uw_layout_cache[size]
+        return block
+
+    def test_shared(self):
+        first, second = self.make_widget("xy"), self.make_widget("zw")
+        assert get_rows(first.render((8,))) == ["a xy b  ", "c       "]
+        assert get_rows(second.render((8,))) == ["a zw b  ", "c       "]
+        info = TextEmbed.layout_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+        first_block = self.get_block(first, (8,))
+        second_block = self.get_block(second, (8,))
+        assert first_block is not second_block
+        assert first_block.text_canv is second_block.text_canv
+
+    def test_same_as_unshared(self):
+        widgets = [self.make_widget() for _ in range(2)]
+        TextEmbed.set_layout_cache_size(0)
+        unshared = self.make_widget()
+        for size in ((8,), (4,), ()):
+            expected = list(unshared.render(size).content())
+            for widget in widgets:
+                assert list(widget.render(size).content()) == expected
+        assert TextEmbed.layout_cache_info().currsize == 0
+
+    def test_not_shared(self):
+        self.make_widget().render((8,))
+        self.make_widget().render((9,))
+        self.make_widget(align="right").render((8,))
+        TextEmbed([("attr", "a "), (2, Filler(Text("xy"))), " b\nc"]).render((8,))
+        TextEmbed(["a ", (3, Filler(Text("xy"))), " b\nc"]).render((8,))
+        info = TextEmbed.layout_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (0, 5, 5)
+
+    def test_long_text(self):
+        TextEmbed("x" * 1025).render((80,))
+        TextEmbed("x" * 1025).render((80,))
+        assert TextEmbed.layout_cache_info() == (0, 0, 0, 256, 0)
+
+    def test_widgets_independent(self):
+        texts = [Text("xy"), Text("xy")]
+        first, second = [TextEmbed(["a ", (2, Filler(text)), " b"]) for text in texts]
+        first.render((8,))
+        second_canv = second.render((8,))
+
+        texts[0].set_text("zw")
+        assert get_rows(first.render((8,))) == ["a zw b  "]
+        assert second.render((8,)) is second_canv
+        first.set_text("other")
+        assert get_rows(first.render((8,))) == ["other   "]
+        assert get_rows(second.render((8,))) == ["a xy b  "]
+
+    def test_plain_text(self):
+        first, second = TextEmbed("one\ntwo"), TextEmbed("one\ntwo")
+        first_canv = first.render((5,))
+        second_canv = second.render((5,))
+        assert first_canv is not second_canv
+        # The shared text canvas is not tied to either widget
+        first._invalidate()
+        assert second.render((5,)) is second_canv
+        assert get_rows(first.render((5,))) == ["one  ", "two  "]
+
+    def test_cache_size(self):
+        TextEmbed.set_layout_cache_size(2)
+        for text in ("a", "b", "c"):
+            TextEmbed(text).render((4,))
+        info = TextEmbed.layout_cache_info()
+        assert (info.evictions, info.maxsize, info.currsize) == (1, 2, 2)
+
+        TextEmbed.set_layout_cache_size(1)
+        assert TextEmbed.layout_cache_info().currsize == 1
+        TextEmbed.set_layout_cache_size(None)
+        for index in range(300):
+            TextEmbed(str(index)).render((4,))
+        assert TextEmbed.layout_cache_info().currsize == 301
+
+    def test_clear(self):
+        TextEmbed("a").render((4,))
+        TextEmbed("a").render((4,))
+        TextEmbed.layout_cache_clear()
+        assert TextEmbed.layout_cache_info() == (0, 0, 0, 256, 0)
+
+    @pytest.mark.parametrize("maxsize, exception", [(-1, ValueError), (1.0, TypeError)])
+    def test_invalid_cache_size(self, maxsize, exception):
+        with pytest.raises(exception):
+            TextEmbed.set_layout_cache_size(maxsize)